@@ -4,7 +4,7 @@ import sqlite3
 
 import streamlit as st
 
-from src import db, session_state, settings, ui_widgets
+from src import db, migrations, query_plans, session_state, settings, ui_widgets
 
 st.set_page_config(
     page_title="HOME",
@@ -116,6 +116,7 @@ else:
             try:
                 conn = db.connect(str(current_path))
                 if db.schema_is_valid(conn):
+                    migrations.migrate(conn)
                     st.session_state.db_ready = True
                     settings.update_app_settings(
                         settings_conn, last_used_db_path=str(current_path)
@@ -171,4 +172,17 @@ if dir_submit:
     )
     st.success("Directories saved.")
 
+recorder = query_plans.active_recorder()
+if recorder is not None:
+    st.divider()
+    with st.expander("Query plans (this session)"):
+        plan_rows = recorder.summary()
+        if plan_rows:
+            st.dataframe(plan_rows, width="stretch", hide_index=True)
+        else:
+            st.caption("No queries recorded yet.")
+        if st.button("Clear query plans"):
+            recorder.clear()
+            st.rerun()
+
 settings_conn.close()
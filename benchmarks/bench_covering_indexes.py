@@ -0,0 +1,85 @@
+import argparse
+import time
+from typing import List
+
+from benchmarks import synthetic
+from src import comparison_engine, migrations, queries, query_plans
+from src.types import Group, Node, Period
+
+LIST_FILTERS = {"categories": ["food"], "date_start": "2022-01-01", "date_end": "2022-03-31"}
+
+
+def _config():
+    periods = [
+        Period(label="2022", start_date="2022-01-01", end_date="2022-12-31"),
+        Period(label="spring 2021", start_date="2021-03-05", end_date="2021-07-20"),
+    ]
+    groups = [
+        Group(label="alice", payers=["alice"], payees=["alice"]),
+        Group(label="bob+charlie", payers=["bob", "charlie"], payees=["bob", "charlie"]),
+    ]
+    nodes = [Node(label=name, kind="category", category=name) for name in synthetic.CATEGORIES]
+    nodes.append(Node(label="food/snacks", kind="subcategory", category="food", subcategory="snacks"))
+    return periods, groups, nodes
+
+
+def _run(conn, periods, groups, nodes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        comparison_engine.compute_comparison(
+            conn, periods, groups, "role", "or", or_nodes=nodes,
+            engine=comparison_engine.ENGINE_PER_CELL, use_cache=False,
+        )
+        queries.list_transactions(conn, LIST_FILTERS)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _print_plans(recorder: query_plans.QueryPlanRecorder) -> None:
+    for row in recorder.summary():
+        covering = "covering" if "COVERING INDEX idx_transactions" in row["plan"] else "lookup"
+        print(f"    {covering:>8} {row['executions']:>3}x  {row['plan'][:110]}")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Per-cell and listing queries with/without covering indexes.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    path = synthetic.BENCH_ROOT / f"covering_{args.rows}.db"
+    conn = synthetic.create_database(path, args.rows)
+    periods, groups, nodes = _config()
+    print(f"rows={args.rows} cells={len(periods) * len(groups) * len(nodes)}")
+    try:
+        for name, _ in migrations.COVERING_INDEXES:
+            conn.execute(f"DROP INDEX {name}")
+        single_column = [
+            ("idx_transactions_category", "category_id"),
+            ("idx_transactions_payment_day", "date_payment_day"),
+            ("idx_transactions_application_day", "date_application_day"),
+        ]
+        for name, column in single_column:
+            conn.execute(f"CREATE INDEX {name} ON transaction_rows({column})")
+        results = {}
+        for label in ("single-column", "covering"):
+            if label == "covering":
+                for name, _ in single_column:
+                    conn.execute(f"DROP INDEX {name}")
+                for name, columns in migrations.COVERING_INDEXES:
+                    conn.execute(f"CREATE INDEX {name} ON transaction_rows({columns})")
+            conn.execute("ANALYZE")
+            recorder = query_plans.QueryPlanRecorder()
+            query_plans.activate(recorder)
+            results[label] = _run(conn, periods, groups, nodes, args.repeat)
+            query_plans.activate(None)
+            print(f"{label:>14}: {results[label]:8.3f}s")
+            _print_plans(recorder)
+        print(f"speedup {results['single-column'] / results['covering']:.2f}x")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import datetime as dt
+import math
+import time
+from typing import List, Tuple
+
+from benchmarks import synthetic
+from src import comparison_engine
+from src.types import Group, Node, Period
+
+# (periods, groups, nodes) grids, from one cell up to 24 monthly periods x 26 nodes. Periods
+# always split the same two years, so every grid reads the same rows.
+GRIDS = [(1, 1, 1), (2, 2, 5), (8, 3, 10), (24, 3, 26), (24, 5, 26)]
+WINDOW_MONTHS = 24
+
+
+def _grid(period_count: int, group_count: int, node_count: int) -> Tuple[list, list, list]:
+    periods = []
+    months = WINDOW_MONTHS // period_count
+    for index in range(period_count):
+        first = index * months
+        last = first + months - 1
+        start = dt.date(2022 + first // 12, first % 12 + 1, 1)
+        end = dt.date(2022 + (last + 1) // 12, (last + 1) % 12 + 1, 1) - dt.timedelta(days=1)
+        periods.append(
+            Period(
+                label=f"{start.isoformat()[:7]}..{end.isoformat()[:7]}",
+                start_date=start.isoformat(),
+                end_date=end.isoformat(),
+            )
+        )
+    people = synthetic.PEOPLE
+    groups = [
+        Group(label=f"G{index}", payers=[people[index % len(people)]], payees=[people[(index + 1) % len(people)]])
+        for index in range(group_count)
+    ]
+    node_pool = [Node(label="All", kind="all")]
+    for category, subcategories in synthetic.CATEGORIES.items():
+        node_pool.append(Node(label=category, kind="category", category=category))
+        for subcategory in subcategories:
+            node_pool.append(
+                Node(
+                    label=f"{category}/{subcategory}",
+                    kind="subcategory",
+                    category=category,
+                    subcategory=subcategory,
+                )
+            )
+    node_pool += [Node(label=f"tag:{tag}", kind="tag", tag=tag) for tag in synthetic.TAGS]
+    return periods, groups, node_pool[:node_count]
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Comparison latency as the cell grid grows.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=[comparison_engine.ENGINE_SINGLE_PASS, comparison_engine.ENGINE_VECTORIZED],
+    )
+    args = parser.parse_args(argv)
+
+    path = synthetic.BENCH_ROOT / f"grid_{args.rows}.db"
+    conn = synthetic.create_database(path, args.rows)
+    print(f"rows={args.rows}")
+    print(f"{'engine':>12} {'grid':>10} {'cells':>6} {'seconds':>9} {'ms/cell':>8}")
+    try:
+        for engine in args.engines:
+            samples = []
+            for grid in GRIDS:
+                periods, groups, nodes = _grid(*grid)
+                cells = len(periods) * len(groups) * len(nodes)
+                best = float("inf")
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    comparison_engine.compute_comparison(
+                        conn, periods, groups, "role", "or", or_nodes=nodes,
+                        engine=engine, use_cache=False,
+                    )
+                    best = min(best, time.perf_counter() - started)
+                label = f"{len(periods)}x{len(groups)}x{len(nodes)}"
+                print(f"{engine:>12} {label:>10} {cells:>6} {best:9.3f} {best * 1000 / cells:8.3f}")
+                samples.append((cells, best))
+            # Latency ~ cells ** exponent from the second grid (the first one warms caches)
+            # to the largest; an exponent below 1 means sub-linear growth.
+            (small_cells, small_time), (large_cells, large_time) = samples[1], samples[-1]
+            exponent = math.log(large_time / small_time) / math.log(large_cells / small_cells)
+            print(f"{engine:>12} growth exponent {exponent:.2f} ({small_cells} -> {large_cells} cells)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
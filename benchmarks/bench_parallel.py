@@ -0,0 +1,61 @@
+import argparse
+import os
+import time
+from typing import List
+
+from benchmarks import synthetic
+from src import comparison_engine
+from src.types import Group, Node, Period
+
+
+def _config():
+    periods = [
+        Period(label=str(year), start_date=f"{year}-01-01", end_date=f"{year}-12-31")
+        for year in range(2020, 2025)
+    ]
+    groups = [
+        Group(label="alice", payers=["alice"], payees=["alice"]),
+        Group(label="bob+charlie", payers=["bob", "charlie"], payees=["bob", "charlie"]),
+        Group(label="others", payers=["dana", "eve"], payees=["frank", "gina"], include_missing_payer=True),
+    ]
+    nodes = [Node(label=name, kind="category", category=name) for name in synthetic.CATEGORIES]
+    nodes += [Node(label=f"tag:{tag}", kind="tag", tag=tag) for tag in synthetic.TAGS[:3]]
+    return periods, groups, nodes
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Per-cell vs parallel per-cell comparison timing.")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    path = synthetic.BENCH_ROOT / f"parallel_{args.rows}.db"
+    conn = synthetic.create_database(path, args.rows)
+    periods, groups, nodes = _config()
+    print(f"rows={args.rows} cells={len(periods) * len(groups) * len(nodes)} cpus={os.cpu_count()}")
+
+    def timed(engine: str, workers: int = None) -> float:
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            comparison_engine.compute_comparison(
+                conn, periods, groups, "role", "or", or_nodes=nodes,
+                engine=engine, use_cache=False, workers=workers,
+            )
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    try:
+        serial = timed(comparison_engine.ENGINE_PER_CELL)
+        print(f"{'per_cell':>16}: {serial:8.3f}s")
+        for workers in args.workers:
+            elapsed = timed(comparison_engine.ENGINE_PARALLEL, workers)
+            label = f"parallel x{workers}"
+            print(f"{label:>16}: {elapsed:8.3f}s  speedup {serial / elapsed:5.2f}x")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import argparse
+import datetime as dt
+import json
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import synthetic
+from src import comparison_engine, csv_io, queries
+from src.types import Group, Node, Period
+
+DEFAULT_SIZES = [10000, 100000]
+SUITE_SIZES = [10000, 100000, 1000000, 5000000]
+DEFAULT_IMPORT_ROWS = 5000
+RESULTS_ROOT = synthetic.BENCH_ROOT / "results"
+
+LIST_FILTERS = {
+    "date_start": "2023-01-01",
+    "date_end": "2023-01-31",
+    "categories": ["food", "home"],
+    "payers": ["alice", "bob"],
+}
+EXPORT_FILTERS = {"date_start": "2023-01-01", "date_end": "2023-03-31"}
+
+
+def _comparison_config() -> Dict[str, object]:
+    periods = [
+        Period(label=str(year), start_date=f"{year}-01-01", end_date=f"{year}-12-31")
+        for year in range(2020, 2025)
+    ]
+    periods.append(Period(label="spring 2023", start_date="2023-03-10", end_date="2023-06-20"))
+    groups = [
+        Group(label="alice", payers=["alice"], payees=["alice"]),
+        Group(label="bob+charlie", payers=["bob", "charlie"], payees=["bob", "charlie"]),
+        Group(label="others", payers=["dana", "eve"], payees=["frank"], include_missing_payer=True),
+    ]
+    nodes = [Node(label=name, kind="category", category=name) for name in synthetic.CATEGORIES]
+    nodes.append(Node(label="food/snacks", kind="subcategory", category="food", subcategory="snacks"))
+    nodes += [Node(label=f"tag:{tag}", kind="tag", tag=tag) for tag in synthetic.TAGS[:3]]
+    return {"periods": periods, "groups": groups, "mode": "role", "node_mode": "or", "or_nodes": nodes}
+
+
+def _operations(conn: sqlite3.Connection, import_rows: int) -> Dict[str, Callable[[], object]]:
+    config = _comparison_config()
+    csv_rows = synthetic.csv_rows(import_rows, seed=1)
+    parsed, errors = csv_io.validate_rows(csv_rows)
+    if errors:
+        raise ValueError(f"Synthetic import rows failed validation: {errors[0].message}")
+    export_rows = queries.list_transactions(conn, EXPORT_FILTERS)
+
+    def insert() -> None:
+        try:
+            csv_io.insert_transactions(conn, parsed)
+        finally:
+            # Keep the database identical between repeats and sizes.
+            conn.rollback()
+
+    operations: Dict[str, Callable[[], object]] = {
+        "list_transactions.filtered": lambda: queries.list_transactions(conn, LIST_FILTERS),
+        "list_transactions.page": lambda: queries.list_transactions(conn, {}, limit=200),
+        "list_transactions.page_columns": lambda: queries.list_transactions(
+            conn, {}, limit=200, columns=["date_application", "amount_cents", "category"]
+        ),
+    }
+    for engine in (comparison_engine.ENGINE_SINGLE_PASS, comparison_engine.ENGINE_VECTORIZED):
+        operations[f"compute_comparison.{engine}"] = (
+            lambda engine=engine: comparison_engine.compute_comparison(
+                conn, engine=engine, use_cache=False, **config
+            )
+        )
+    operations["csv_io.validate_rows"] = lambda: csv_io.validate_rows(csv_rows)
+    operations["csv_io.insert_transactions"] = insert
+    operations["csv_io.export_to_csv"] = lambda: csv_io.export_to_csv(export_rows)
+    return operations
+
+
+def run_suite(
+    sizes: List[int], repeat: int, import_rows: int, only: Optional[List[str]] = None
+) -> List[Dict[str, object]]:
+    results = []
+    for rows in sizes:
+        started = time.perf_counter()
+        conn = synthetic.ensure_database(synthetic.BENCH_ROOT / f"suite_{rows}.db", rows)
+        print(f"rows={rows} (database ready in {time.perf_counter() - started:.1f}s)")
+        try:
+            for name, operation in _operations(conn, import_rows).items():
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    operation()
+                    samples.append(time.perf_counter() - started)
+                result = {
+                    "rows": rows,
+                    "operation": name,
+                    "best_s": round(min(samples), 6),
+                    "median_s": round(statistics.median(samples), 6),
+                    "repeat": repeat,
+                }
+                results.append(result)
+                print(f"  {name:<34} best {result['best_s']:9.4f}s  median {result['median_s']:9.4f}s")
+        finally:
+            conn.close()
+    return results
+
+
+def compare_results(current: List[Dict[str, object]], baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    previous = {(item["rows"], item["operation"]): item for item in baseline["results"]}
+    print(f"vs {baseline_path.name} ({baseline.get('commit') or 'unknown commit'}):")
+    for item in current:
+        old = previous.get((item["rows"], item["operation"]))
+        if old is None or not old["best_s"]:
+            continue
+        ratio = item["best_s"] / old["best_s"]
+        print(f"  {item['rows']:>8} {item['operation']:<34} {ratio:6.2f}x")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=synthetic.REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Time core operations on synthetic databases.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--full", action="store_true", help=f"Run every size in {SUITE_SIZES}.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--import-rows", type=int, default=DEFAULT_IMPORT_ROWS)
+    parser.add_argument("--only", nargs="+", help="Operation name prefixes to run.")
+    parser.add_argument("--output", type=Path, help="JSON results path.")
+    parser.add_argument("--compare", type=Path, help="Earlier JSON results to compare with.")
+    args = parser.parse_args(argv)
+
+    sizes = SUITE_SIZES if args.full else args.sizes
+    results = run_suite(sizes, args.repeat, args.import_rows, args.only)
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "created_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        stamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = RESULTS_ROOT / f"{stamp}_{commit or 'nocommit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"wrote {output}")
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
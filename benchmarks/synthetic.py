@@ -0,0 +1,184 @@
+import datetime as dt
+import itertools
+import math
+import random
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from src import amounts, db, migrations
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SCHEMA_PATH = REPO_ROOT / "schema.sql"
+BENCH_ROOT = REPO_ROOT / ".tmp_bench"
+
+PEOPLE = ["alice", "bob", "charlie", "dana", "eve", "frank", "gina", "henry"]
+CATEGORIES = {
+    "food": ["groceries", "restaurant", "snacks"],
+    "home": ["rent", "utilities", "repairs"],
+    "travel": ["train", "flight", "hotel"],
+    "fun": ["books", "games", "concerts"],
+    "health": ["pharmacy", "doctor"],
+}
+PAYMENT_TYPES = ["card", "cash", "transfer"]
+TAGS = ["holiday", "work", "gift", "shared", "refund", "kids"]
+NOTE_WORDS = ["weekly", "shop", "split", "deposit", "late fee", "birthday", "trip", "refund"]
+
+# Real ledgers are skewed: a few people, categories and tags account for most rows.
+# Weights follow a Zipf-like 1 / rank ** ZIPF_EXPONENT curve over the lists above.
+ZIPF_EXPONENT = 1.1
+TAG_COUNT_WEIGHTS = [55, 30, 12, 3]  # share of rows with 0, 1, 2, 3 tags
+SPAN_DAYS = 6 * 365
+START_DATE = dt.date(2019, 1, 1)
+RECORD_KEYS = (
+    "date_payment",
+    "date_application",
+    "amount_cents",
+    "payer",
+    "payee",
+    "payment_type",
+    "category",
+    "subcategory",
+    "notes",
+)
+
+
+def create_database(path: Path, rows: int, seed: int = 0) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+    conn = db.connect(str(path))
+    db.init_db(conn, str(SCHEMA_PATH))
+    # Throwaway files: trade durability for load speed.
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")
+    populate(conn, rows, seed)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def ensure_database(path: Path, rows: int, seed: int = 0) -> sqlite3.Connection:
+    # Large databases take minutes to build; reuse one left by an earlier run.
+    if path.exists():
+        conn = db.connect(str(path))
+        row = conn.execute("SELECT COUNT(*) FROM transactions").fetchone()
+        if int(row[0]) == rows:
+            migrations.migrate(conn)
+            return conn
+        conn.close()
+    return create_database(path, rows, seed)
+
+
+def populate(conn: sqlite3.Connection, rows: int, seed: int = 0, batch_size: int = 10000) -> None:
+    rng = random.Random(seed)
+    tag_ids = {name: _tag_id(conn, name) for name in TAGS}
+    next_id = int(conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions").fetchone()[0]) + 1
+
+    done = 0
+    while done < rows:
+        count = min(batch_size, rows - done)
+        transactions: List[tuple] = []
+        links: List[tuple] = []
+        for offset, record in enumerate(generate_records(rng, count)):
+            tx_id = next_id + done + offset
+            transactions.append((tx_id,) + tuple(record[key] for key in RECORD_KEYS))
+            links.extend((tx_id, tag_ids[tag]) for tag in record["tags"])
+        conn.executemany(
+            """
+            INSERT INTO transactions (
+                id, date_payment, date_application, amount_cents, payer, payee,
+                payment_type, category, subcategory, notes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            transactions,
+        )
+        conn.executemany(
+            "INSERT INTO transaction_tags (transaction_id, tag_id) VALUES (?, ?)", links
+        )
+        conn.commit()
+        done += count
+
+
+def generate_records(rng: random.Random, count: int) -> List[Dict[str, object]]:
+    # Columns are drawn in bulk with precomputed cumulative weights; per-row choices
+    # with weights would dominate generation time at millions of rows.
+    categories = list(CATEGORIES)
+    payers = _weighted(rng, PEOPLE, count)
+    category_column = _weighted(rng, categories, count)
+    payment_types = _weighted(rng, PAYMENT_TYPES, count)
+    tag_counts = rng.choices(range(len(TAG_COUNT_WEIGHTS)), weights=TAG_COUNT_WEIGHTS, k=count)
+    records = []
+    for index in range(count):
+        paid = START_DATE + dt.timedelta(days=rng.randrange(SPAN_DAYS))
+        applied = paid + dt.timedelta(days=rng.choice([0, 0, 0, 1, 3, 30]))
+        payer = payers[index]
+        payee = _weighted(rng, PEOPLE, 1)[0]
+        while payee == payer:
+            payee = rng.choice(PEOPLE)
+        missing = rng.random()
+        if missing < 0.05:
+            payer = None
+        elif missing < 0.1:
+            payee = None
+        category = category_column[index]
+        subcategories = CATEGORIES[category]
+        tags = set()
+        while len(tags) < tag_counts[index]:
+            tags.add(_weighted(rng, TAGS, 1)[0])
+        records.append(
+            {
+                "date_payment": paid.isoformat(),
+                "date_application": applied.isoformat(),
+                # Log-normal amounts: mostly small purchases with a long tail of large ones.
+                "amount_cents": max(50, min(500000, int(rng.lognormvariate(7.5, 1.2)))),
+                "payer": payer,
+                "payee": payee,
+                "payment_type": payment_types[index] if rng.random() > 0.1 else None,
+                "category": category,
+                "subcategory": (
+                    _weighted(rng, subcategories, 1)[0] if rng.random() > 0.2 else None
+                ),
+                "notes": " ".join(rng.sample(NOTE_WORDS, 2)) if rng.random() < 0.1 else None,
+                "tags": sorted(tags),
+            }
+        )
+    return records
+
+
+def csv_rows(count: int, seed: int = 0) -> List[Dict[str, Optional[str]]]:
+    # Rows as csv_io.read_csv_rows returns them, for import benchmarks.
+    rng = random.Random(seed)
+    return [
+        {
+            "date_payment": record["date_payment"],
+            "date_application": record["date_application"],
+            "amount": amounts.format_cents(int(record["amount_cents"])),
+            "payer": record["payer"] or "",
+            "payee": record["payee"] or "",
+            "payment_type": record["payment_type"] or "",
+            "category": record["category"],
+            "subcategory": record["subcategory"] or "",
+            "notes": record["notes"] or "",
+            "tags": ",".join(record["tags"]),
+        }
+        for record in generate_records(rng, count)
+    ]
+
+
+_CUMULATIVE_WEIGHTS: Dict[int, List[float]] = {}
+
+
+def _weighted(rng: random.Random, values: Sequence[str], count: int) -> List[str]:
+    weights = _CUMULATIVE_WEIGHTS.get(len(values))
+    if weights is None:
+        weights = list(
+            itertools.accumulate(1 / math.pow(rank, ZIPF_EXPONENT) for rank in range(1, len(values) + 1))
+        )
+        _CUMULATIVE_WEIGHTS[len(values)] = weights
+    return rng.choices(values, cum_weights=weights, k=count)
+
+
+def _tag_id(conn: sqlite3.Connection, name: str) -> int:
+    conn.execute("INSERT OR IGNORE INTO tags(name) VALUES (?)", (name,))
+    row = conn.execute("SELECT id FROM tags WHERE name = ?", (name,)).fetchone()
+    return int(row[0])
@@ -51,6 +51,9 @@ COLUMN_LABELS = {
     "tags": "Tags",
     "payment_type": "Payment type",
 }
+LABEL_TO_COLUMN = {label: field for field, label in COLUMN_LABELS.items()}
+# Read by _format_tx_label for the edit selector, whatever columns are visible.
+EDIT_LABEL_COLUMNS = ["date_payment", "date_application", "amount_cents"]
 LEGACY_COLUMN_MAP = {field: COLUMN_LABELS[field] for field in COLUMN_ORDER}
 LEGACY_COLUMN_MAP["amount"] = COLUMN_LABELS["amount_cents"]
 
@@ -66,12 +69,13 @@ conn: Optional[sqlite3.Connection] = None
 try:
     conn = db.connect(st.session_state.db_path)
 
-    payer_options = queries.get_distinct_values(conn, "payer")
-    payee_options = queries.get_distinct_values(conn, "payee")
-    payment_type_options = queries.get_distinct_values(conn, "payment_type")
-    category_options = queries.get_distinct_values(conn, "category")
-    subcategory_pairs = queries.get_category_subcategory_pairs(conn)
-    tag_options = tags.list_tags(conn)
+    catalog = queries.dimension_catalog(conn)
+    payer_options = catalog.payers
+    payee_options = catalog.payees
+    payment_type_options = catalog.payment_types
+    category_options = catalog.categories
+    subcategory_pairs = catalog.category_subcategory_pairs
+    tag_options = catalog.tags
 
     search_query = st.text_input(
         "Search",
@@ -176,9 +180,12 @@ try:
             "include_missing_payment_type": include_missing_payment_type,
         }
 
-        transactions = queries.list_transactions(
-            conn,
-            filters,
+        cursor, _ = ui_widgets.page_cursor("tx_page", filters)
+        # Fetch only what the table shows; with no column picked the table shows them all.
+        visible_fields = [LABEL_TO_COLUMN[label] for label in visible_columns]
+        page_columns = visible_fields + EDIT_LABEL_COLUMNS if visible_fields else None
+        transactions, next_cursor = queries.list_transactions_page(
+            conn, filters, after=cursor, columns=page_columns
         )
 
     with table_container:
@@ -189,23 +196,17 @@ try:
         else:
             display_rows = []
             for row in transactions:
-                display_rows.append(
-                    {
-                        COLUMN_LABELS["id"]: row["id"],
-                        COLUMN_LABELS["date_payment"]: row["date_payment"],
-                        COLUMN_LABELS["date_application"]: row["date_application"],
-                        COLUMN_LABELS["payer"]: row["payer"] or "",
-                        COLUMN_LABELS["payee"]: row["payee"] or "",
-                        COLUMN_LABELS["amount_cents"]: amounts.format_cents(
-                            int(row["amount_cents"])
-                        ),
-                        COLUMN_LABELS["category"]: row["category"],
-                        COLUMN_LABELS["subcategory"]: row["subcategory"] or "",
-                        COLUMN_LABELS["notes"]: row["notes"] or "",
-                        COLUMN_LABELS["tags"]: row["tags"] or "",
-                        COLUMN_LABELS["payment_type"]: row["payment_type"] or "",
-                    }
-                )
+                # Rows hold only the visible columns (plus the edit label columns).
+                display_row = {}
+                for field in row.keys():
+                    if field == "amount_cents":
+                        value = amounts.format_cents(int(row[field]))
+                    elif field in ("id", "date_payment", "date_application", "category"):
+                        value = row[field]
+                    else:
+                        value = row[field] or ""
+                    display_row[COLUMN_LABELS[field]] = value
+                display_rows.append(display_row)
 
             ordered_columns = [col for col in all_columns if col in visible_columns]
             df = pd.DataFrame(display_rows)
@@ -214,7 +215,11 @@ try:
             display_columns = ordered_columns or list(df.columns)
             table_width = max(900, len(display_columns) * 140)
             st.dataframe(df, width=table_width, height=520)
-            st.caption("Default order is date_application desc, id desc; click column headers to sort.")
+            ui_widgets.page_controls("tx_page", next_cursor)
+            st.caption(
+                f"Default order is date_application desc, id desc, {queries.LIST_PAGE_SIZE} rows "
+                "per page; click column headers to sort the current page."
+            )
 
     st.divider()
     st.subheader("Add transaction")
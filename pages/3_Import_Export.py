@@ -5,7 +5,7 @@ from typing import Optional
 import sqlite3
 import streamlit as st
 
-from src import csv_io, db, queries, session_state, tags, ui_widgets
+from src import csv_io, db, queries, session_state, ui_widgets
 
 st.set_page_config(
     page_title="Import / Export",
@@ -151,12 +151,13 @@ try:
                             key="export_end_date",
                         )
 
-            payer_options = queries.get_distinct_values(conn, "payer")
-            payee_options = queries.get_distinct_values(conn, "payee")
-            payment_type_options = queries.get_distinct_values(conn, "payment_type")
-            category_options = queries.get_distinct_values(conn, "category")
-            subcategory_pairs = queries.get_category_subcategory_pairs(conn)
-            tag_options = tags.list_tags(conn)
+            catalog = queries.dimension_catalog(conn)
+            payer_options = catalog.payers
+            payee_options = catalog.payees
+            payment_type_options = catalog.payment_types
+            category_options = catalog.categories
+            subcategory_pairs = catalog.category_subcategory_pairs
+            tag_options = catalog.tags
 
             st.caption(
                 "Leave a filter empty to include all values. Select 'Missing (NULL)' to include "
@@ -186,24 +187,27 @@ try:
 
             tag_filter = ui_widgets.tags_filter("Tags", tag_options, key="export_tags")
 
+            filters = {
+                "date_field": date_field,
+                "date_start": start_date.isoformat(),
+                "date_end": end_date.isoformat(),
+                "payers": payer_filter,
+                "payees": payee_filter,
+                "payment_types": payment_type_filter,
+                "categories": category_filter,
+                "subcategory_pairs": subcategory_filter,
+                "tags": tag_filter,
+                "include_missing_payer": include_missing_payer,
+                "include_missing_payee": include_missing_payee,
+                "include_missing_payment_type": include_missing_payment_type,
+            }
+            if start_date <= end_date:
+                ui_widgets.transaction_summary(queries.summarize_transactions(conn, filters))
+
             if st.button("Generate export"):
                 if start_date > end_date:
                     st.error("Start date must be before end date.")
                 else:
-                    filters = {
-                        "date_field": date_field,
-                        "date_start": start_date.isoformat(),
-                        "date_end": end_date.isoformat(),
-                        "payers": payer_filter,
-                        "payees": payee_filter,
-                        "payment_types": payment_type_filter,
-                        "categories": category_filter,
-                        "subcategory_pairs": subcategory_filter,
-                        "tags": tag_filter,
-                        "include_missing_payer": include_missing_payer,
-                        "include_missing_payee": include_missing_payee,
-                        "include_missing_payment_type": include_missing_payment_type,
-                    }
                     rows = queries.list_transactions(conn, filters, sort_by=date_field)
                     csv_text = csv_io.export_to_csv(rows)
                     filename = csv_io.default_export_filename()
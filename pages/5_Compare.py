@@ -1,10 +1,11 @@
 import datetime as dt
 from typing import Dict, List, Optional, Tuple
 
+import pandas as pd
 import sqlite3
 import streamlit as st
 
-from src import comparison_engine, db, plotting, queries, session_state, tags, ui_widgets
+from src import amounts, comparison_engine, db, plotting, queries, session_state, ui_widgets
 from src.types import Group, Node, Period
 
 st.set_page_config(
@@ -19,6 +20,17 @@ ui_widgets.render_sidebar_nav()
 
 st.title("Compare")
 
+# Larger grids collapse their editors and switch to one grouped chart per group.
+EXPANDED_ITEM_LIMIT = 5
+NODE_COLUMN_LIMIT = 6
+
+ENGINE_LABELS = {
+    "In-memory arrays": comparison_engine.ENGINE_VECTORIZED,
+    "SQL single pass": comparison_engine.ENGINE_SINGLE_PASS,
+    "SQL per cell": comparison_engine.ENGINE_PER_CELL,
+    "SQL per cell (parallel)": comparison_engine.ENGINE_PARALLEL,
+}
+
 if not st.session_state.get("db_ready"):
     st.warning("Open or create a database from the Home page first.")
     st.stop()
@@ -101,6 +113,104 @@ def _comparison_signature(
     }
 
 
+def _results_state(
+    df,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    node_mode: str,
+    and_entries: List[Node],
+    or_entries: List[Node],
+    signature: Dict[str, object],
+    config: Dict[str, object],
+) -> Dict[str, object]:
+    return {
+        "df": df,
+        "mode": mode,
+        "period_order": [period.label for period in periods],
+        "node_order": (
+            [node.label for node in and_entries]
+            if node_mode == "and"
+            else [node.label for node in or_entries]
+        ),
+        "group_labels": [group.label for group in groups],
+        "signature": signature,
+        "config": config,
+    }
+
+
+def _render_drilldown(
+    conn: sqlite3.Connection,
+    comparison_inputs: Dict[str, object],
+    signature: Dict[str, object],
+) -> None:
+    # Loads the rows behind one cell a page at a time; pages stay in session state.
+    periods = {period.label: period for period in comparison_inputs["periods"]}
+    groups = {group.label: group for group in comparison_inputs["groups"]}
+    node_mode = comparison_inputs["node_mode"]
+    node_list = (
+        comparison_inputs["and_entries"] if node_mode == "and" else comparison_inputs["or_nodes"]
+    )
+    nodes = {node.label: node for node in node_list}
+    cols = st.columns(3)
+    with cols[0]:
+        period_label = st.selectbox("Period", list(periods), key="compare_drill_period")
+    with cols[1]:
+        group_label = st.selectbox("Group", list(groups), key="compare_drill_group")
+    with cols[2]:
+        node_label = st.selectbox("Node", list(nodes), key="compare_drill_node")
+    cell_key = {"cell": [period_label, group_label, node_label], **signature}
+
+    def load_page(drill: Dict[str, object]) -> None:
+        rows, cursor = comparison_engine.cell_transactions(
+            conn,
+            periods[period_label],
+            groups[group_label],
+            nodes[node_label],
+            comparison_inputs["mode"],
+            date_field=comparison_inputs["date_field"],
+            tags=comparison_inputs["and_tags"] if node_mode == "and" else None,
+            tag_match=comparison_inputs["tag_match"],
+            after=drill["cursor"],
+        )
+        drill["rows"].extend(
+            {
+                "Payment date": row["date_payment"],
+                "Application date": row["date_application"],
+                "Amount": amounts.format_cents(int(row["amount_cents"])),
+                "Payer": row["payer"],
+                "Payee": row["payee"],
+                "Payment type": row["payment_type"],
+                "Category": row["category"],
+                "Subcategory": row["subcategory"],
+                "Tags": row["tags"],
+                "Notes": row["notes"],
+            }
+            for row in rows
+        )
+        drill["cursor"] = cursor
+        st.session_state["compare_drilldown"] = drill
+
+    drill = st.session_state.get("compare_drilldown")
+    if drill is not None and drill["key"] != cell_key:
+        drill = None
+    if st.button("Show transactions", key="compare_drill_show"):
+        drill = {"key": cell_key, "rows": [], "cursor": None}
+        load_page(drill)
+    if drill is None:
+        return
+    if not drill["rows"]:
+        st.info("No transactions in this cell.")
+        return
+    st.caption(f"{len(drill['rows'])} transactions loaded.")
+    st.dataframe(drill["rows"], width="stretch", hide_index=True)
+    if drill["cursor"] is not None and st.button(
+        f"Load {comparison_engine.DRILLDOWN_PAGE_SIZE} more", key="compare_drill_more"
+    ):
+        load_page(drill)
+        st.rerun()
+
+
 def _metric_label(metric: str) -> str:
     return {
         "net_cents": "net",
@@ -114,11 +224,12 @@ conn: Optional[sqlite3.Connection] = None
 try:
     conn = db.connect(st.session_state.db_path)
 
-    payer_options = queries.get_distinct_values(conn, "payer")
-    payee_options = queries.get_distinct_values(conn, "payee")
-    category_options = queries.get_distinct_values(conn, "category")
-    subcategory_pairs = queries.get_category_subcategory_pairs(conn)
-    tag_options = tags.list_tags(conn)
+    catalog = queries.dimension_catalog(conn)
+    payer_options = catalog.payers
+    payee_options = catalog.payees
+    category_options = catalog.categories
+    subcategory_pairs = catalog.category_subcategory_pairs
+    tag_options = catalog.tags
 
     date_field_labels = {
         "Application date": "date_application",
@@ -148,7 +259,6 @@ try:
     period_count = st.number_input(
         "Number of periods",
         min_value=1,
-        max_value=5,
         value=1,
         step=1,
         key="compare_period_count",
@@ -157,7 +267,7 @@ try:
     periods: List[Period] = []
     period_errors: List[str] = []
     for idx in range(int(period_count)):
-        with st.expander(f"Period {idx + 1}", expanded=True):
+        with st.expander(f"Period {idx + 1}", expanded=period_count <= EXPANDED_ITEM_LIMIT):
             label_input = st.text_input(
                 "Label",
                 value=f"Period {idx + 1}",
@@ -226,7 +336,6 @@ try:
     group_count = st.number_input(
         "Number of groups",
         min_value=1,
-        max_value=5,
         value=1,
         step=1,
         key="compare_group_count",
@@ -234,7 +343,7 @@ try:
 
     groups: List[Group] = []
     for idx in range(int(group_count)):
-        with st.expander(f"Group {idx + 1}", expanded=True):
+        with st.expander(f"Group {idx + 1}", expanded=group_count <= EXPANDED_ITEM_LIMIT):
             label_input = st.text_input(
                 "Label",
                 value=f"Group {idx + 1}",
@@ -270,6 +379,31 @@ try:
     )
     mode = "matched_only" if mode_label == "perfect-match" else "role"
 
+    with st.expander("Engine", expanded=False):
+        engine_label = st.selectbox(
+            "Computation engine",
+            list(ENGINE_LABELS.keys()),
+            index=0,
+            key="compare_engine",
+        )
+        st.caption(
+            "In-memory arrays load transactions once and reuse them until the database "
+            "changes, so editing groups or nodes does not re-query SQLite."
+        )
+        worker_count = comparison_engine.DEFAULT_WORKERS
+        if ENGINE_LABELS[engine_label] == comparison_engine.ENGINE_PARALLEL:
+            worker_count = int(
+                st.number_input(
+                    "Worker threads",
+                    min_value=1,
+                    max_value=32,
+                    value=comparison_engine.DEFAULT_WORKERS,
+                    step=1,
+                    key="compare_workers",
+                )
+            )
+    engine = ENGINE_LABELS[engine_label]
+
     st.subheader("Node selection")
     node_mode_label = st.radio(
         "Slice mode",
@@ -291,8 +425,6 @@ try:
             list(node_map.keys()),
             key="compare_and_nodes",
         )
-        if len(selected_labels) > 10:
-            st.error("Select at most 10 nodes.")
         and_entries = [node_map[label] for label in selected_labels]
 
         and_tags = ui_widgets.tags_filter("Tags", tag_options, key="compare_and_tags")
@@ -308,8 +440,6 @@ try:
             list(node_map.keys()),
             key="compare_or_nodes",
         )
-        if len(selected_labels) > 10:
-            st.error("Select at most 10 nodes.")
         or_entries = [node_map[label] for label in selected_labels]
 
     current_signature = _comparison_signature(
@@ -324,6 +454,18 @@ try:
         tag_match=tag_match,
     )
 
+    comparison_inputs = {
+        "periods": periods,
+        "groups": groups,
+        "mode": mode,
+        "node_mode": node_mode,
+        "date_field": date_field,
+        "or_nodes": or_entries,
+        "and_entries": and_entries,
+        "and_tags": and_tags,
+        "tag_match": tag_match,
+    }
+
     if st.button("Run comparison"):
         errors: List[str] = []
         if period_errors:
@@ -334,40 +476,70 @@ try:
             errors.append("Select at least one category/subcategory node.")
         if node_mode == "or" and not or_entries:
             errors.append("Select at least one node.")
-        if node_mode == "and" and len(and_entries) > 10:
-            errors.append("Reduce category/subcategory nodes to at most 10.")
-        if node_mode == "or" and len(or_entries) > 10:
-            errors.append("Reduce nodes to at most 10.")
 
         if errors:
             st.error(" ".join(errors))
         else:
-            df = comparison_engine.compute_comparison(
+            # Unchanged (period, group, node) cells are reused from the previous run.
+            previous = st.session_state.get("compare_results") or {}
+            config = comparison_engine.comparison_config(conn, **comparison_inputs)
+            # Periods stream in one at a time; show progress and the rows computed so far.
+            progress = st.progress(0.0, text="Computing comparison...")
+            partial = st.empty()
+            batches = []
+            done_periods = 0
+            for batch in comparison_engine.iter_comparison(
                 conn,
-                periods=periods,
-                groups=groups,
-                mode=mode,
-                node_mode=node_mode,
-                date_field=date_field,
-                or_nodes=or_entries,
-                and_entries=and_entries,
-                and_tags=and_tags,
-                tag_match=tag_match,
+                engine=engine,
+                workers=worker_count,
+                previous=previous.get("df"),
+                previous_config=previous.get("config"),
+                **comparison_inputs,
+            ):
+                batches.append(batch)
+                done_periods += batch["period_label"].nunique()
+                progress.progress(
+                    min(1.0, done_periods / len(periods)),
+                    text=f"Computed {done_periods} of {len(periods)} periods",
+                )
+                if done_periods < len(periods):
+                    partial.dataframe(pd.concat(batches, ignore_index=True), hide_index=True)
+            progress.empty()
+            partial.empty()
+            df = (
+                pd.concat(batches, ignore_index=True)
+                if batches
+                else comparison_engine.compute_comparison(conn, **comparison_inputs)
+            )
+            st.session_state["compare_results"] = _results_state(
+                df,
+                periods,
+                groups,
+                mode,
+                node_mode,
+                and_entries,
+                or_entries,
+                current_signature,
+                config,
             )
-            st.session_state["compare_results"] = {
-                "df": df,
-                "mode": mode,
-                "period_order": [period.label for period in periods],
-                "node_order": (
-                    [node.label for node in and_entries]
-                    if node_mode == "and"
-                    else [node.label for node in or_entries]
-                ),
-                "group_labels": [group.label for group in groups],
-                "signature": current_signature,
-            }
 
     results = st.session_state.get("compare_results")
+    if (results is None or results["signature"] != current_signature) and not period_errors:
+        # Configurations computed earlier (in any tab) are served from the engine cache.
+        cached_df = comparison_engine.cached_comparison(conn, **comparison_inputs)
+        if cached_df is not None:
+            results = _results_state(
+                cached_df,
+                periods,
+                groups,
+                mode,
+                node_mode,
+                and_entries,
+                or_entries,
+                current_signature,
+                comparison_engine.comparison_config(conn, **comparison_inputs),
+            )
+            st.session_state["compare_results"] = results
     if results is not None:
         if results["signature"] != current_signature:
             st.info("Selections changed since last run. Click Run comparison to refresh.")
@@ -397,6 +569,16 @@ try:
                 st.markdown(f"### {group_label}")
                 if not node_order:
                     continue
+                if len(node_order) > NODE_COLUMN_LIMIT:
+                    chart = plotting.grouped_bar_chart(
+                        chart_df,
+                        group_label=group_label,
+                        value_field="metric_value",
+                        period_order=period_order,
+                        value_title=metric_label,
+                    )
+                    st.altair_chart(chart, width="stretch")
+                    continue
                 columns = st.columns(len(node_order))
                 for idx, (col, node_label) in enumerate(zip(columns, node_order)):
                     with col:
@@ -412,6 +594,74 @@ try:
                         )
                         st.altair_chart(chart, width="stretch")
 
+            st.subheader("Cell transactions")
+            if results["signature"] != current_signature:
+                st.caption("Run the comparison for the current selections to open its cells.")
+            else:
+                _render_drilldown(conn, comparison_inputs, current_signature)
+
+    st.subheader("Trend")
+    bucket_labels = {
+        "Day": comparison_engine.BUCKET_DAY,
+        "ISO week": comparison_engine.BUCKET_WEEK,
+        "Month": comparison_engine.BUCKET_MONTH,
+        "Quarter": comparison_engine.BUCKET_QUARTER,
+    }
+    bucket_label = st.selectbox(
+        "Bucket",
+        list(bucket_labels.keys()),
+        index=2,
+        key="compare_trend_bucket",
+    )
+    bucket = bucket_labels[bucket_label]
+    trend_signature = {"bucket": bucket, **current_signature}
+    if st.button("Run trend"):
+        if period_errors or not groups or not (and_entries if node_mode == "and" else or_entries):
+            st.error("Fix the period, group, and node selections first.")
+        else:
+            st.session_state["compare_trend"] = {
+                "df": comparison_engine.compute_time_series(
+                    conn, bucket=bucket, **comparison_inputs
+                ),
+                "mode": mode,
+                "node_order": (
+                    [node.label for node in and_entries]
+                    if node_mode == "and"
+                    else [node.label for node in or_entries]
+                ),
+                "group_labels": [group.label for group in groups],
+                "signature": trend_signature,
+            }
+
+    trend = st.session_state.get("compare_trend")
+    if trend is not None:
+        if trend["signature"] != trend_signature:
+            st.info("Selections changed since last trend. Click Run trend to refresh.")
+        trend_df = trend["df"]
+        if trend_df.empty:
+            st.info("No trend data generated.")
+        else:
+            if trend["mode"] == "matched_only":
+                trend_metric = "matched_flow_cents"
+            else:
+                trend_metric = st.selectbox(
+                    "Trend metric",
+                    ["net_cents", "inflow_cents", "outflow_cents"],
+                    key="compare_trend_metric",
+                )
+            trend_chart_df = trend_df.copy()
+            trend_chart_df["metric_value"] = trend_chart_df[trend_metric].astype(float) / 100.0
+            for group_label in trend["group_labels"]:
+                st.markdown(f"### {group_label}")
+                chart = plotting.time_series_line_chart(
+                    trend_chart_df,
+                    group_label=group_label,
+                    value_field="metric_value",
+                    node_order=trend["node_order"],
+                    value_title=_metric_label(trend_metric),
+                )
+                st.altair_chart(chart, width="stretch")
+
 finally:
     if conn is not None:
         conn.close()
@@ -215,13 +215,14 @@ conn: Optional[sqlite3.Connection] = None
 try:
     conn = db.connect(st.session_state.db_path)
 
-    payer_options = queries.get_distinct_values(conn, "payer")
-    payee_options = queries.get_distinct_values(conn, "payee")
-    payment_type_options = queries.get_distinct_values(conn, "payment_type")
-    category_options = queries.get_distinct_values(conn, "category")
-    subcategory_options = queries.get_distinct_values(conn, "subcategory")
-    subcategory_pairs = queries.get_category_subcategory_pairs(conn)
-    tag_options = tags.list_tags(conn)
+    catalog = queries.dimension_catalog(conn)
+    payer_options = catalog.payers
+    payee_options = catalog.payees
+    payment_type_options = catalog.payment_types
+    category_options = catalog.categories
+    subcategory_options = catalog.subcategories
+    subcategory_pairs = catalog.category_subcategory_pairs
+    tag_options = catalog.tags
 
     subcategory_map: Dict[str, List[str]] = {}
     for category_value, subcategory_value in subcategory_pairs:
@@ -339,12 +340,15 @@ try:
             "include_missing_payment_type": include_missing_payment_type,
         }
 
-        transactions = queries.list_transactions(conn, filters)
+        summary = queries.summarize_transactions(conn, filters)
+        cursor, page_number = ui_widgets.page_cursor("txp_page", filters)
+        transactions, next_cursor = queries.list_transactions_page(conn, filters, after=cursor)
 
     with table_container:
         if error_message:
             st.error(error_message)
         else:
+            ui_widgets.transaction_summary(summary)
             if not transactions:
                 st.info("No transactions match the current filters.")
             display_rows = [_editor_row(row) for row in transactions]
@@ -362,7 +366,7 @@ try:
                 field for field in COLUMN_ORDER if field in visible_fields
             ]
 
-            filter_sig = _filter_signature(filters)
+            filter_sig = (_filter_signature(filters), page_number)
             reset_needed = False
             if st.session_state.get("txp_filter_sig") != filter_sig:
                 reset_needed = True
@@ -433,8 +437,11 @@ try:
                 "Subcategory suggestions are global; save validates that each row's "
                 "subcategory matches its category."
             )
+            ui_widgets.page_controls("txp_page", next_cursor)
             st.caption(
-                "Default order is date_application desc, id desc; click column headers to sort."
+                f"Default order is date_application desc, id desc, {queries.LIST_PAGE_SIZE} rows "
+                "per page; click column headers to sort the current page. Unsaved edits are "
+                "discarded when changing pages."
             )
 
             if SELECT_COLUMN in edited_df_for_actions.columns:
@@ -1,23 +1,47 @@
-CREATE TABLE IF NOT EXISTS transactions (
+-- Lookup tables for the repeated text values. transaction_rows stores their ids and the
+-- transactions view joins the names back; a value exists only while a row uses it.
+CREATE TABLE IF NOT EXISTS payers (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE CHECK (length(trim(name)) > 0 AND name = lower(trim(name)))
+);
+
+CREATE TABLE IF NOT EXISTS payees (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE CHECK (length(trim(name)) > 0 AND name = lower(trim(name)))
+);
+
+CREATE TABLE IF NOT EXISTS payment_types (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE CHECK (length(trim(name)) > 0 AND name = lower(trim(name)))
+);
+
+CREATE TABLE IF NOT EXISTS categories (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE CHECK (length(trim(name)) > 0 AND name = lower(trim(name)))
+);
+
+CREATE TABLE IF NOT EXISTS subcategories (
+  id INTEGER PRIMARY KEY,
+  name TEXT NOT NULL UNIQUE CHECK (length(trim(name)) > 0 AND name = lower(trim(name)))
+);
+
+CREATE TABLE IF NOT EXISTS transaction_rows (
   id INTEGER PRIMARY KEY,
   date_payment TEXT NOT NULL,
   date_application TEXT NOT NULL,
   amount_cents INTEGER NOT NULL CHECK (amount_cents >= 0),
-  payer TEXT NULL,
-  payee TEXT NULL,
-  payment_type TEXT NULL,
-  category TEXT NOT NULL,
-  subcategory TEXT NULL,
+  payer_id INTEGER NULL REFERENCES payers(id),
+  payee_id INTEGER NULL REFERENCES payees(id),
+  payment_type_id INTEGER NULL REFERENCES payment_types(id),
+  category_id INTEGER NOT NULL REFERENCES categories(id),
+  subcategory_id INTEGER NULL REFERENCES subcategories(id),
   notes TEXT NULL,
-  CHECK (length(trim(category)) > 0 AND category = lower(trim(category))),
-  CHECK (payer IS NULL OR (length(trim(payer)) > 0 AND payer = lower(trim(payer)))),
-  CHECK (payee IS NULL OR (length(trim(payee)) > 0 AND payee = lower(trim(payee)))),
-  CHECK (
-    subcategory IS NULL OR (length(trim(subcategory)) > 0 AND subcategory = lower(trim(subcategory)))
-  ),
-  CHECK (
-    payment_type IS NULL OR (length(trim(payment_type)) > 0 AND payment_type = lower(trim(payment_type)))
-  ),
+  -- Sorted, comma-separated tag names; kept by the transaction_tags/tags triggers below.
+  tags_text TEXT NULL,
+  -- Days since 1970-01-01, for integer range filters and bucketing. Plain columns pinned
+  -- by CHECKs: SQLite never treats an index holding a generated column as covering.
+  date_payment_day INTEGER NOT NULL,
+  date_application_day INTEGER NOT NULL,
   CHECK (notes IS NULL OR length(trim(notes)) > 0),
   CHECK (
     date_payment GLOB '[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]' AND
@@ -27,30 +51,228 @@ CREATE TABLE IF NOT EXISTS transactions (
     date_application GLOB '[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]' AND
     date(date_application) IS NOT NULL AND date(date_application) = date_application
   ),
-  CHECK (payer IS NOT NULL OR payee IS NOT NULL),
-  CHECK (payer IS NULL OR payee IS NULL OR payer <> payee)
+  CHECK (payer_id IS NOT NULL OR payee_id IS NOT NULL),
+  CHECK (date_payment_day = CAST(julianday(date_payment) - 2440587.5 AS INTEGER)),
+  CHECK (date_application_day = CAST(julianday(date_application) - 2440587.5 AS INTEGER))
 );
 
+-- Listings and keyset pages sort by (day, id).
 CREATE INDEX IF NOT EXISTS idx_transactions_date_payment
-  ON transactions(date_payment);
+  ON transaction_rows(date_payment_day);
 
 CREATE INDEX IF NOT EXISTS idx_transactions_date_application
-  ON transactions(date_application);
+  ON transaction_rows(date_application_day);
+
+-- Covering indexes for comparison cells: date range or category + date range, with every
+-- column the aggregate reads, so cells are answered without touching the table.
+CREATE INDEX IF NOT EXISTS idx_transactions_application_cover
+  ON transaction_rows(date_application_day, category_id, subcategory_id, payer_id, payee_id, amount_cents);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_payment_cover
+  ON transaction_rows(date_payment_day, category_id, subcategory_id, payer_id, payee_id, amount_cents);
 
-CREATE INDEX IF NOT EXISTS idx_transactions_category
-  ON transactions(category);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_application_cover
+  ON transaction_rows(category_id, date_application_day, subcategory_id, payer_id, payee_id, amount_cents);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_category_payment_cover
+  ON transaction_rows(category_id, date_payment_day, subcategory_id, payer_id, payee_id, amount_cents);
 
 CREATE INDEX IF NOT EXISTS idx_transactions_subcategory
-  ON transactions(subcategory);
+  ON transaction_rows(subcategory_id);
 
 CREATE INDEX IF NOT EXISTS idx_transactions_payer
-  ON transactions(payer);
+  ON transaction_rows(payer_id);
 
 CREATE INDEX IF NOT EXISTS idx_transactions_payee
-  ON transactions(payee);
+  ON transaction_rows(payee_id);
 
 CREATE INDEX IF NOT EXISTS idx_transactions_payment_type
-  ON transactions(payment_type);
+  ON transaction_rows(payment_type_id);
+
+-- The names-based shape every reader uses, plus the lookup ids for filters that match
+-- through the id indexes. Writes through it go to transaction_rows via the INSTEAD OF
+-- triggers below; they add lookup values as needed (the id columns are ignored).
+CREATE VIEW IF NOT EXISTS transactions AS
+SELECT
+  transaction_rows.id AS id,
+  transaction_rows.date_payment AS date_payment,
+  transaction_rows.date_application AS date_application,
+  transaction_rows.amount_cents AS amount_cents,
+  payers.name AS payer,
+  payees.name AS payee,
+  payment_types.name AS payment_type,
+  categories.name AS category,
+  subcategories.name AS subcategory,
+  transaction_rows.notes AS notes,
+  transaction_rows.tags_text AS tags_text,
+  transaction_rows.date_payment_day AS date_payment_day,
+  transaction_rows.date_application_day AS date_application_day,
+  transaction_rows.payer_id AS payer_id,
+  transaction_rows.payee_id AS payee_id,
+  transaction_rows.payment_type_id AS payment_type_id,
+  transaction_rows.category_id AS category_id,
+  transaction_rows.subcategory_id AS subcategory_id
+FROM transaction_rows
+LEFT JOIN payers ON payers.id = transaction_rows.payer_id
+LEFT JOIN payees ON payees.id = transaction_rows.payee_id
+LEFT JOIN payment_types ON payment_types.id = transaction_rows.payment_type_id
+LEFT JOIN categories ON categories.id = transaction_rows.category_id
+LEFT JOIN subcategories ON subcategories.id = transaction_rows.subcategory_id;
+
+CREATE TRIGGER IF NOT EXISTS trg_transactions_insert
+INSTEAD OF INSERT ON transactions
+BEGIN
+  INSERT INTO payers (name) SELECT NEW.payer
+  WHERE NEW.payer IS NOT NULL AND NOT EXISTS (SELECT 1 FROM payers WHERE name = NEW.payer);
+  INSERT INTO payees (name) SELECT NEW.payee
+  WHERE NEW.payee IS NOT NULL AND NOT EXISTS (SELECT 1 FROM payees WHERE name = NEW.payee);
+  INSERT INTO payment_types (name) SELECT NEW.payment_type
+  WHERE NEW.payment_type IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM payment_types WHERE name = NEW.payment_type);
+  INSERT INTO categories (name) SELECT NEW.category
+  WHERE NEW.category IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM categories WHERE name = NEW.category);
+  INSERT INTO subcategories (name) SELECT NEW.subcategory
+  WHERE NEW.subcategory IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM subcategories WHERE name = NEW.subcategory);
+  INSERT INTO transaction_rows (
+    id, date_payment, date_application, amount_cents, payer_id, payee_id,
+    payment_type_id, category_id, subcategory_id, notes, tags_text,
+    date_payment_day, date_application_day
+  )
+  VALUES (
+    NEW.id, NEW.date_payment, NEW.date_application, NEW.amount_cents,
+    (SELECT id FROM payers WHERE name = NEW.payer),
+    (SELECT id FROM payees WHERE name = NEW.payee),
+    (SELECT id FROM payment_types WHERE name = NEW.payment_type),
+    (SELECT id FROM categories WHERE name = NEW.category),
+    (SELECT id FROM subcategories WHERE name = NEW.subcategory),
+    NEW.notes, NEW.tags_text,
+    CAST(julianday(NEW.date_payment) - 2440587.5 AS INTEGER),
+    CAST(julianday(NEW.date_application) - 2440587.5 AS INTEGER)
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transactions_update
+INSTEAD OF UPDATE ON transactions
+BEGIN
+  INSERT INTO payers (name) SELECT NEW.payer
+  WHERE NEW.payer IS NOT NULL AND NOT EXISTS (SELECT 1 FROM payers WHERE name = NEW.payer);
+  INSERT INTO payees (name) SELECT NEW.payee
+  WHERE NEW.payee IS NOT NULL AND NOT EXISTS (SELECT 1 FROM payees WHERE name = NEW.payee);
+  INSERT INTO payment_types (name) SELECT NEW.payment_type
+  WHERE NEW.payment_type IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM payment_types WHERE name = NEW.payment_type);
+  INSERT INTO categories (name) SELECT NEW.category
+  WHERE NEW.category IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM categories WHERE name = NEW.category);
+  INSERT INTO subcategories (name) SELECT NEW.subcategory
+  WHERE NEW.subcategory IS NOT NULL
+    AND NOT EXISTS (SELECT 1 FROM subcategories WHERE name = NEW.subcategory);
+  UPDATE transaction_rows
+  SET date_payment = NEW.date_payment,
+      date_application = NEW.date_application,
+      amount_cents = NEW.amount_cents,
+      payer_id = (SELECT id FROM payers WHERE name = NEW.payer),
+      payee_id = (SELECT id FROM payees WHERE name = NEW.payee),
+      payment_type_id = (SELECT id FROM payment_types WHERE name = NEW.payment_type),
+      category_id = (SELECT id FROM categories WHERE name = NEW.category),
+      subcategory_id = (SELECT id FROM subcategories WHERE name = NEW.subcategory),
+      notes = NEW.notes,
+      tags_text = NEW.tags_text,
+      date_payment_day = CAST(julianday(NEW.date_payment) - 2440587.5 AS INTEGER),
+      date_application_day = CAST(julianday(NEW.date_application) - 2440587.5 AS INTEGER)
+  WHERE id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transactions_delete
+INSTEAD OF DELETE ON transactions
+BEGIN
+  DELETE FROM transaction_rows WHERE id = OLD.id;
+END;
+
+-- payer <> payee compares names, which live in two tables, so triggers check it.
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_insert_parties
+BEFORE INSERT ON transaction_rows
+WHEN (SELECT name FROM payers WHERE id = NEW.payer_id)
+  = (SELECT name FROM payees WHERE id = NEW.payee_id)
+BEGIN
+  SELECT RAISE(ABORT, 'CHECK constraint failed: payer <> payee');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_update_parties
+BEFORE UPDATE OF payer_id, payee_id ON transaction_rows
+WHEN (SELECT name FROM payers WHERE id = NEW.payer_id)
+  = (SELECT name FROM payees WHERE id = NEW.payee_id)
+BEGIN
+  SELECT RAISE(ABORT, 'CHECK constraint failed: payer <> payee');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payers_update_parties
+BEFORE UPDATE OF name ON payers
+WHEN EXISTS (
+  SELECT 1
+  FROM transaction_rows
+  JOIN payees ON payees.id = transaction_rows.payee_id
+  WHERE transaction_rows.payer_id = NEW.id AND payees.name = NEW.name
+)
+BEGIN
+  SELECT RAISE(ABORT, 'CHECK constraint failed: payer <> payee');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payees_update_parties
+BEFORE UPDATE OF name ON payees
+WHEN EXISTS (
+  SELECT 1
+  FROM transaction_rows
+  JOIN payers ON payers.id = transaction_rows.payer_id
+  WHERE transaction_rows.payee_id = NEW.id AND payers.name = NEW.name
+)
+BEGIN
+  SELECT RAISE(ABORT, 'CHECK constraint failed: payer <> payee');
+END;
+
+-- Drop lookup values no row uses any more.
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_delete_prune
+AFTER DELETE ON transaction_rows
+BEGIN
+  DELETE FROM payers
+  WHERE id = OLD.payer_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE payer_id = OLD.payer_id);
+  DELETE FROM payees
+  WHERE id = OLD.payee_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE payee_id = OLD.payee_id);
+  DELETE FROM payment_types
+  WHERE id = OLD.payment_type_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE payment_type_id = OLD.payment_type_id);
+  DELETE FROM categories
+  WHERE id = OLD.category_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE category_id = OLD.category_id);
+  DELETE FROM subcategories
+  WHERE id = OLD.subcategory_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE subcategory_id = OLD.subcategory_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_update_prune
+AFTER UPDATE OF payer_id, payee_id, payment_type_id, category_id, subcategory_id
+ON transaction_rows
+BEGIN
+  DELETE FROM payers
+  WHERE id = OLD.payer_id AND OLD.payer_id IS NOT NEW.payer_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE payer_id = OLD.payer_id);
+  DELETE FROM payees
+  WHERE id = OLD.payee_id AND OLD.payee_id IS NOT NEW.payee_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE payee_id = OLD.payee_id);
+  DELETE FROM payment_types
+  WHERE id = OLD.payment_type_id AND OLD.payment_type_id IS NOT NEW.payment_type_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE payment_type_id = OLD.payment_type_id);
+  DELETE FROM categories
+  WHERE id = OLD.category_id AND OLD.category_id IS NOT NEW.category_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE category_id = OLD.category_id);
+  DELETE FROM subcategories
+  WHERE id = OLD.subcategory_id AND OLD.subcategory_id IS NOT NEW.subcategory_id
+    AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE subcategory_id = OLD.subcategory_id);
+END;
 
 CREATE TABLE IF NOT EXISTS tags (
   id INTEGER PRIMARY KEY,
@@ -66,7 +288,7 @@ CREATE TABLE IF NOT EXISTS transaction_tags (
   transaction_id INTEGER NOT NULL,
   tag_id INTEGER NOT NULL,
   PRIMARY KEY (transaction_id, tag_id),
-  FOREIGN KEY (transaction_id) REFERENCES transactions(id) ON DELETE CASCADE,
+  FOREIGN KEY (transaction_id) REFERENCES transaction_rows(id) ON DELETE CASCADE,
   FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
 );
 
@@ -75,3 +297,465 @@ CREATE INDEX IF NOT EXISTS idx_transaction_tags_transaction_id
 
 CREATE INDEX IF NOT EXISTS idx_transaction_tags_tag_id
   ON transaction_tags(tag_id);
+
+CREATE TABLE IF NOT EXISTS write_counter (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  value INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO write_counter (id, value) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_insert_write_counter
+AFTER INSERT ON transaction_rows
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_update_write_counter
+AFTER UPDATE ON transaction_rows
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_delete_write_counter
+AFTER DELETE ON transaction_rows
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+-- Lookup values only change on their own through a rename.
+CREATE TRIGGER IF NOT EXISTS trg_payers_update_write_counter
+AFTER UPDATE ON payers
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payees_update_write_counter
+AFTER UPDATE ON payees
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payment_types_update_write_counter
+AFTER UPDATE ON payment_types
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_categories_update_write_counter
+AFTER UPDATE ON categories
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_subcategories_update_write_counter
+AFTER UPDATE ON subcategories
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tags_insert_write_counter
+AFTER INSERT ON tags
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tags_update_write_counter
+AFTER UPDATE ON tags
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tags_delete_write_counter
+AFTER DELETE ON tags
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_insert_write_counter
+AFTER INSERT ON transaction_tags
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_update_write_counter
+AFTER UPDATE ON transaction_tags
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_delete_write_counter
+AFTER DELETE ON transaction_tags
+BEGIN
+  UPDATE write_counter SET value = value + 1 WHERE id = 1;
+END;
+
+-- Keyed by lookup ids, so a rename leaves the rollup untouched.
+CREATE TABLE IF NOT EXISTS monthly_rollup (
+  month TEXT NOT NULL,
+  date_field TEXT NOT NULL CHECK (date_field IN ('date_payment', 'date_application')),
+  category_id INTEGER NOT NULL,
+  subcategory_id INTEGER NULL,
+  payer_id INTEGER NULL,
+  payee_id INTEGER NULL,
+  tx_count INTEGER NOT NULL,
+  amount_cents INTEGER NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_monthly_rollup_key
+  ON monthly_rollup(
+    date_field, month, category_id, ifnull(subcategory_id, 0), ifnull(payer_id, 0),
+    ifnull(payee_id, 0)
+  );
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_insert_monthly_rollup
+AFTER INSERT ON transaction_rows
+BEGIN
+  INSERT INTO monthly_rollup (
+    month, date_field, category_id, subcategory_id, payer_id, payee_id, tx_count, amount_cents
+  )
+  VALUES
+    (
+      substr(NEW.date_payment, 1, 7), 'date_payment',
+      NEW.category_id, NEW.subcategory_id, NEW.payer_id, NEW.payee_id, 1, NEW.amount_cents
+    ),
+    (
+      substr(NEW.date_application, 1, 7), 'date_application',
+      NEW.category_id, NEW.subcategory_id, NEW.payer_id, NEW.payee_id, 1, NEW.amount_cents
+    )
+  ON CONFLICT (
+    date_field, month, category_id, ifnull(subcategory_id, 0), ifnull(payer_id, 0),
+    ifnull(payee_id, 0)
+  )
+  DO UPDATE SET
+    tx_count = tx_count + excluded.tx_count,
+    amount_cents = amount_cents + excluded.amount_cents;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_delete_monthly_rollup
+AFTER DELETE ON transaction_rows
+BEGIN
+  UPDATE monthly_rollup
+  SET tx_count = tx_count - 1, amount_cents = amount_cents - OLD.amount_cents
+  WHERE (
+      (date_field = 'date_payment' AND month = substr(OLD.date_payment, 1, 7))
+      OR (date_field = 'date_application' AND month = substr(OLD.date_application, 1, 7))
+    )
+    AND category_id = OLD.category_id
+    AND ifnull(subcategory_id, 0) = ifnull(OLD.subcategory_id, 0)
+    AND ifnull(payer_id, 0) = ifnull(OLD.payer_id, 0)
+    AND ifnull(payee_id, 0) = ifnull(OLD.payee_id, 0);
+  DELETE FROM monthly_rollup
+  WHERE tx_count = 0
+    AND (
+      (date_field = 'date_payment' AND month = substr(OLD.date_payment, 1, 7))
+      OR (date_field = 'date_application' AND month = substr(OLD.date_application, 1, 7))
+    )
+    AND category_id = OLD.category_id
+    AND ifnull(subcategory_id, 0) = ifnull(OLD.subcategory_id, 0)
+    AND ifnull(payer_id, 0) = ifnull(OLD.payer_id, 0)
+    AND ifnull(payee_id, 0) = ifnull(OLD.payee_id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_update_monthly_rollup
+AFTER UPDATE OF
+  date_payment, date_application, amount_cents, category_id, subcategory_id, payer_id, payee_id
+ON transaction_rows
+BEGIN
+  UPDATE monthly_rollup
+  SET tx_count = tx_count - 1, amount_cents = amount_cents - OLD.amount_cents
+  WHERE (
+      (date_field = 'date_payment' AND month = substr(OLD.date_payment, 1, 7))
+      OR (date_field = 'date_application' AND month = substr(OLD.date_application, 1, 7))
+    )
+    AND category_id = OLD.category_id
+    AND ifnull(subcategory_id, 0) = ifnull(OLD.subcategory_id, 0)
+    AND ifnull(payer_id, 0) = ifnull(OLD.payer_id, 0)
+    AND ifnull(payee_id, 0) = ifnull(OLD.payee_id, 0);
+  DELETE FROM monthly_rollup
+  WHERE tx_count = 0
+    AND (
+      (date_field = 'date_payment' AND month = substr(OLD.date_payment, 1, 7))
+      OR (date_field = 'date_application' AND month = substr(OLD.date_application, 1, 7))
+    )
+    AND category_id = OLD.category_id
+    AND ifnull(subcategory_id, 0) = ifnull(OLD.subcategory_id, 0)
+    AND ifnull(payer_id, 0) = ifnull(OLD.payer_id, 0)
+    AND ifnull(payee_id, 0) = ifnull(OLD.payee_id, 0);
+  INSERT INTO monthly_rollup (
+    month, date_field, category_id, subcategory_id, payer_id, payee_id, tx_count, amount_cents
+  )
+  VALUES
+    (
+      substr(NEW.date_payment, 1, 7), 'date_payment',
+      NEW.category_id, NEW.subcategory_id, NEW.payer_id, NEW.payee_id, 1, NEW.amount_cents
+    ),
+    (
+      substr(NEW.date_application, 1, 7), 'date_application',
+      NEW.category_id, NEW.subcategory_id, NEW.payer_id, NEW.payee_id, 1, NEW.amount_cents
+    )
+  ON CONFLICT (
+    date_field, month, category_id, ifnull(subcategory_id, 0), ifnull(payer_id, 0),
+    ifnull(payee_id, 0)
+  )
+  DO UPDATE SET
+    tx_count = tx_count + excluded.tx_count,
+    amount_cents = amount_cents + excluded.amount_cents;
+END;
+
+-- Append-only log of transaction_tags changes; the in-memory tag index replays it
+-- to stay current without rebuilding. Old entries are pruned automatically; AUTOINCREMENT
+-- keeps positions from being reused once the newest entries are gone.
+CREATE TABLE IF NOT EXISTS tag_changes (
+  seq INTEGER PRIMARY KEY AUTOINCREMENT,
+  transaction_id INTEGER NOT NULL,
+  tag_id INTEGER NOT NULL,
+  added INTEGER NOT NULL CHECK (added IN (0, 1))
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_insert_tag_changes
+AFTER INSERT ON transaction_tags
+BEGIN
+  INSERT INTO tag_changes (transaction_id, tag_id, added)
+  VALUES (NEW.transaction_id, NEW.tag_id, 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_delete_tag_changes
+AFTER DELETE ON transaction_tags
+BEGIN
+  INSERT INTO tag_changes (transaction_id, tag_id, added)
+  VALUES (OLD.transaction_id, OLD.tag_id, 0);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_update_tag_changes
+AFTER UPDATE ON transaction_tags
+BEGIN
+  INSERT INTO tag_changes (transaction_id, tag_id, added)
+  VALUES (OLD.transaction_id, OLD.tag_id, 0), (NEW.transaction_id, NEW.tag_id, 1);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tag_changes_prune
+AFTER INSERT ON tag_changes
+BEGIN
+  DELETE FROM tag_changes WHERE seq <= NEW.seq - 50000;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_insert_tags_text
+AFTER INSERT ON transaction_tags
+BEGIN
+  UPDATE transaction_rows
+  SET tags_text = (
+    SELECT GROUP_CONCAT(name, ',')
+    FROM (
+      SELECT tg.name AS name
+      FROM tags tg
+      JOIN transaction_tags tt ON tt.tag_id = tg.id
+      WHERE tt.transaction_id = NEW.transaction_id
+      ORDER BY tg.name
+    )
+  )
+  WHERE id = NEW.transaction_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_delete_tags_text
+AFTER DELETE ON transaction_tags
+BEGIN
+  UPDATE transaction_rows
+  SET tags_text = (
+    SELECT GROUP_CONCAT(name, ',')
+    FROM (
+      SELECT tg.name AS name
+      FROM tags tg
+      JOIN transaction_tags tt ON tt.tag_id = tg.id
+      WHERE tt.transaction_id = OLD.transaction_id
+      ORDER BY tg.name
+    )
+  )
+  WHERE id = OLD.transaction_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_update_tags_text
+AFTER UPDATE ON transaction_tags
+BEGIN
+  UPDATE transaction_rows
+  SET tags_text = (
+    SELECT GROUP_CONCAT(name, ',')
+    FROM (
+      SELECT tg.name AS name
+      FROM tags tg
+      JOIN transaction_tags tt ON tt.tag_id = tg.id
+      WHERE tt.transaction_id = OLD.transaction_id
+      ORDER BY tg.name
+    )
+  )
+  WHERE id = OLD.transaction_id;
+  UPDATE transaction_rows
+  SET tags_text = (
+    SELECT GROUP_CONCAT(name, ',')
+    FROM (
+      SELECT tg.name AS name
+      FROM tags tg
+      JOIN transaction_tags tt ON tt.tag_id = tg.id
+      WHERE tt.transaction_id = NEW.transaction_id
+      ORDER BY tg.name
+    )
+  )
+  WHERE id = NEW.transaction_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tags_update_tags_text
+AFTER UPDATE OF name ON tags
+BEGIN
+  UPDATE transaction_rows
+  SET tags_text = (
+    SELECT GROUP_CONCAT(name, ',')
+    FROM (
+      SELECT tg.name AS name
+      FROM tags tg
+      JOIN transaction_tags tt ON tt.tag_id = tg.id
+      WHERE tt.transaction_id = transaction_rows.id
+      ORDER BY tg.name
+    )
+  )
+  WHERE id IN (SELECT transaction_id FROM transaction_tags WHERE tag_id = NEW.id);
+END;
+
+-- Trigram full-text index over the searchable text columns; substring search reads it
+-- instead of scanning transactions. External content: rows come from the view.
+CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+  payer, payee, category, subcategory, notes, tags_text,
+  content = 'transactions', content_rowid = 'id', tokenize = 'trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_insert_fts
+AFTER INSERT ON transaction_rows
+BEGIN
+  INSERT INTO transactions_fts (rowid, payer, payee, category, subcategory, notes, tags_text)
+  VALUES (
+    NEW.id,
+    (SELECT name FROM payers WHERE id = NEW.payer_id),
+    (SELECT name FROM payees WHERE id = NEW.payee_id),
+    (SELECT name FROM categories WHERE id = NEW.category_id),
+    (SELECT name FROM subcategories WHERE id = NEW.subcategory_id),
+    NEW.notes,
+    NEW.tags_text
+  );
+END;
+
+-- The old entry is removed BEFORE the change, while the lookup values it names still
+-- exist (the prune triggers may delete them afterwards).
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_delete_fts
+BEFORE DELETE ON transaction_rows
+BEGIN
+  INSERT INTO transactions_fts (
+    transactions_fts, rowid, payer, payee, category, subcategory, notes, tags_text
+  )
+  VALUES (
+    'delete',
+    OLD.id,
+    (SELECT name FROM payers WHERE id = OLD.payer_id),
+    (SELECT name FROM payees WHERE id = OLD.payee_id),
+    (SELECT name FROM categories WHERE id = OLD.category_id),
+    (SELECT name FROM subcategories WHERE id = OLD.subcategory_id),
+    OLD.notes,
+    OLD.tags_text
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_update_fts_old
+BEFORE UPDATE OF payer_id, payee_id, category_id, subcategory_id, notes, tags_text
+ON transaction_rows
+BEGIN
+  INSERT INTO transactions_fts (
+    transactions_fts, rowid, payer, payee, category, subcategory, notes, tags_text
+  )
+  VALUES (
+    'delete',
+    OLD.id,
+    (SELECT name FROM payers WHERE id = OLD.payer_id),
+    (SELECT name FROM payees WHERE id = OLD.payee_id),
+    (SELECT name FROM categories WHERE id = OLD.category_id),
+    (SELECT name FROM subcategories WHERE id = OLD.subcategory_id),
+    OLD.notes,
+    OLD.tags_text
+  );
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_transaction_rows_update_fts_new
+AFTER UPDATE OF payer_id, payee_id, category_id, subcategory_id, notes, tags_text
+ON transaction_rows
+BEGIN
+  INSERT INTO transactions_fts (rowid, payer, payee, category, subcategory, notes, tags_text)
+  VALUES (
+    NEW.id,
+    (SELECT name FROM payers WHERE id = NEW.payer_id),
+    (SELECT name FROM payees WHERE id = NEW.payee_id),
+    (SELECT name FROM categories WHERE id = NEW.category_id),
+    (SELECT name FROM subcategories WHERE id = NEW.subcategory_id),
+    NEW.notes,
+    NEW.tags_text
+  );
+END;
+
+-- A rename rewrites the index entries of every row using the value.
+CREATE TRIGGER IF NOT EXISTS trg_payers_update_fts
+AFTER UPDATE OF name ON payers
+BEGIN
+  INSERT INTO transactions_fts (
+    transactions_fts, rowid, payer, payee, category, subcategory, notes, tags_text
+  )
+  SELECT 'delete', id, OLD.name, payee, category, subcategory, notes, tags_text
+  FROM transactions
+  WHERE id IN (SELECT id FROM transaction_rows WHERE payer_id = NEW.id);
+  INSERT INTO transactions_fts (rowid, payer, payee, category, subcategory, notes, tags_text)
+  SELECT id, payer, payee, category, subcategory, notes, tags_text
+  FROM transactions
+  WHERE id IN (SELECT id FROM transaction_rows WHERE payer_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_payees_update_fts
+AFTER UPDATE OF name ON payees
+BEGIN
+  INSERT INTO transactions_fts (
+    transactions_fts, rowid, payer, payee, category, subcategory, notes, tags_text
+  )
+  SELECT 'delete', id, payer, OLD.name, category, subcategory, notes, tags_text
+  FROM transactions
+  WHERE id IN (SELECT id FROM transaction_rows WHERE payee_id = NEW.id);
+  INSERT INTO transactions_fts (rowid, payer, payee, category, subcategory, notes, tags_text)
+  SELECT id, payer, payee, category, subcategory, notes, tags_text
+  FROM transactions
+  WHERE id IN (SELECT id FROM transaction_rows WHERE payee_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_categories_update_fts
+AFTER UPDATE OF name ON categories
+BEGIN
+  INSERT INTO transactions_fts (
+    transactions_fts, rowid, payer, payee, category, subcategory, notes, tags_text
+  )
+  SELECT 'delete', id, payer, payee, OLD.name, subcategory, notes, tags_text
+  FROM transactions
+  WHERE id IN (SELECT id FROM transaction_rows WHERE category_id = NEW.id);
+  INSERT INTO transactions_fts (rowid, payer, payee, category, subcategory, notes, tags_text)
+  SELECT id, payer, payee, category, subcategory, notes, tags_text
+  FROM transactions
+  WHERE id IN (SELECT id FROM transaction_rows WHERE category_id = NEW.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_subcategories_update_fts
+AFTER UPDATE OF name ON subcategories
+BEGIN
+  INSERT INTO transactions_fts (
+    transactions_fts, rowid, payer, payee, category, subcategory, notes, tags_text
+  )
+  SELECT 'delete', id, payer, payee, category, OLD.name, notes, tags_text
+  FROM transactions
+  WHERE id IN (SELECT id FROM transaction_rows WHERE subcategory_id = NEW.id);
+  INSERT INTO transactions_fts (rowid, payer, payee, category, subcategory, notes, tags_text)
+  SELECT id, payer, payee, category, subcategory, notes, tags_text
+  FROM transactions
+  WHERE id IN (SELECT id FROM transaction_rows WHERE subcategory_id = NEW.id);
+END;
+
+PRAGMA user_version = 10;
@@ -0,0 +1,147 @@
+import argparse
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src import comparison_engine, db, migrations, settings
+from src.types import Group, Node, Period
+
+# Configs in one run share one connection; the vectorized engine loads the transaction
+# arrays once per database state, so every config after the first reuses that scan.
+DEFAULT_ENGINE = comparison_engine.ENGINE_VECTORIZED
+CONFIG_KEYS = {
+    "mode",
+    "node_mode",
+    "date_field",
+    "periods",
+    "groups",
+    "or_nodes",
+    "and_entries",
+    "and_tags",
+    "tag_match",
+}
+
+
+def load_config(path: Path) -> Dict[str, object]:
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"{path.name}: invalid JSON ({exc})") from exc
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path.name}: expected a JSON object")
+    unknown = sorted(set(raw) - CONFIG_KEYS)
+    if unknown:
+        raise ValueError(f"{path.name}: unknown keys {', '.join(unknown)}")
+    try:
+        config = {
+            "mode": raw.get("mode", comparison_engine.MODE_ROLE),
+            "node_mode": raw.get("node_mode", comparison_engine.NODE_MODE_OR),
+            "date_field": raw.get("date_field", comparison_engine.DEFAULT_DATE_FIELD),
+            "periods": [Period(**item) for item in raw.get("periods", [])],
+            "groups": [Group(**item) for item in raw.get("groups", [])],
+            "or_nodes": [Node(**item) for item in raw.get("or_nodes", [])],
+            "and_entries": [Node(**item) for item in raw.get("and_entries", [])],
+            "and_tags": list(raw.get("and_tags", [])),
+            "tag_match": raw.get("tag_match", comparison_engine.TAG_MATCH_ANY),
+        }
+        validate_config(config)
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"{path.name}: {exc}") from exc
+    return config
+
+
+def validate_config(config: Dict[str, object]) -> None:
+    # Everything compute_comparison would reject, checked up front so one bad config
+    # stops the run before any CSV is written.
+    if not config["periods"]:
+        raise ValueError("At least one period is required")
+    if not config["groups"]:
+        raise ValueError("At least one group is required")
+    # compute_comparison falls back to the default date field; a config naming another
+    # field is a typo.
+    if config["date_field"] not in comparison_engine.DATE_FIELDS:
+        raise ValueError(f"Invalid date field: {config['date_field']}")
+    comparison_engine.validate_comparison(
+        config["periods"],
+        config["mode"],
+        config["node_mode"],
+        config["date_field"],
+        config["or_nodes"],
+        config["and_entries"],
+        config["and_tags"],
+        config["tag_match"],
+    )
+
+
+def run_config(
+    conn: sqlite3.Connection, config: Dict[str, object], engine: str = DEFAULT_ENGINE
+) -> pd.DataFrame:
+    validate_config(config)
+    return comparison_engine.compute_comparison(conn, engine=engine, **config)
+
+
+def run_directory(
+    conn: sqlite3.Connection,
+    config_dir: Path,
+    output_dir: Path,
+    engine: str = DEFAULT_ENGINE,
+) -> List[Path]:
+    if engine not in comparison_engine.ENGINES:
+        raise ValueError("Invalid engine")
+    config_paths = sorted(config_dir.glob("*.json"))
+    if not config_paths:
+        raise ValueError(f"No JSON configs in {config_dir}")
+    # Validate every config before computing anything so a typo fails fast.
+    configs = [(path, load_config(path)) for path in config_paths]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for path, config in configs:
+        try:
+            frame = run_config(conn, config, engine)
+        except ValueError as exc:
+            raise ValueError(f"{path.name}: {exc}") from exc
+        target = output_dir / f"{path.stem}.csv"
+        frame.to_csv(target, sep=";", index=False)
+        written.append(target)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run every comparison config (*.json) in a directory and write CSV results."
+    )
+    parser.add_argument("config_dir", type=Path)
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--db", default=settings.DEFAULT_DB_PATH, help="Finance DB path.")
+    parser.add_argument(
+        "--engine", default=DEFAULT_ENGINE, choices=sorted(comparison_engine.ENGINES)
+    )
+    args = parser.parse_args(argv)
+
+    db_path = Path(args.db).expanduser()
+    if not db_path.is_file():
+        print(f"Database not found: {db_path}", file=sys.stderr)
+        return 1
+    conn = db.connect(str(db_path))
+    try:
+        if not db.schema_is_valid(conn):
+            print(f"Invalid schema: {db_path}", file=sys.stderr)
+            return 1
+        migrations.migrate(conn)
+        written = run_directory(conn, args.config_dir, args.output_dir, args.engine)
+    except ValueError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+    for path in written:
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src import date_utils, db
+from src.types import Group, Node, Period
+
+DATE_FIELDS = ("date_payment", "date_application")
+TAG_MATCH_ALL = "ALL"
+
+_CACHE_LOCK = threading.Lock()
+_ARRAY_CACHE: Dict[str, "TransactionArrays"] = {}
+
+
+@dataclass(frozen=True)
+class EncodedColumn:
+    codes: np.ndarray
+    lookup: Dict[str, int]
+
+    def mask_for(self, values: Iterable[str], include_missing: bool = False) -> np.ndarray:
+        wanted = [self.lookup[value] for value in values if value in self.lookup]
+        mask = np.isin(self.codes, np.asarray(wanted, dtype=self.codes.dtype))
+        if include_missing:
+            mask |= self.codes < 0
+        return mask
+
+
+@dataclass(frozen=True)
+class TransactionArrays:
+    ids: np.ndarray
+    amount_cents: np.ndarray
+    days: Dict[str, np.ndarray]
+    day_order: Dict[str, np.ndarray]
+    sorted_days: Dict[str, np.ndarray]
+    payer: EncodedColumn
+    payee: EncodedColumn
+    category: EncodedColumn
+    subcategory: EncodedColumn
+    tag_rows: Dict[str, np.ndarray]
+    write_counter: int
+
+    @property
+    def size(self) -> int:
+        return int(self.ids.shape[0])
+
+    def tag_mask(self, tag: str) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        rows = self.tag_rows.get(tag)
+        if rows is not None:
+            mask[rows] = True
+        return mask
+
+
+def get_transaction_arrays(conn: sqlite3.Connection) -> TransactionArrays:
+    key = db.database_key(conn)
+    if key is None:
+        return load_transaction_arrays(conn)
+    counter = db.write_counter(conn)
+    with _CACHE_LOCK:
+        cached = _ARRAY_CACHE.get(key)
+    if cached is not None and cached.write_counter == counter:
+        return cached
+    arrays = load_transaction_arrays(conn)
+    # Inside a transaction the arrays may hold uncommitted rows, and a rollback hands their
+    # write counter value to the next commit, so they are used for this call but not shared.
+    if not conn.in_transaction:
+        with _CACHE_LOCK:
+            _ARRAY_CACHE[key] = arrays
+    return arrays
+
+
+def clear_cache() -> None:
+    with _CACHE_LOCK:
+        _ARRAY_CACHE.clear()
+
+
+def load_transaction_arrays(conn: sqlite3.Connection) -> TransactionArrays:
+    # Read the counter first: a concurrent write can only make the arrays newer than
+    # the counter they are cached under, which forces a reload on the next call.
+    counter = db.write_counter(conn)
+    frame = pd.read_sql_query(
+        """
+        SELECT
+            id,
+            amount_cents,
+            date_payment_day,
+            date_application_day,
+            payer_id,
+            payee_id,
+            category_id,
+            subcategory_id
+        FROM transaction_rows
+        ORDER BY id
+        """,
+        conn,
+    )
+    ids = frame["id"].to_numpy(dtype=np.int64)
+    days: Dict[str, np.ndarray] = {}
+    day_order: Dict[str, np.ndarray] = {}
+    sorted_days: Dict[str, np.ndarray] = {}
+    for field in DATE_FIELDS:
+        numbers = frame[f"{field}_day"].to_numpy(dtype=np.int64)
+        order = np.argsort(numbers, kind="stable")
+        days[field] = numbers
+        day_order[field] = order
+        sorted_days[field] = numbers[order]
+
+    tag_frame = pd.read_sql_query(
+        """
+        SELECT tt.transaction_id AS transaction_id, tg.name AS name
+        FROM transaction_tags tt
+        JOIN tags tg ON tg.id = tt.tag_id
+        """,
+        conn,
+    )
+    tag_rows: Dict[str, np.ndarray] = {}
+    if not tag_frame.empty:
+        positions = np.searchsorted(ids, tag_frame["transaction_id"].to_numpy(dtype=np.int64))
+        tag_frame = tag_frame.assign(position=positions)
+        for name, group in tag_frame.groupby("name"):
+            tag_rows[str(name)] = group["position"].to_numpy(dtype=np.int64)
+
+    return TransactionArrays(
+        ids=ids,
+        amount_cents=frame["amount_cents"].to_numpy(dtype=np.int64),
+        days=days,
+        day_order=day_order,
+        sorted_days=sorted_days,
+        payer=_encode(conn, frame["payer_id"], "payers"),
+        payee=_encode(conn, frame["payee_id"], "payees"),
+        category=_encode(conn, frame["category_id"], "categories"),
+        subcategory=_encode(conn, frame["subcategory_id"], "subcategories"),
+        tag_rows=tag_rows,
+        write_counter=counter,
+    )
+
+
+def compute_cell_totals(
+    arrays: TransactionArrays,
+    periods: List[Period],
+    groups: List[Group],
+    matched_only: bool,
+    date_field: str,
+    node_filters: List[Tuple[Node, List[str], str]],
+) -> List[Tuple[int, int, int, int]]:
+    if date_field not in DATE_FIELDS:
+        raise ValueError("Invalid date field")
+    group_masks = [
+        (
+            arrays.payer.mask_for(group.payers, group.include_missing_payer),
+            arrays.payee.mask_for(group.payees, group.include_missing_payee),
+        )
+        for group in groups
+    ]
+    node_masks = [_node_mask(arrays, node, tags, match) for node, tags, match in node_filters]
+
+    order = arrays.day_order[date_field]
+    sorted_days = arrays.sorted_days[date_field]
+    totals: List[Tuple[int, int, int, int]] = []
+    for period in periods:
+        start = np.searchsorted(sorted_days, date_utils.day_number(period.start_date), side="left")
+        end = np.searchsorted(sorted_days, date_utils.day_number(period.end_date), side="right")
+        rows = order[start:end]
+        amounts = arrays.amount_cents[rows]
+        period_nodes = [mask[rows] for mask in node_masks]
+        for payer_mask, payee_mask in group_masks:
+            payer_in_a = payer_mask[rows]
+            payee_in_b = payee_mask[rows]
+            for node_mask in period_nodes:
+                if matched_only:
+                    matched = node_mask & payer_in_a & payee_in_b
+                    totals.append(
+                        (
+                            int(np.count_nonzero(matched)),
+                            0,
+                            0,
+                            int(np.add.reduce(amounts, where=matched)),
+                        )
+                    )
+                    continue
+                inflow_mask = node_mask & payee_in_b
+                outflow_mask = node_mask & payer_in_a
+                totals.append(
+                    (
+                        int(np.count_nonzero(inflow_mask | outflow_mask)),
+                        int(np.add.reduce(amounts, where=inflow_mask)),
+                        int(np.add.reduce(amounts, where=outflow_mask)),
+                        0,
+                    )
+                )
+    return totals
+
+
+def _node_mask(
+    arrays: TransactionArrays, node: Node, tags: List[str], match: str
+) -> np.ndarray:
+    if node.kind in {"all", "all_categories", "all_tags"}:
+        mask = np.ones(arrays.size, dtype=bool)
+    elif node.kind == "category":
+        mask = arrays.category.mask_for([node.category or ""])
+    elif node.kind == "subcategory":
+        mask = arrays.category.mask_for([node.category or ""])
+        mask &= arrays.subcategory.mask_for([node.subcategory or ""])
+    elif node.kind == "tag":
+        mask = arrays.tag_mask(node.tag or "")
+    else:
+        raise ValueError("Unsupported node kind")
+    if not tags:
+        return mask
+    tag_masks = [arrays.tag_mask(tag) for tag in tags]
+    if match == TAG_MATCH_ALL:
+        combined = np.logical_and.reduce(tag_masks)
+    else:
+        combined = np.logical_or.reduce(tag_masks)
+    return mask & combined
+
+
+def _encode(conn: sqlite3.Connection, ids: pd.Series, table: str) -> EncodedColumn:
+    # The lookup ids already are the codes; NULL becomes -1.
+    codes = ids.fillna(-1).to_numpy(dtype=np.int32)
+    lookup = {
+        str(row[0]): int(row[1]) for row in conn.execute(f"SELECT name, id FROM {table}")
+    }
+    return EncodedColumn(codes=codes, lookup=lookup)
+
@@ -1,8 +1,15 @@
+import datetime as dt
+import json
+import os
 import sqlite3
-from typing import Iterable, List, Optional, Tuple
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pandas as pd
 
+from src import comparison_arrays, date_utils, db, selections, tag_index, values
 from src.types import Group, Node, Period
 
 MODE_ROLE = "role"
@@ -13,6 +20,42 @@ TAG_MATCH_ANY = "ANY"
 TAG_MATCH_ALL = "ALL"
 DATE_FIELDS = {"date_payment", "date_application"}
 DEFAULT_DATE_FIELD = "date_application"
+ENGINE_PER_CELL = "per_cell"
+ENGINE_SINGLE_PASS = "single_pass"
+ENGINE_VECTORIZED = "vectorized"
+ENGINE_PARALLEL = "parallel"
+ENGINES = {ENGINE_PER_CELL, ENGINE_SINGLE_PASS, ENGINE_VECTORIZED, ENGINE_PARALLEL}
+NODE_KINDS = {"all", "all_categories", "all_tags", "category", "subcategory", "tag"}
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+BUCKET_DAY = "day"
+BUCKET_WEEK = "week"
+BUCKET_MONTH = "month"
+BUCKET_QUARTER = "quarter"
+BUCKETS = (BUCKET_DAY, BUCKET_WEEK, BUCKET_MONTH, BUCKET_QUARTER)
+SNAPSHOT_ATTEMPTS = 3
+RESULT_CACHE_SIZE = 32
+DRILLDOWN_PAGE_SIZE = 50
+DRILLDOWN_COLUMNS = (
+    "id",
+    "date_payment",
+    "date_application",
+    "amount_cents",
+    "payer",
+    "payee",
+    "payment_type",
+    "category",
+    "subcategory",
+    "notes",
+)
+
+# Uncorrelated, so SQLite resolves the name once per statement and the id indexes apply.
+_LOOKUP_ID_SQL = {
+    column: f"(SELECT id FROM {table} WHERE name = ?)"
+    for column, table in values.DIMENSION_TABLES.items()
+}
+
+_RESULT_CACHE_LOCK = threading.Lock()
+_RESULT_CACHE: "OrderedDict[Tuple[str, str], Tuple[int, pd.DataFrame]]" = OrderedDict()
 
 
 def compute_comparison(
@@ -26,77 +69,1060 @@ def compute_comparison(
     and_entries: Optional[List[Node]] = None,
     and_tags: Optional[List[str]] = None,
     tag_match: str = TAG_MATCH_ANY,
+    engine: str = ENGINE_SINGLE_PASS,
+    use_cache: bool = True,
+    workers: Optional[int] = None,
+    previous: Optional[pd.DataFrame] = None,
+    previous_config: Optional[Dict[str, object]] = None,
 ) -> pd.DataFrame:
+    date_field, node_filters, slot, ready = _start_comparison(
+        conn, periods, groups, mode, node_mode, date_field, or_nodes, and_entries, and_tags,
+        tag_match, engine, use_cache, workers, previous, previous_config,
+    )
+    if not node_filters:
+        return _empty_frame()
+    if ready is not None:
+        return ready
+    result = _compute_frame(conn, periods, groups, mode, date_field, node_filters, engine, workers)
+    if slot is not None:
+        _cache_put(slot, result)
+    return result
+
+
+def iter_comparison(
+    conn: sqlite3.Connection,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    node_mode: str,
+    date_field: str = DEFAULT_DATE_FIELD,
+    or_nodes: Optional[List[Node]] = None,
+    and_entries: Optional[List[Node]] = None,
+    and_tags: Optional[List[str]] = None,
+    tag_match: str = TAG_MATCH_ANY,
+    engine: str = ENGINE_SINGLE_PASS,
+    use_cache: bool = True,
+    workers: Optional[int] = None,
+    previous: Optional[pd.DataFrame] = None,
+    previous_config: Optional[Dict[str, object]] = None,
+) -> Iterator[pd.DataFrame]:
+    # Streaming form of compute_comparison: yields one frame per period, in order, so
+    # callers can render progressively. Cached and incremental results arrive as a single
+    # frame; concatenating every frame gives the compute_comparison result.
+    date_field, node_filters, slot, ready = _start_comparison(
+        conn, periods, groups, mode, node_mode, date_field, or_nodes, and_entries, and_tags,
+        tag_match, engine, use_cache, workers, previous, previous_config,
+    )
+    if not node_filters:
+        return
+    if ready is not None:
+        yield ready
+        return
+
+    frames = []
+    for period in periods:
+        frame = _compute_frame(
+            conn, [period], groups, mode, date_field, node_filters, engine, workers
+        )
+        frames.append(frame)
+        yield frame
+    if slot is not None and frames:
+        _cache_put(slot, pd.concat(frames, ignore_index=True))
+
+
+def comparison_config(
+    conn: sqlite3.Connection,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    node_mode: str,
+    date_field: str = DEFAULT_DATE_FIELD,
+    or_nodes: Optional[List[Node]] = None,
+    and_entries: Optional[List[Node]] = None,
+    and_tags: Optional[List[str]] = None,
+    tag_match: str = TAG_MATCH_ANY,
+) -> Dict[str, object]:
+    # Describes a computed frame for a later incremental call: the canonical inputs
+    # plus the write counter the data was read at.
+    date_field, node_filters = _prepare_comparison(
+        mode, node_mode, date_field, or_nodes, and_entries, and_tags, tag_match
+    )
+    config = _config_parts(periods, groups, mode, date_field, node_filters)
+    # No counter for uncommitted state (see _cache_slot), so no later call reuses the frame.
+    config["write_counter"] = None if conn.in_transaction else db.write_counter(conn)
+    return config
+
+
+def validate_comparison(
+    periods: List[Period],
+    mode: str,
+    node_mode: str,
+    date_field: str = DEFAULT_DATE_FIELD,
+    or_nodes: Optional[List[Node]] = None,
+    and_entries: Optional[List[Node]] = None,
+    and_tags: Optional[List[str]] = None,
+    tag_match: str = TAG_MATCH_ANY,
+) -> None:
+    # Raises the ValueError compute_comparison would, without touching the database.
+    _, node_filters = _prepare_comparison(
+        mode, node_mode, date_field, or_nodes, and_entries, and_tags, tag_match
+    )
+    for node, _, _ in node_filters:
+        if node.kind not in NODE_KINDS:
+            raise ValueError("Unsupported node kind")
+    for period in periods:
+        date_utils.day_number(period.start_date)
+        date_utils.day_number(period.end_date)
+
+
+def cached_comparison(
+    conn: sqlite3.Connection,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    node_mode: str,
+    date_field: str = DEFAULT_DATE_FIELD,
+    or_nodes: Optional[List[Node]] = None,
+    and_entries: Optional[List[Node]] = None,
+    and_tags: Optional[List[str]] = None,
+    tag_match: str = TAG_MATCH_ANY,
+) -> Optional[pd.DataFrame]:
+    date_field, node_filters = _prepare_comparison(
+        mode, node_mode, date_field, or_nodes, and_entries, and_tags, tag_match
+    )
+    if not node_filters:
+        return None
+    slot = _cache_slot(conn, periods, groups, mode, date_field, node_filters)
+    if slot is None:
+        return None
+    return _cache_get(slot)
+
+
+def clear_result_cache() -> None:
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE.clear()
+
+
+def cell_transactions(
+    conn: sqlite3.Connection,
+    period: Period,
+    group: Group,
+    node: Node,
+    mode: str,
+    date_field: str = DEFAULT_DATE_FIELD,
+    tags: Optional[List[str]] = None,
+    tag_match: str = TAG_MATCH_ANY,
+    after: Optional[Tuple[str, int]] = None,
+    limit: int = DRILLDOWN_PAGE_SIZE,
+) -> Tuple[List[sqlite3.Row], Optional[Tuple[str, int]]]:
+    # One page of the transactions counted in a cell, ordered by (date, id). Returns the
+    # rows and the cursor for the next page (None on the last page).
+    if mode not in {MODE_ROLE, MODE_MATCHED_ONLY}:
+        raise ValueError("Invalid mode")
+    if limit < 1:
+        raise ValueError("Invalid page size")
+    date_field = _resolve_date_field(date_field)
+    # An AND entry without tags is the plain node, as in OR mode.
+    node_filter = _build_node_filters(NODE_MODE_AND, None, [node], tags, tag_match)[0]
+    _, node_sql, node_params = _custom_node(conn, *node_filter)
+    base_sql, params = _cell_base_sql(
+        conn, period, group, date_field, node_sql, node_params,
+        [_column_sql(column) for column in DRILLDOWN_COLUMNS]
+        + [f"t.{date_field}_day AS sort_day", "t.tags_text AS tags"],
+    )
+    side_sql = "payer_in_a AND payee_in_b" if mode == MODE_MATCHED_ONLY else "payer_in_a OR payee_in_b"
+    where_sql = f"({side_sql})"
+    if after is not None:
+        # The plain bound lets the date index skip earlier pages.
+        after_day = date_utils.day_number(after[0])
+        where_sql += " AND sort_day >= ? AND (sort_day, id) > (?, ?)"
+        params = params + [after_day, after_day, int(after[1])]
+    sql = (
+        f"SELECT {', '.join(DRILLDOWN_COLUMNS)}, tags FROM {base_sql} "
+        f"WHERE {where_sql} ORDER BY sort_day, id LIMIT ?"
+    )
+    # One extra row tells whether another page exists.
+    rows = db.fetch_all(conn, sql, params + [limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1][date_field], int(rows[-1]["id"]))
+
+
+def compute_time_series(
+    conn: sqlite3.Connection,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    node_mode: str,
+    bucket: str,
+    date_field: str = DEFAULT_DATE_FIELD,
+    or_nodes: Optional[List[Node]] = None,
+    and_entries: Optional[List[Node]] = None,
+    and_tags: Optional[List[str]] = None,
+    tag_match: str = TAG_MATCH_ANY,
+) -> pd.DataFrame:
+    if bucket not in BUCKETS:
+        raise ValueError("Invalid bucket")
+    date_field, node_filters = _prepare_comparison(
+        mode, node_mode, date_field, or_nodes, and_entries, and_tags, tag_match
+    )
+    if not node_filters or not periods or not groups:
+        return _empty_time_series_frame()
+    nodes = [_custom_node(conn, node, tags, match) for node, tags, match in node_filters]
+    period_ranges = [(period.start_date, period.end_date) for period in periods]
+
+    # Every bucket of every period, group and node comes from one scan grouped by the
+    # bucket start date plus the usual period/group/node flags.
+    combos = _bucket_combos(
+        conn,
+        "transaction_rows t",
+        _date_range_sql(date_field, period_ranges),
+        [_date_range_sql(date_field, [period_range]) for period_range in period_ranges],
+        groups,
+        nodes,
+        "COUNT(*)",
+        "t.amount_cents",
+        leading_column=f"{_bucket_start_sql(bucket, date_field)} AS bucket_start",
+    )
+    combos_by_bucket: Dict[str, List[tuple]] = {}
+    for combo in combos:
+        start = _bucket_floor(bucket, date_utils.EPOCH + dt.timedelta(days=int(combo[0])))
+        combos_by_bucket.setdefault(start.isoformat(), []).append(tuple(combo)[1:])
+
+    node_count = len(nodes)
+    node_flags = [list(range(len(periods))) for _ in range(node_count)]
+    bucket_totals: Dict[str, List[List[int]]] = {}
+    for bucket_start, bucket_combos in combos_by_bucket.items():
+        totals = [[0, 0, 0, 0] for _ in range(len(periods) * len(groups) * node_count)]
+        _accumulate_combos(
+            totals,
+            bucket_combos,
+            len(periods),
+            node_flags,
+            list(range(node_count)),
+            len(groups),
+            node_count,
+            mode,
+        )
+        bucket_totals[bucket_start] = totals
+
+    rows = []
+    empty = [0, 0, 0, 0]
+    for period_index, period in enumerate(periods):
+        for bucket_start in _bucket_starts(bucket, period.start_date, period.end_date):
+            totals = bucket_totals.get(bucket_start)
+            label = _bucket_label(bucket, bucket_start)
+            for group_index, group in enumerate(groups):
+                base = (period_index * len(groups) + group_index) * node_count
+                for node_index, (node_label, _, _) in enumerate(nodes):
+                    cell = totals[base + node_index] if totals else empty
+                    row = _cell_row(period, group, node_label, mode, *cell)
+                    row["bucket"] = label
+                    row["bucket_start"] = bucket_start
+                    rows.append(row)
+    if not rows:
+        return _empty_time_series_frame()
+    return pd.DataFrame(rows, columns=list(_empty_time_series_frame().columns))
+
+
+def _bucket_start_sql(bucket: str, date_field: str) -> str:
+    # Day number of the bucket's first day, by arithmetic on the stored day column.
+    # Quarters are grouped by month here and folded together by _bucket_floor.
+    day = f"t.{date_field}_day"
+    if bucket == BUCKET_DAY:
+        return day
+    if bucket == BUCKET_WEEK:
+        # Back to Monday; day 0 (1970-01-01) was a Thursday. The + 10 keeps it non-negative.
+        return f"{day} - ({day} % 7 + 10) % 7"
+    if bucket in {BUCKET_MONTH, BUCKET_QUARTER}:
+        return f"{day} - CAST(substr(t.{date_field}, 9, 2) AS INTEGER) + 1"
+    raise ValueError("Invalid bucket")
+
+
+def _bucket_starts(bucket: str, start_date: str, end_date: str) -> List[str]:
+    try:
+        start = dt.date.fromisoformat(start_date)
+        end = dt.date.fromisoformat(end_date)
+    except (TypeError, ValueError):
+        return []
+    current = _bucket_floor(bucket, start)
+    starts = []
+    while current <= end:
+        starts.append(current.isoformat())
+        current = _bucket_next(bucket, current)
+    return starts
+
+
+def _bucket_floor(bucket: str, value: dt.date) -> dt.date:
+    if bucket == BUCKET_WEEK:
+        return value - dt.timedelta(days=value.weekday())
+    if bucket == BUCKET_MONTH:
+        return value.replace(day=1)
+    if bucket == BUCKET_QUARTER:
+        return dt.date(value.year, (value.month - 1) // 3 * 3 + 1, 1)
+    return value
+
+
+def _bucket_next(bucket: str, value: dt.date) -> dt.date:
+    if bucket == BUCKET_WEEK:
+        return value + dt.timedelta(days=7)
+    if bucket == BUCKET_MONTH:
+        return _next_month(value)
+    if bucket == BUCKET_QUARTER:
+        return _next_month(_next_month(_next_month(value)))
+    return value + dt.timedelta(days=1)
+
+
+def _bucket_label(bucket: str, bucket_start: str) -> str:
+    value = dt.date.fromisoformat(bucket_start)
+    if bucket == BUCKET_WEEK:
+        iso_year, iso_week, _ = value.isocalendar()
+        return f"{iso_year}-W{iso_week:02d}"
+    if bucket == BUCKET_MONTH:
+        return bucket_start[:7]
+    if bucket == BUCKET_QUARTER:
+        return f"{value.year}-Q{(value.month - 1) // 3 + 1}"
+    return bucket_start
+
+
+def _empty_time_series_frame() -> pd.DataFrame:
+    columns = list(_empty_frame().columns)
+    return pd.DataFrame(columns=columns[:1] + ["bucket", "bucket_start"] + columns[1:])
+
+
+def _start_comparison(
+    conn: sqlite3.Connection,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    node_mode: str,
+    date_field: str,
+    or_nodes: Optional[List[Node]],
+    and_entries: Optional[List[Node]],
+    and_tags: Optional[List[str]],
+    tag_match: str,
+    engine: str,
+    use_cache: bool,
+    workers: Optional[int],
+    previous: Optional[pd.DataFrame],
+    previous_config: Optional[Dict[str, object]],
+) -> Tuple[str, List[Tuple[Node, List[str], str]], Optional[Tuple[str, str, int]], Optional[pd.DataFrame]]:
+    # The part of compute_comparison and iter_comparison before any full computation:
+    # validates the inputs, then returns (date field, node filters, cache slot for the new
+    # result, ready frame). The ready frame is a cached or incrementally computed result,
+    # or None when the caller has to compute; no node filters means an empty result.
+    if engine not in ENGINES:
+        raise ValueError("Invalid engine")
+    if workers is not None and workers < 1:
+        raise ValueError("Invalid worker count")
+    date_field, node_filters = _prepare_comparison(
+        mode, node_mode, date_field, or_nodes, and_entries, and_tags, tag_match
+    )
+    if not node_filters:
+        return date_field, node_filters, None, None
+
+    slot = _cache_slot(conn, periods, groups, mode, date_field, node_filters) if use_cache else None
+    if slot is not None:
+        cached = _cache_get(slot)
+        if cached is not None:
+            return date_field, node_filters, slot, cached
+    if previous is not None and previous_config is not None:
+        result = _compute_incremental(
+            conn, periods, groups, mode, date_field, node_filters, engine, workers,
+            previous, previous_config,
+        )
+        if result is not None:
+            if slot is not None:
+                _cache_put(slot, result)
+            return date_field, node_filters, slot, result
+    return date_field, node_filters, slot, None
+
+
+def _prepare_comparison(
+    mode: str,
+    node_mode: str,
+    date_field: str,
+    or_nodes: Optional[List[Node]],
+    and_entries: Optional[List[Node]],
+    and_tags: Optional[List[str]],
+    tag_match: str,
+) -> Tuple[str, List[Tuple[Node, List[str], str]]]:
     if mode not in {MODE_ROLE, MODE_MATCHED_ONLY}:
         raise ValueError("Invalid mode")
     if node_mode not in {NODE_MODE_OR, NODE_MODE_AND}:
         raise ValueError("Invalid node mode")
-
     date_field = _resolve_date_field(date_field)
+    node_filters = _build_node_filters(node_mode, or_nodes, and_entries, and_tags, tag_match)
+    return date_field, node_filters
+
+
+def _cache_slot(
+    conn: sqlite3.Connection,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    date_field: str,
+    node_filters: List[Tuple[Node, List[str], str]],
+) -> Optional[Tuple[str, str, int]]:
+    # In-memory databases have no stable identity across connections, so they are
+    # never cached. The write counter makes any committed write a cache miss. Inside a
+    # transaction the counter may include uncommitted writes; a rollback hands the same
+    # value to the next commit, so nothing is cached or served there.
+    key = db.database_key(conn)
+    if key is None or conn.in_transaction:
+        return None
+    signature = json.dumps(
+        _config_parts(periods, groups, mode, date_field, node_filters), sort_keys=True
+    )
+    return key, signature, db.write_counter(conn)
+
+
+def _config_parts(
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    date_field: str,
+    node_filters: List[Tuple[Node, List[str], str]],
+) -> Dict[str, object]:
+    return {
+        "periods": [_period_part(period) for period in periods],
+        "groups": [_group_part(group) for group in groups],
+        "mode": mode,
+        "date_field": date_field,
+        "nodes": [_node_part(node, tags, match) for node, tags, match in node_filters],
+    }
+
+
+def _period_part(period: Period) -> List[object]:
+    return [period.label, period.start_date, period.end_date]
+
+
+def _group_part(group: Group) -> List[object]:
+    return [
+        group.label,
+        sorted(group.payers),
+        sorted(group.payees),
+        group.include_missing_payer,
+        group.include_missing_payee,
+    ]
+
+
+def _node_part(node: Node, tags: List[str], match: str) -> List[object]:
+    return [
+        node.label,
+        node.kind,
+        node.category,
+        node.subcategory,
+        node.tag,
+        sorted(set(tags)),
+        match if tags else TAG_MATCH_ANY,
+    ]
+
+
+def _compute_frame(
+    conn: sqlite3.Connection,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    date_field: str,
+    node_filters: List[Tuple[Node, List[str], str]],
+    engine: str,
+    workers: Optional[int],
+) -> pd.DataFrame:
+    if engine == ENGINE_VECTORIZED:
+        arrays = comparison_arrays.get_transaction_arrays(conn)
+        totals = comparison_arrays.compute_cell_totals(
+            arrays, periods, groups, mode == MODE_MATCHED_ONLY, date_field, node_filters
+        )
+        labels = [node.label for node, _, _ in node_filters]
+        return pd.DataFrame(_rows_from_totals(periods, groups, labels, mode, totals))
+    nodes = [_custom_node(conn, node, tags, match) for node, tags, match in node_filters]
+    rollup_nodes = [node.kind != "tag" and not tags for node, tags, _ in node_filters]
+    families = None
+    if engine in {ENGINE_PER_CELL, ENGINE_PARALLEL}:
+        families = _node_families(conn, node_filters)
+    return _compute_for_custom_nodes(
+        conn, periods, groups, mode, date_field, nodes, engine, rollup_nodes, workers, families
+    )
+
+
+def _compute_incremental(
+    conn: sqlite3.Connection,
+    periods: List[Period],
+    groups: List[Group],
+    mode: str,
+    date_field: str,
+    node_filters: List[Tuple[Node, List[str], str]],
+    engine: str,
+    workers: Optional[int],
+    previous: pd.DataFrame,
+    previous_config: Dict[str, object],
+) -> Optional[pd.DataFrame]:
+    # Returns None when nothing can be reused and a full computation is needed.
+    if (
+        previous_config.get("mode") != mode
+        or previous_config.get("date_field") != date_field
+        or previous_config.get("write_counter") != db.write_counter(conn)
+    ):
+        return None
+    labels = (
+        [period.label for period in periods],
+        [group.label for group in groups],
+        [node.label for node, _, _ in node_filters],
+    )
+    if any(len(set(values)) != len(values) for values in labels):
+        return None
+
+    # Items are reusable only when their whole definition is unchanged, not just the label.
+    old_periods = _parts_by_label(previous_config, "periods")
+    old_groups = _parts_by_label(previous_config, "groups")
+    old_nodes = _parts_by_label(previous_config, "nodes")
+    kept_periods = [p for p in periods if old_periods.get(p.label) == _json(_period_part(p))]
+    kept_groups = [g for g in groups if old_groups.get(g.label) == _json(_group_part(g))]
+    kept_nodes = [
+        entry
+        for entry in node_filters
+        if old_nodes.get(entry[0].label) == _json(_node_part(*entry))
+    ]
+    if not kept_periods or not kept_groups or not kept_nodes:
+        return None
+
+    kept_period_labels = {period.label for period in kept_periods}
+    kept_group_labels = {group.label for group in kept_groups}
+    kept_node_labels = {node.label for node, _, _ in kept_nodes}
+    new_periods = [p for p in periods if p.label not in kept_period_labels]
+    new_groups = [g for g in groups if g.label not in kept_group_labels]
+    new_nodes = [entry for entry in node_filters if entry[0].label not in kept_node_labels]
+
+    rows: Dict[Tuple[str, str, str], dict] = {}
+    for row in previous.to_dict("records"):
+        key = (row["period_label"], row["group_label"], row["node_label"])
+        if key[0] in kept_period_labels and key[1] in kept_group_labels and key[2] in kept_node_labels:
+            rows[key] = row
+    # Missing cells form at most three rectangular blocks.
+    blocks = [
+        (new_periods, groups, node_filters),
+        (kept_periods, new_groups, node_filters),
+        (kept_periods, kept_groups, new_nodes),
+    ]
+    for block_periods, block_groups, block_nodes in blocks:
+        if not block_periods or not block_groups or not block_nodes:
+            continue
+        frame = _compute_frame(
+            conn, block_periods, block_groups, mode, date_field, block_nodes, engine, workers
+        )
+        for row in frame.to_dict("records"):
+            rows[(row["period_label"], row["group_label"], row["node_label"])] = row
+
+    ordered = []
+    for period in periods:
+        for group in groups:
+            for node, _, _ in node_filters:
+                row = rows.get((period.label, group.label, node.label))
+                if row is None:
+                    return None
+                ordered.append(row)
+    return pd.DataFrame(ordered, columns=list(_empty_frame().columns))
+
+
+def _parts_by_label(config: Dict[str, object], name: str) -> Dict[str, List[object]]:
+    parts = config.get(name)
+    if not isinstance(parts, list):
+        return {}
+    return {part[0]: _json(list(part)) for part in parts}
+
+
+def _json(value: List[object]) -> List[object]:
+    # Normalizes a part the same way a JSON round-trip of the stored config would.
+    return json.loads(json.dumps(value))
+
+
+def _cache_get(slot: Tuple[str, str, int]) -> Optional[pd.DataFrame]:
+    key, signature, counter = slot
+    with _RESULT_CACHE_LOCK:
+        entry = _RESULT_CACHE.get((key, signature))
+        if entry is None:
+            return None
+        if entry[0] != counter:
+            del _RESULT_CACHE[(key, signature)]
+            return None
+        _RESULT_CACHE.move_to_end((key, signature))
+        return entry[1].copy()
+
+
+def _cache_put(slot: Tuple[str, str, int], frame: pd.DataFrame) -> None:
+    key, signature, counter = slot
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE[(key, signature)] = (counter, frame.copy())
+        _RESULT_CACHE.move_to_end((key, signature))
+        while len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+            _RESULT_CACHE.popitem(last=False)
+
 
+def _build_node_filters(
+    node_mode: str,
+    or_nodes: Optional[List[Node]],
+    and_entries: Optional[List[Node]],
+    and_tags: Optional[List[str]],
+    tag_match: str,
+) -> List[Tuple[Node, List[str], str]]:
     if node_mode == NODE_MODE_OR:
-        nodes = or_nodes or []
-        return _compute_for_nodes(conn, periods, groups, mode, date_field, nodes)
+        return [(node, [], TAG_MATCH_ANY) for node in (or_nodes or [])]
 
     entries = and_entries or []
     if not entries:
-        return _empty_frame()
-
+        return []
     tag_list = [tag.strip().lower() for tag in (and_tags or []) if tag.strip()]
-    tag_sql, tag_params = _build_tag_filter(tag_list, tag_match)
-
-    nodes: List[Tuple[str, str, List[object]]] = []
-    for entry in entries:
-        node_sql, node_params = _build_node_predicate(entry)
-        if tag_sql == "1":
-            combined_sql = node_sql
-            combined_params = node_params
-        else:
-            combined_sql = f"({node_sql}) AND ({tag_sql})"
-            combined_params = node_params + tag_params
-        nodes.append((entry.label, combined_sql, combined_params))
+    if tag_list and tag_match not in {TAG_MATCH_ANY, TAG_MATCH_ALL}:
+        raise ValueError("Invalid tag match")
+    return [(entry, tag_list, tag_match) for entry in entries]
+
+
+def _custom_node(
+    conn: sqlite3.Connection, node: Node, tags: List[str], match: str
+) -> Tuple[str, str, List[object]]:
+    node_sql, node_params = _build_node_predicate(conn, node)
+    tag_sql, tag_params = _build_tag_filter(conn, tags, match)
+    if tag_sql == "1":
+        return node.label, node_sql, node_params
+    return node.label, f"({node_sql}) AND ({tag_sql})", node_params + tag_params
 
-    return _compute_for_custom_nodes(conn, periods, groups, mode, date_field, nodes)
 
+def _node_families(
+    conn: sqlite3.Connection, node_filters: List[Tuple[Node, List[str], str]]
+) -> List[Tuple[str, List[object], List[Tuple[int, Optional[str]]]]]:
+    # Category and subcategory nodes of one category (same tag filter) form a family:
+    # a single query grouped by subcategory answers every member, and the category
+    # total is the sum of its subcategory groups (including NULL).
+    members_by_key: Dict[str, List[Tuple[int, Optional[str]]]] = {}
+    family_nodes: Dict[str, Tuple[Node, List[str], str]] = {}
+    for index, (node, tags, match) in enumerate(node_filters):
+        if node.kind not in {"category", "subcategory"}:
+            continue
+        key = json.dumps([node.category, sorted(tags), match if tags else ""])
+        subcategory = node.subcategory if node.kind == "subcategory" else None
+        members_by_key.setdefault(key, []).append((index, subcategory))
+        family_nodes[key] = (Node(label="", kind="category", category=node.category), tags, match)
+    families = []
+    for key, members in members_by_key.items():
+        if len(members) < 2:
+            continue
+        _, family_sql, family_params = _custom_node(conn, *family_nodes[key])
+        families.append((family_sql, family_params, members))
+    return families
 
-def _compute_for_nodes(
+
+def _compute_for_custom_nodes(
     conn: sqlite3.Connection,
     periods: List[Period],
     groups: List[Group],
     mode: str,
     date_field: str,
-    nodes: List[Node],
+    nodes: List[Tuple[str, str, List[object]]],
+    engine: str = ENGINE_SINGLE_PASS,
+    rollup_nodes: Optional[List[bool]] = None,
+    workers: Optional[int] = None,
+    families: Optional[List[Tuple[str, List[object], List[Tuple[int, Optional[str]]]]]] = None,
 ) -> pd.DataFrame:
     if not nodes:
         return _empty_frame()
 
-    custom_nodes = []
-    for node in nodes:
-        node_sql, node_params = _build_node_predicate(node)
-        custom_nodes.append((node.label, node_sql, node_params))
-    return _compute_for_custom_nodes(conn, periods, groups, mode, date_field, custom_nodes)
+    if engine == ENGINE_SINGLE_PASS:
+        totals = _single_pass_totals(
+            conn, periods, groups, mode, date_field, nodes, rollup_nodes
+        )
+        labels = [node_label for node_label, _, _ in nodes]
+        return pd.DataFrame(_rows_from_totals(periods, groups, labels, mode, totals))
 
+    tasks = _cell_tasks(periods, groups, nodes, families or [])
+    cell_count = len(periods) * len(groups) * len(nodes)
+    if engine == ENGINE_PARALLEL:
+        rows = _parallel_cell_rows(
+            conn, tasks, cell_count, mode, date_field, workers or DEFAULT_WORKERS
+        )
+        if rows is not None:
+            return pd.DataFrame(rows)
 
-def _compute_for_custom_nodes(
+    results: Dict[int, dict] = {}
+    for task in tasks:
+        results.update(_run_cell_task(conn, task, mode, date_field))
+    return pd.DataFrame([results[index] for index in range(cell_count)])
+
+
+def _cell_tasks(
+    periods: List[Period],
+    groups: List[Group],
+    nodes: List[Tuple[str, str, List[object]]],
+    families: List[Tuple[str, List[object], List[Tuple[int, Optional[str]]]]],
+) -> List[tuple]:
+    # One task per query: (period, group, node sql, node params, grouped, members) where
+    # members are the (cell position, node label, subcategory) triples the query answers.
+    in_family = {index for _, _, members in families for index, _ in members}
+    tasks = []
+    for period_index, period in enumerate(periods):
+        for group_index, group in enumerate(groups):
+            base = (period_index * len(groups) + group_index) * len(nodes)
+            for node_index, (node_label, node_sql, node_params) in enumerate(nodes):
+                if node_index not in in_family:
+                    members = [(base + node_index, node_label, None)]
+                    tasks.append((period, group, node_sql, node_params, False, members))
+            for family_sql, family_params, family_members in families:
+                members = [
+                    (base + index, nodes[index][0], subcategory)
+                    for index, subcategory in family_members
+                ]
+                tasks.append((period, group, family_sql, family_params, True, members))
+    return tasks
+
+
+def _run_cell_task(
+    conn: sqlite3.Connection, task: tuple, mode: str, date_field: str
+) -> Dict[int, dict]:
+    period, group, node_sql, node_params, grouped, members = task
+    if grouped:
+        return _aggregate_family(
+            conn, period, group, mode, date_field, node_sql, node_params, members
+        )
+    position, node_label, _ = members[0]
+    return {
+        position: _aggregate_cell(
+            conn, period, group, mode, date_field, node_label, node_sql, node_params
+        )
+    }
+
+
+def _parallel_cell_rows(
+    conn: sqlite3.Connection,
+    tasks: List[tuple],
+    cell_count: int,
+    mode: str,
+    date_field: str,
+    workers: int,
+) -> Optional[List[dict]]:
+    # Returns None when the database cannot be reopened read-only (in-memory DBs);
+    # the caller then evaluates the cells serially on its own connection.
+    db_path = db.database_key(conn)
+    if db_path is None:
+        return None
+    worker_count = max(1, min(workers, len(tasks)))
+    chunks = [list(range(index, len(tasks), worker_count)) for index in range(worker_count)]
+
+    def run_chunk(indexes: List[int]) -> Tuple[int, Dict[int, dict]]:
+        worker_conn = db.connect(db_path, read_only=True)
+        try:
+            # The first read inside BEGIN pins this connection's WAL snapshot.
+            worker_conn.execute("BEGIN")
+            counter = db.write_counter(worker_conn)
+            results: Dict[int, dict] = {}
+            for index in indexes:
+                results.update(_run_cell_task(worker_conn, tasks[index], mode, date_field))
+            worker_conn.rollback()
+            return counter, results
+        finally:
+            worker_conn.close()
+
+    # Workers read in separate transactions; equal write counters mean they all saw
+    # the same committed state, otherwise a write slipped in and the run is repeated.
+    with ThreadPoolExecutor(max_workers=worker_count) as pool:
+        for _ in range(SNAPSHOT_ATTEMPTS):
+            outcomes = list(pool.map(run_chunk, chunks))
+            if len({counter for counter, _ in outcomes}) == 1:
+                rows: Dict[int, dict] = {}
+                for _, results in outcomes:
+                    rows.update(results)
+                return [rows[index] for index in range(cell_count)]
+    return None
+
+
+def _single_pass_totals(
     conn: sqlite3.Connection,
     periods: List[Period],
     groups: List[Group],
     mode: str,
     date_field: str,
     nodes: List[Tuple[str, str, List[object]]],
-) -> pd.DataFrame:
-    if not nodes:
-        return _empty_frame()
+    rollup_nodes: Optional[List[bool]] = None,
+) -> List[Tuple[int, int, int, int]]:
+    if not periods or not groups or not nodes:
+        return []
+    date_field = _resolve_date_field(date_field)
+    node_count = len(nodes)
+    eligible = list(rollup_nodes) if rollup_nodes else [False] * node_count
+    splits = [_split_full_months(period) if any(eligible) else None for period in periods]
+    totals = [[0, 0, 0, 0] for _ in range(len(periods) * len(groups) * node_count)]
+
+    # Raw scan: nodes that cannot use the rollup see each full period, rollup nodes
+    # only see the partial-month edges the rollup does not cover (if there are any).
+    period_count = len(periods)
+    edge_ranges = [
+        split[1] if split else [(period.start_date, period.end_date)]
+        for period, split in zip(periods, splits)
+    ]
+    has_edges = any(edge_ranges)
+    raw_indexes = [k for k in range(node_count) if not eligible[k] or has_edges]
+    period_flags: List[Tuple[str, List[object]]] = []
+    full_positions: List[int] = []
+    edge_positions: List[int] = []
+    if not all(eligible):
+        full_positions = list(range(period_count))
+        period_flags.extend(
+            _date_range_sql(date_field, [(p.start_date, p.end_date)]) for p in periods
+        )
+    if any(eligible) and has_edges:
+        edge_positions = list(range(len(period_flags), len(period_flags) + period_count))
+        period_flags.extend(_date_range_sql(date_field, ranges) for ranges in edge_ranges)
+    if raw_indexes:
+        if full_positions:
+            raw_ranges = [(period.start_date, period.end_date) for period in periods]
+        else:
+            raw_ranges = [item for ranges in edge_ranges for item in ranges]
+        combos = _bucket_combos(
+            conn,
+            "transaction_rows t",
+            _date_range_sql(date_field, raw_ranges),
+            period_flags,
+            groups,
+            [nodes[k] for k in raw_indexes],
+            "COUNT(*)",
+            "t.amount_cents",
+        )
+        _accumulate_combos(
+            totals,
+            combos,
+            len(period_flags),
+            [edge_positions if eligible[k] else full_positions for k in raw_indexes],
+            raw_indexes,
+            len(groups),
+            node_count,
+            mode,
+        )
+
+    # Rollup pass: whole months inside each period come from monthly_rollup, which
+    # only carries the columns category/subcategory nodes and groups filter on.
+    rollup_indexes = [k for k in range(node_count) if eligible[k]]
+    month_ranges = [split[0] for split in splits if split]
+    if rollup_indexes and month_ranges:
+        month_flags = []
+        month_positions = []
+        for split in splits:
+            if split:
+                month_positions.append(len(month_flags))
+                month_flags.append(_month_range_sql([split[0]]))
+            else:
+                month_positions.append(-1)
+        month_where, month_params = _month_range_sql(month_ranges)
+        combos = _bucket_combos(
+            conn,
+            "monthly_rollup t",
+            (f"t.date_field = ? AND ({month_where})", [date_field] + month_params),
+            month_flags,
+            groups,
+            [nodes[k] for k in rollup_indexes],
+            "SUM(t.tx_count)",
+            "t.amount_cents",
+        )
+        _accumulate_combos(
+            totals,
+            combos,
+            len(month_flags),
+            [month_positions for _ in rollup_indexes],
+            rollup_indexes,
+            len(groups),
+            node_count,
+            mode,
+        )
+
+    return [tuple(cell) for cell in totals]
+
+
+def _bucket_combos(
+    conn: sqlite3.Connection,
+    source: str,
+    where: Tuple[str, List[object]],
+    period_flags: List[Tuple[str, List[object]]],
+    groups: List[Group],
+    nodes: List[Tuple[str, str, List[object]]],
+    count_sql: str,
+    amount_column: str,
+    leading_column: Optional[str] = None,
+) -> List[sqlite3.Row]:
+    # One bucket flag per period, group side and node; GROUP BY collapses the scan
+    # into one row per distinct flag combination.
+    selections.trim(conn)
+    columns: List[str] = [leading_column] if leading_column else []
+    params: List[object] = []
+    for index, (flag_sql, flag_params) in enumerate(period_flags):
+        columns.append(f"CASE WHEN {flag_sql} THEN 1 ELSE 0 END AS p{index}")
+        params.extend(flag_params)
+    for index, group in enumerate(groups):
+        payer_sql, payer_params = selections.lookup_in_sql(
+            conn, "payer", group.payers, group.include_missing_payer
+        )
+        payee_sql, payee_params = selections.lookup_in_sql(
+            conn, "payee", group.payees, group.include_missing_payee
+        )
+        columns.append(f"CASE WHEN {payer_sql} THEN 1 ELSE 0 END AS a{index}")
+        columns.append(f"CASE WHEN {payee_sql} THEN 1 ELSE 0 END AS b{index}")
+        params.extend(payer_params + payee_params)
+    for index, (_, node_sql, node_params) in enumerate(nodes):
+        columns.append(f"CASE WHEN ({node_sql}) THEN 1 ELSE 0 END AS n{index}")
+        params.extend(node_params)
+
+    where_sql, where_params = where
+    params.extend(where_params)
+    bucket_positions = ", ".join(str(index) for index in range(1, len(columns) + 1))
+    sql = (
+        "SELECT "
+        + ", ".join(columns)
+        + f", {count_sql} AS tx_count, COALESCE(SUM({amount_column}), 0) AS amount_cents "
+        + f"FROM {source} WHERE {where_sql}"
+        + f" GROUP BY {bucket_positions}"
+    )
+    return db.fetch_all(conn, sql, params)
+
+
+def _accumulate_combos(
+    totals: List[List[int]],
+    combos: List[sqlite3.Row],
+    flag_count: int,
+    node_flags: List[List[int]],
+    node_indexes: List[int],
+    group_count: int,
+    node_total: int,
+    mode: str,
+) -> None:
+    # node_flags[j][p] is the flag column that places node j's rows in period p,
+    # or -1 when this query does not contribute to that period.
+    node_offset = flag_count + 2 * group_count
+    bucket_count = node_offset + len(node_indexes)
+    for combo in combos:
+        tx_count = int(combo[bucket_count])
+        amount = int(combo[bucket_count + 1])
+        active = []
+        for position, node_index in enumerate(node_indexes):
+            if not combo[node_offset + position]:
+                continue
+            for period_index, flag in enumerate(node_flags[position]):
+                if flag >= 0 and combo[flag]:
+                    active.append((period_index, node_index))
+        if not active:
+            continue
+        for group_index in range(group_count):
+            payer_in_a = bool(combo[flag_count + 2 * group_index])
+            payee_in_b = bool(combo[flag_count + 2 * group_index + 1])
+            if mode == MODE_MATCHED_ONLY:
+                if not (payer_in_a and payee_in_b):
+                    continue
+                delta = (tx_count, 0, 0, amount)
+            else:
+                if not (payer_in_a or payee_in_b):
+                    continue
+                delta = (
+                    tx_count,
+                    amount if payee_in_b else 0,
+                    amount if payer_in_a else 0,
+                    0,
+                )
+            for period_index, node_index in active:
+                cell = totals[(period_index * group_count + group_index) * node_total + node_index]
+                for slot in range(4):
+                    cell[slot] += delta[slot]
+
+
+def _split_full_months(
+    period: Period,
+) -> Optional[Tuple[Tuple[str, str], List[Tuple[str, str]]]]:
+    try:
+        start = dt.date.fromisoformat(period.start_date)
+        end = dt.date.fromisoformat(period.end_date)
+    except (TypeError, ValueError):
+        return None
+    first = start if start.day == 1 else _next_month(start)
+    after_last = _next_month(end) if (end + dt.timedelta(days=1)).day == 1 else end.replace(day=1)
+    if first >= after_last:
+        return None
+    last = after_last - dt.timedelta(days=1)
+    edges: List[Tuple[str, str]] = []
+    if start < first:
+        edges.append((start.isoformat(), (first - dt.timedelta(days=1)).isoformat()))
+    if end > last:
+        edges.append((after_last.isoformat(), end.isoformat()))
+    return (first.isoformat()[:7], last.isoformat()[:7]), edges
+
 
+def _next_month(value: dt.date) -> dt.date:
+    if value.month == 12:
+        return dt.date(value.year + 1, 1, 1)
+    return dt.date(value.year, value.month + 1, 1)
+
+
+def _date_range_sql(date_field: str, ranges: List[Tuple[str, str]]) -> Tuple[str, List[object]]:
+    if not ranges:
+        return "0", []
+    parts = []
+    params: List[object] = []
+    for start, end in ranges:
+        parts.append(f"(t.{date_field}_day >= ? AND t.{date_field}_day <= ?)")
+        params.extend([date_utils.day_number(start), date_utils.day_number(end)])
+    return "(" + " OR ".join(parts) + ")", params
+
+
+def _month_range_sql(ranges: List[Tuple[str, str]]) -> Tuple[str, List[object]]:
+    parts = []
+    params: List[object] = []
+    for start, end in ranges:
+        parts.append("(t.month >= ? AND t.month <= ?)")
+        params.extend([start, end])
+    return "(" + " OR ".join(parts) + ")", params
+
+
+def _rows_from_totals(
+    periods: List[Period],
+    groups: List[Group],
+    node_labels: List[str],
+    mode: str,
+    totals: List[Tuple[int, int, int, int]],
+) -> List[dict]:
     rows = []
+    cells = iter(totals)
     for period in periods:
         for group in groups:
-            for node_label, node_sql, node_params in nodes:
-                result = _aggregate_cell(
-                    conn, period, group, mode, date_field, node_label, node_sql, node_params
+            for node_label in node_labels:
+                tx_count, inflow, outflow, matched_flow = next(cells)
+                rows.append(
+                    _cell_row(
+                        period, group, node_label, mode, tx_count, inflow, outflow, matched_flow
+                    )
                 )
-                rows.append(result)
-    return pd.DataFrame(rows)
+    return rows
+
+
+def _cell_row(
+    period: Period,
+    group: Group,
+    node_label: str,
+    mode: str,
+    tx_count: int,
+    inflow: int,
+    outflow: int,
+    matched_flow: int,
+) -> dict:
+    if mode == MODE_MATCHED_ONLY:
+        net = 0
+    else:
+        net = inflow - outflow
+    return {
+        "period_label": period.label,
+        "group_label": group.label,
+        "node_label": node_label,
+        "tx_count": tx_count,
+        "inflow_cents": inflow,
+        "outflow_cents": outflow,
+        "net_cents": net,
+        "matched_flow_cents": matched_flow,
+        "mode": mode,
+    }
 
 
 def _empty_frame() -> pd.DataFrame:
@@ -125,126 +1151,167 @@ def _aggregate_cell(
     node_sql: str,
     node_params: List[object],
 ) -> dict:
-    date_field = _resolve_date_field(date_field)
-    payer_sql, payer_params = _in_list(
-        "t.payer", group.payers, group.include_missing_payer
+    sql, params = _cell_query(conn, period, group, mode, date_field, node_sql, node_params)
+    row = db.fetch_one(conn, sql, params)
+    return _cell_row(period, group, node_label, mode, *_cell_totals(mode, row))
+
+
+def _aggregate_family(
+    conn: sqlite3.Connection,
+    period: Period,
+    group: Group,
+    mode: str,
+    date_field: str,
+    node_sql: str,
+    node_params: List[object],
+    members: List[Tuple[int, str, Optional[str]]],
+) -> Dict[int, dict]:
+    sql, params = _cell_query(
+        conn,
+        period,
+        group,
+        mode,
+        date_field,
+        node_sql,
+        node_params,
+        group_column="t.subcategory_id",
     )
-    payee_sql, payee_params = _in_list(
-        "t.payee", group.payees, group.include_missing_payee
+    by_subcategory_id = {
+        row[0]: _cell_totals(mode, tuple(row)[1:]) for row in db.fetch_all(conn, sql, params)
+    }
+    # A category member (subcategory None) rolls up every subcategory group.
+    category_total = tuple(
+        sum(totals) for totals in zip((0, 0, 0, 0), *by_subcategory_id.values())
+    )
+    subcategory_ids = _lookup_ids(
+        conn, "subcategory", [subcategory for _, _, subcategory in members if subcategory]
     )
+    rows = {}
+    for position, node_label, subcategory in members:
+        if subcategory is None:
+            totals = category_total
+        elif subcategory in subcategory_ids:
+            totals = by_subcategory_id.get(subcategory_ids[subcategory], (0, 0, 0, 0))
+        else:
+            totals = (0, 0, 0, 0)
+        rows[position] = _cell_row(period, group, node_label, mode, *totals)
+    return rows
 
-    base_sql = f"""
-        FROM (
-            SELECT
-                t.amount_cents,
-                {payer_sql} AS payer_in_a,
-                {payee_sql} AS payee_in_b
-            FROM transactions t
-            WHERE t.{date_field} >= ? AND t.{date_field} <= ? AND ({node_sql})
-        ) base
-    """
-    base_params = payer_params + payee_params + [period.start_date, period.end_date] + node_params
+
+def _lookup_ids(conn: sqlite3.Connection, column: str, names: List[str]) -> Dict[str, int]:
+    if not names:
+        return {}
+    placeholders = ",".join("?" for _ in names)
+    rows = db.fetch_all(
+        conn,
+        f"SELECT name, id FROM {values.DIMENSION_TABLES[column]} WHERE name IN ({placeholders})",
+        names,
+    )
+    return {row["name"]: int(row["id"]) for row in rows}
+
+
+def _cell_query(
+    conn: sqlite3.Connection,
+    period: Period,
+    group: Group,
+    mode: str,
+    date_field: str,
+    node_sql: str,
+    node_params: List[object],
+    group_column: Optional[str] = None,
+) -> Tuple[str, List[object]]:
+    key_columns = [f"{group_column} AS group_key"] if group_column else []
+    base_sql, base_params = _cell_base_sql(
+        conn, period, group, date_field, node_sql, node_params, key_columns + ["t.amount_cents"]
+    )
+    base_sql = f"FROM {base_sql}"
+    if group_column:
+        base_sql += " GROUP BY group_key"
 
     if mode == MODE_MATCHED_ONLY:
-        sql = (
-            "SELECT "
+        columns = (
             "COALESCE(SUM(CASE WHEN (payer_in_a AND payee_in_b) THEN 1 ELSE 0 END), 0) AS tx_count, "
             "COALESCE(SUM(CASE WHEN (payer_in_a AND payee_in_b) THEN amount_cents ELSE 0 END), 0) AS matched_flow "
-            + base_sql
         )
-        row = conn.execute(sql, base_params).fetchone()
-        tx_count = int(row[0]) if row else 0
-        matched_flow = int(row[1]) if row else 0
-        return {
-            "period_label": period.label,
-            "group_label": group.label,
-            "node_label": node_label,
-            "tx_count": tx_count,
-            "inflow_cents": 0,
-            "outflow_cents": 0,
-            "net_cents": 0,
-            "matched_flow_cents": matched_flow,
-            "mode": mode,
-        }
+    else:
+        columns = (
+            "COALESCE(SUM(CASE WHEN (payer_in_a OR payee_in_b) THEN 1 ELSE 0 END), 0) AS tx_count, "
+            "COALESCE(SUM(CASE WHEN payee_in_b THEN amount_cents ELSE 0 END), 0) AS inflow_cents, "
+            "COALESCE(SUM(CASE WHEN payer_in_a THEN amount_cents ELSE 0 END), 0) AS outflow_cents "
+        )
+    if group_column:
+        columns = "group_key, " + columns
+    return "SELECT " + columns + base_sql, base_params
 
-    sql = (
-        "SELECT "
-        "COALESCE(SUM(CASE WHEN (payer_in_a OR payee_in_b) THEN 1 ELSE 0 END), 0) AS tx_count, "
-        "COALESCE(SUM(CASE WHEN payee_in_b THEN amount_cents ELSE 0 END), 0) AS inflow_cents, "
-        "COALESCE(SUM(CASE WHEN payer_in_a THEN amount_cents ELSE 0 END), 0) AS outflow_cents "
-        + base_sql
+
+def _cell_base_sql(
+    conn: sqlite3.Connection,
+    period: Period,
+    group: Group,
+    date_field: str,
+    node_sql: str,
+    node_params: List[object],
+    columns: List[str],
+) -> Tuple[str, List[object]]:
+    # The rows behind one cell, with the group side flags; shared by the aggregate
+    # queries and the drill-down so both read exactly the same rows.
+    date_field = _resolve_date_field(date_field)
+    selections.trim(conn)
+    payer_sql, payer_params = selections.lookup_in_sql(
+        conn, "payer", group.payers, group.include_missing_payer
     )
-    row = conn.execute(sql, base_params).fetchone()
-    tx_count = int(row[0]) if row else 0
-    inflow = int(row[1]) if row else 0
-    outflow = int(row[2]) if row else 0
-    return {
-        "period_label": period.label,
-        "group_label": group.label,
-        "node_label": node_label,
-        "tx_count": tx_count,
-        "inflow_cents": inflow,
-        "outflow_cents": outflow,
-        "net_cents": inflow - outflow,
-        "matched_flow_cents": 0,
-        "mode": mode,
-    }
+    payee_sql, payee_params = selections.lookup_in_sql(
+        conn, "payee", group.payees, group.include_missing_payee
+    )
+    sql = f"""
+        (
+            SELECT
+                {", ".join(columns)},
+                {payer_sql} AS payer_in_a,
+                {payee_sql} AS payee_in_b
+            FROM transaction_rows t
+            WHERE t.{date_field}_day >= ? AND t.{date_field}_day <= ? AND ({node_sql})
+        ) base
+    """
+    days = [date_utils.day_number(period.start_date), date_utils.day_number(period.end_date)]
+    return sql, payer_params + payee_params + days + node_params
+
 
+def _cell_totals(mode: str, row: Optional[Iterable[object]]) -> Tuple[int, int, int, int]:
+    # (tx_count, inflow, outflow, matched_flow) from one aggregate row.
+    values = [int(value) for value in row] if row is not None else []
+    if mode == MODE_MATCHED_ONLY:
+        tx_count, matched_flow = values or [0, 0]
+        return tx_count, 0, 0, matched_flow
+    tx_count, inflow, outflow = values or [0, 0, 0]
+    return tx_count, inflow, outflow, 0
 
-def _build_node_predicate(node: Node) -> Tuple[str, List[object]]:
+
+def _build_node_predicate(conn: sqlite3.Connection, node: Node) -> Tuple[str, List[object]]:
     if node.kind in {"all", "all_categories", "all_tags"}:
         return "1", []
     if node.kind == "category":
-        return "t.category = ?", [node.category]
+        return f"t.category_id = {_LOOKUP_ID_SQL['category']}", [node.category]
     if node.kind == "subcategory":
-        return "t.category = ? AND t.subcategory = ?", [node.category, node.subcategory]
-    if node.kind == "tag":
         return (
-            "EXISTS ("
-            "SELECT 1 "
-            "FROM transaction_tags tt "
-            "JOIN tags tg ON tg.id = tt.tag_id "
-            "WHERE tt.transaction_id = t.id "
-            "  AND tg.name = ?"
-            ")",
-            [node.tag],
+            f"t.category_id = {_LOOKUP_ID_SQL['category']} "
+            f"AND t.subcategory_id = {_LOOKUP_ID_SQL['subcategory']}",
+            [node.category, node.subcategory],
         )
+    if node.kind == "tag":
+        return tag_index.id_filter_sql(conn, "t.id", [node.tag or ""])
     raise ValueError("Unsupported node kind")
 
 
-def _build_tag_filter(tags: List[str], match: str) -> Tuple[str, List[object]]:
+def _build_tag_filter(
+    conn: sqlite3.Connection, tags: List[str], match: str
+) -> Tuple[str, List[object]]:
     if not tags:
         return "1", []
-    if match == TAG_MATCH_ANY:
-        placeholders = ",".join("?" for _ in tags)
-        sql = (
-            "EXISTS ("
-            "SELECT 1 "
-            "FROM transaction_tags tt "
-            "JOIN tags tg ON tg.id = tt.tag_id "
-            "WHERE tt.transaction_id = t.id "
-            "  AND tg.name IN ("
-            + placeholders
-            + ")"
-            ")"
-        )
-        return sql, tags
-    if match == TAG_MATCH_ALL:
-        parts = []
-        params: List[object] = []
-        for tag in tags:
-            parts.append(
-                "EXISTS ("
-                "SELECT 1 "
-                "FROM transaction_tags tt "
-                "JOIN tags tg ON tg.id = tt.tag_id "
-                "WHERE tt.transaction_id = t.id "
-                "  AND tg.name = ?"
-                ")"
-            )
-            params.append(tag)
-        return " AND ".join(parts), params
-    raise ValueError("Invalid tag match")
+    if match not in {TAG_MATCH_ANY, TAG_MATCH_ALL}:
+        raise ValueError("Invalid tag match")
+    # ANY is a union and ALL an intersection of the per-tag bitmaps.
+    return tag_index.id_filter_sql(conn, "t.id", tags, match)
 
 
 def _resolve_date_field(value: object) -> str:
@@ -253,15 +1320,9 @@ def _resolve_date_field(value: object) -> str:
     return DEFAULT_DATE_FIELD
 
 
-def _in_list(
-    column: str, values: Iterable[str], include_missing: bool = False
-) -> Tuple[str, List[object]]:
-    values_list = list(values)
-    if not values_list:
-        if include_missing:
-            return f"{column} IS NULL", []
-        return "0", []
-    placeholders = ",".join("?" for _ in values_list)
-    if include_missing:
-        return f"({column} IN ({placeholders}) OR {column} IS NULL)", values_list
-    return f"{column} IN ({placeholders})", values_list
+def _column_sql(column: str) -> str:
+    # A transactions view column read from transaction_rows t.
+    table = values.DIMENSION_TABLES.get(column)
+    if table is None:
+        return f"t.{column}"
+    return f"(SELECT name FROM {table} WHERE id = t.{column}_id) AS {column}"
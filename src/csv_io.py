@@ -4,7 +4,7 @@ import os
 from dataclasses import dataclass
 from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
-from src import amounts, date_utils, tags, transaction_validation
+from src import amounts, date_utils, db, tags, transaction_validation, values
 
 REQUIRED_COLUMNS = {"amount", "category"}
 DATE_COLUMNS = {"date_payment", "date_application"}
@@ -160,39 +160,48 @@ def validate_rows(rows: Sequence[Dict[str, Optional[str]]]) -> Tuple[List[Parsed
 
 
 def insert_transactions(conn, rows: Sequence[ParsedRow]) -> None:
-    for row in rows:
-        cursor = conn.execute(
-            """
-            INSERT INTO transactions (
-                date_payment,
-                date_application,
-                amount_cents,
-                payer,
-                payee,
-                payment_type,
-                category,
-                subcategory,
-                notes
+    # Lookup ids are resolved once per distinct value in the batch.
+    value_ids: Dict[Tuple[str, str], int] = {}
+    # One savepoint for the batch: a failed row undoes the whole import, lookup values
+    # included.
+    with db.savepoint(conn):
+        for row in rows:
+            cursor = conn.execute(
+                """
+                INSERT INTO transaction_rows (
+                    date_payment,
+                    date_application,
+                    date_payment_day,
+                    date_application_day,
+                    amount_cents,
+                    payer_id,
+                    payee_id,
+                    payment_type_id,
+                    category_id,
+                    subcategory_id,
+                    notes
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    row.date_payment,
+                    row.date_application,
+                    date_utils.day_number(row.date_payment),
+                    date_utils.day_number(row.date_application),
+                    row.amount_cents,
+                    values.value_id(conn, "payer", row.payer, value_ids),
+                    values.value_id(conn, "payee", row.payee, value_ids),
+                    values.value_id(conn, "payment_type", row.payment_type, value_ids),
+                    values.value_id(conn, "category", row.category, value_ids),
+                    values.value_id(conn, "subcategory", row.subcategory, value_ids),
+                    row.notes,
+                ),
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                row.date_payment,
-                row.date_application,
-                row.amount_cents,
-                row.payer,
-                row.payee,
-                row.payment_type,
-                row.category,
-                row.subcategory,
-                row.notes,
-            ),
-        )
-        transaction_id = cursor.lastrowid
-        if transaction_id is None:
-            raise ValueError("Failed to insert transaction")
-        if row.tags:
-            tags.set_transaction_tags(conn, int(transaction_id), row.tags)
+            transaction_id = cursor.lastrowid
+            if transaction_id is None:
+                raise ValueError("Failed to insert transaction")
+            if row.tags:
+                tags.set_transaction_tags(conn, int(transaction_id), row.tags)
 
 
 def build_export_rows(rows: Iterable[Union[Dict[str, object], object]]) -> List[Dict[str, str]]:
@@ -36,3 +36,18 @@ def coerce_date(value: object, label: str) -> Tuple[Optional[str], Optional[str]
             return None, f"{label} must be YYYY-MM-DD"
         return cleaned, None
     return None, f"{label} must be YYYY-MM-DD"
+
+
+# Day numbers count days since 1970-01-01, as in the *_day columns of transaction_rows.
+EPOCH = dt.date(1970, 1, 1)
+
+
+def day_number(value: str) -> int:
+    try:
+        return (dt.date.fromisoformat(value) - EPOCH).days
+    except (TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid date: {value}") from exc
+
+
+def day_to_iso(day: int) -> str:
+    return (EPOCH + dt.timedelta(days=int(day))).isoformat()
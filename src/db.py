@@ -1,6 +1,9 @@
 import sqlite3
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Sequence
+from typing import Iterator, List, Optional, Sequence
+
+from src import query_plans
 
 DEFAULT_TIMEOUT_SECONDS = 30
 REQUIRED_TABLES = ("transactions", "tags", "transaction_tags")
@@ -33,7 +36,16 @@ CREATE TABLE IF NOT EXISTS recent_db_paths (
 """
 
 
-def connect(db_path: str, timeout: int = DEFAULT_TIMEOUT_SECONDS) -> sqlite3.Connection:
+def connect(
+    db_path: str, timeout: int = DEFAULT_TIMEOUT_SECONDS, read_only: bool = False
+) -> sqlite3.Connection:
+    if read_only:
+        # The journal mode is a property of the file; a read-only handle cannot set it.
+        uri = Path(db_path).expanduser().resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, timeout=timeout, uri=True)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys=ON;")
+        return conn
     conn = sqlite3.connect(db_path, timeout=timeout)
     conn.row_factory = sqlite3.Row
     _configure_connection(conn)
@@ -59,10 +71,11 @@ def init_settings_db(conn: sqlite3.Connection) -> None:
 
 def schema_is_valid(conn: sqlite3.Connection) -> bool:
     for table_name in REQUIRED_TABLES:
+        # Since schema v7 transactions is a view over transaction_rows.
         row = fetch_one(
             conn,
-            "SELECT name FROM sqlite_master WHERE type = ? AND name = ?",
-            ("table", table_name),
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?",
+            (table_name,),
         )
         if row is None:
             return False
@@ -81,17 +94,49 @@ def backup_db(conn: sqlite3.Connection, target_path: str) -> None:
         target_conn.close()
 
 
+def database_key(conn: sqlite3.Connection) -> Optional[str]:
+    for row in conn.execute("PRAGMA database_list").fetchall():
+        if row[1] == "main":
+            return row[2] or None
+    return None
+
+
+def write_counter(conn: sqlite3.Connection) -> int:
+    row = fetch_one(conn, "SELECT value FROM write_counter WHERE id = 1")
+    return int(row[0]) if row else 0
+
+
+@contextmanager
+def savepoint(conn: sqlite3.Connection) -> Iterator[None]:
+    # The statements inside apply together or not at all; an error undoes them (lookup
+    # values they added included) and is re-raised. The surrounding transaction stays open
+    # for the caller to commit or roll back, as with a plain write.
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    conn.execute("SAVEPOINT dopt_write")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK TO dopt_write")
+        conn.execute("RELEASE dopt_write")
+        raise
+    conn.execute("RELEASE dopt_write")
+
+
 def execute(conn: sqlite3.Connection, sql: str, params: Sequence[object] = ()) -> sqlite3.Cursor:
+    query_plans.record(conn, sql, params)
     return conn.execute(sql, params)
 
 
 def fetch_one(
     conn: sqlite3.Connection, sql: str, params: Sequence[object] = ()
 ) -> Optional[sqlite3.Row]:
+    query_plans.record(conn, sql, params)
     cursor = conn.execute(sql, params)
     return cursor.fetchone()
 
 
 def fetch_all(conn: sqlite3.Connection, sql: str, params: Sequence[object] = ()) -> List[sqlite3.Row]:
+    query_plans.record(conn, sql, params)
     cursor = conn.execute(sql, params)
     return cursor.fetchall()
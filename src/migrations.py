@@ -0,0 +1,897 @@
+import sqlite3
+from typing import Callable, List, Tuple
+
+from src import db
+
+SCHEMA_VERSION = 10
+
+# (name, columns) of the covering indexes as added in v4, over the text columns.
+_V4_COVERING_INDEXES = [
+    (
+        "idx_transactions_application_cover",
+        "date_application, category, subcategory, payer, payee, amount_cents",
+    ),
+    (
+        "idx_transactions_payment_cover",
+        "date_payment, category, subcategory, payer, payee, amount_cents",
+    ),
+    (
+        "idx_transactions_category_application_cover",
+        "category, date_application, subcategory, payer, payee, amount_cents",
+    ),
+    (
+        "idx_transactions_category_payment_cover",
+        "category, date_payment, subcategory, payer, payee, amount_cents",
+    ),
+]
+# The same indexes over lookup ids, as added in v7.
+_V7_COVERING_INDEXES = [
+    (
+        "idx_transactions_application_cover",
+        "date_application, category_id, subcategory_id, payer_id, payee_id, amount_cents",
+    ),
+    (
+        "idx_transactions_payment_cover",
+        "date_payment, category_id, subcategory_id, payer_id, payee_id, amount_cents",
+    ),
+    (
+        "idx_transactions_category_application_cover",
+        "category_id, date_application, subcategory_id, payer_id, payee_id, amount_cents",
+    ),
+    (
+        "idx_transactions_category_payment_cover",
+        "category_id, date_payment, subcategory_id, payer_id, payee_id, amount_cents",
+    ),
+]
+# Over the day-number columns since v8; kept in sync with schema.sql.
+COVERING_INDEXES = [
+    (
+        "idx_transactions_application_cover",
+        "date_application_day, category_id, subcategory_id, payer_id, payee_id, amount_cents",
+    ),
+    (
+        "idx_transactions_payment_cover",
+        "date_payment_day, category_id, subcategory_id, payer_id, payee_id, amount_cents",
+    ),
+    (
+        "idx_transactions_category_application_cover",
+        "category_id, date_application_day, subcategory_id, payer_id, payee_id, amount_cents",
+    ),
+    (
+        "idx_transactions_category_payment_cover",
+        "category_id, date_payment_day, subcategory_id, payer_id, payee_id, amount_cents",
+    ),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    row = db.fetch_one(conn, "PRAGMA user_version")
+    return int(row[0]) if row else 0
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    current = get_schema_version(conn)
+    if current >= SCHEMA_VERSION:
+        return current
+    conn.execute("BEGIN")
+    try:
+        for version, step in MIGRATIONS:
+            if version <= current:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return get_schema_version(conn)
+
+
+def _migrate_to_v1(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS write_counter (
+          id INTEGER PRIMARY KEY CHECK (id = 1),
+          value INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute("INSERT OR IGNORE INTO write_counter (id, value) VALUES (1, 0)")
+    for table in ("transactions", "tags", "transaction_tags"):
+        for operation in ("insert", "update", "delete"):
+            _create_write_counter_trigger(conn, table, operation)
+
+
+def _create_write_counter_trigger(conn: sqlite3.Connection, table: str, operation: str) -> None:
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_{operation}_write_counter
+        AFTER {operation.upper()} ON {table}
+        BEGIN
+          UPDATE write_counter SET value = value + 1 WHERE id = 1;
+        END
+        """
+    )
+
+
+def _migrate_to_v2(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS monthly_rollup (
+          month TEXT NOT NULL,
+          date_field TEXT NOT NULL CHECK (date_field IN ('date_payment', 'date_application')),
+          category TEXT NOT NULL,
+          subcategory TEXT NULL,
+          payer TEXT NULL,
+          payee TEXT NULL,
+          tx_count INTEGER NOT NULL,
+          amount_cents INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_monthly_rollup_key
+          ON monthly_rollup({_ROLLUP_KEY})
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_insert_monthly_rollup
+        AFTER INSERT ON transactions
+        BEGIN
+          {_rollup_add_sql()}
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_delete_monthly_rollup
+        AFTER DELETE ON transactions
+        BEGIN
+          {_rollup_remove_sql()}
+        END
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_transactions_update_monthly_rollup
+        AFTER UPDATE OF
+          date_payment, date_application, amount_cents, payer, payee, category, subcategory
+        ON transactions
+        BEGIN
+          {_rollup_remove_sql()}
+          {_rollup_add_sql()}
+        END
+        """
+    )
+    conn.execute("DELETE FROM monthly_rollup")
+    for date_field in ("date_payment", "date_application"):
+        conn.execute(
+            f"""
+            INSERT INTO monthly_rollup (
+              month, date_field, category, subcategory, payer, payee, tx_count, amount_cents
+            )
+            SELECT
+              substr({date_field}, 1, 7),
+              '{date_field}',
+              category,
+              subcategory,
+              payer,
+              payee,
+              COUNT(*),
+              SUM(amount_cents)
+            FROM transactions
+            GROUP BY substr({date_field}, 1, 7), category, subcategory, payer, payee
+            """
+        )
+
+
+_ROLLUP_COLUMNS = ("category", "subcategory", "payer", "payee")
+_ROLLUP_KEY = (
+    "date_field, month, category, ifnull(subcategory, ''), ifnull(payer, ''), ifnull(payee, '')"
+)
+
+
+def _rollup_add_sql(columns: Tuple[str, ...] = _ROLLUP_COLUMNS, key: str = _ROLLUP_KEY) -> str:
+    names = ", ".join(columns)
+    values = ", ".join(f"NEW.{column}" for column in columns)
+    rows = ",".join(
+        f"""
+            (
+              substr(NEW.{date_field}, 1, 7), '{date_field}',
+              {values}, 1, NEW.amount_cents
+            )"""
+        for date_field in ("date_payment", "date_application")
+    )
+    return f"""
+          INSERT INTO monthly_rollup (
+            month, date_field, {names}, tx_count, amount_cents
+          )
+          VALUES {rows}
+          ON CONFLICT ({key})
+          DO UPDATE SET
+            tx_count = tx_count + excluded.tx_count,
+            amount_cents = amount_cents + excluded.amount_cents;"""
+
+
+def _rollup_remove_sql(columns: Tuple[str, ...] = _ROLLUP_COLUMNS, missing: str = "''") -> str:
+    # The first key column is NOT NULL; the others compare with NULL as `missing`.
+    match_columns = "".join(
+        f"""
+            AND ifnull({column}, {missing}) = ifnull(OLD.{column}, {missing})"""
+        for column in columns[1:]
+    )
+    match_old = f"""
+            (
+              (date_field = 'date_payment' AND month = substr(OLD.date_payment, 1, 7))
+              OR (date_field = 'date_application' AND month = substr(OLD.date_application, 1, 7))
+            )
+            AND {columns[0]} = OLD.{columns[0]}{match_columns}"""
+    return f"""
+          UPDATE monthly_rollup
+          SET tx_count = tx_count - 1, amount_cents = amount_cents - OLD.amount_cents
+          WHERE {match_old};
+          DELETE FROM monthly_rollup
+          WHERE tx_count = 0 AND {match_old};"""
+
+
+def _migrate_to_v3(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tag_changes (
+          seq INTEGER PRIMARY KEY,
+          transaction_id INTEGER NOT NULL,
+          tag_id INTEGER NOT NULL,
+          added INTEGER NOT NULL CHECK (added IN (0, 1))
+        )
+        """
+    )
+    _create_tag_change_triggers(conn)
+
+
+def _create_tag_change_triggers(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_insert_tag_changes
+        AFTER INSERT ON transaction_tags
+        BEGIN
+          INSERT INTO tag_changes (transaction_id, tag_id, added)
+          VALUES (NEW.transaction_id, NEW.tag_id, 1);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_delete_tag_changes
+        AFTER DELETE ON transaction_tags
+        BEGIN
+          INSERT INTO tag_changes (transaction_id, tag_id, added)
+          VALUES (OLD.transaction_id, OLD.tag_id, 0);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_update_tag_changes
+        AFTER UPDATE ON transaction_tags
+        BEGIN
+          INSERT INTO tag_changes (transaction_id, tag_id, added)
+          VALUES (OLD.transaction_id, OLD.tag_id, 0), (NEW.transaction_id, NEW.tag_id, 1);
+        END
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_tag_changes_prune
+        AFTER INSERT ON tag_changes
+        BEGIN
+          DELETE FROM tag_changes WHERE seq <= NEW.seq - 50000;
+        END
+        """
+    )
+
+
+def _migrate_to_v4(conn: sqlite3.Connection) -> None:
+    for name, columns in _V4_COVERING_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON transactions({columns})")
+    # Every category-leading covering index starts with the same column.
+    conn.execute("DROP INDEX IF EXISTS idx_transactions_category")
+
+
+def _tags_text_sql(transaction_id: str) -> str:
+    return f"""(
+            SELECT GROUP_CONCAT(name, ',')
+            FROM (
+              SELECT tg.name AS name
+              FROM tags tg
+              JOIN transaction_tags tt ON tt.tag_id = tg.id
+              WHERE tt.transaction_id = {transaction_id}
+              ORDER BY tg.name
+            )
+          )"""
+
+
+def _migrate_to_v5(conn: sqlite3.Connection) -> None:
+    conn.execute("ALTER TABLE transactions ADD COLUMN tags_text TEXT NULL")
+    _create_tags_text_triggers(conn, "transactions")
+    # One grouped pass instead of a subquery per transaction.
+    conn.execute(
+        """
+        UPDATE transactions
+        SET tags_text = grouped.tags
+        FROM (
+          SELECT transaction_id, GROUP_CONCAT(name, ',') AS tags
+          FROM (
+            SELECT tt.transaction_id, tg.name
+            FROM transaction_tags tt
+            JOIN tags tg ON tg.id = tt.tag_id
+            ORDER BY tt.transaction_id, tg.name
+          )
+          GROUP BY transaction_id
+        ) AS grouped
+        WHERE grouped.transaction_id = transactions.id
+        """
+    )
+
+
+def _create_tags_text_triggers(conn: sqlite3.Connection, table: str) -> None:
+    for operation, refs in (
+        ("insert", ("NEW",)),
+        ("delete", ("OLD",)),
+        ("update", ("OLD", "NEW")),
+    ):
+        statements = "".join(
+            f"""
+          UPDATE {table}
+          SET tags_text = {_tags_text_sql(f"{ref}.transaction_id")}
+          WHERE id = {ref}.transaction_id;"""
+            for ref in refs
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_transaction_tags_{operation}_tags_text
+            AFTER {operation.upper()} ON transaction_tags
+            BEGIN
+              {statements}
+            END
+            """
+        )
+    conn.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_tags_update_tags_text
+        AFTER UPDATE OF name ON tags
+        BEGIN
+          UPDATE {table}
+          SET tags_text = {_tags_text_sql(f"{table}.id")}
+          WHERE id IN (SELECT transaction_id FROM transaction_tags WHERE tag_id = NEW.id);
+        END
+        """
+    )
+
+
+FTS_COLUMNS = "payer, payee, category, subcategory, notes, tags_text"
+
+
+def _fts_row_sql(ref: str) -> str:
+    values = ", ".join(f"{ref}.{column.strip()}" for column in FTS_COLUMNS.split(","))
+    return f"{ref}.id, {values}"
+
+
+def _migrate_to_v6(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+          {FTS_COLUMNS},
+          content = 'transactions', content_rowid = 'id', tokenize = 'trigram'
+        )
+        """
+    )
+    insert_new = f"""
+          INSERT INTO transactions_fts (rowid, {FTS_COLUMNS})
+          VALUES ({_fts_row_sql("NEW")});"""
+    delete_old = f"""
+          INSERT INTO transactions_fts (transactions_fts, rowid, {FTS_COLUMNS})
+          VALUES ('delete', {_fts_row_sql("OLD")});"""
+    for name, event, statements in (
+        ("insert", "INSERT", insert_new),
+        ("delete", "DELETE", delete_old),
+        ("update", f"UPDATE OF {FTS_COLUMNS}", delete_old + insert_new),
+    ):
+        conn.execute(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_transactions_{name}_fts
+            AFTER {event} ON transactions
+            BEGIN
+              {statements}
+            END
+            """
+        )
+    conn.execute("INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')")
+
+
+# (view column, lookup table) for the values stored as ids since v7.
+DIMENSIONS = [
+    ("payer", "payers"),
+    ("payee", "payees"),
+    ("payment_type", "payment_types"),
+    ("category", "categories"),
+    ("subcategory", "subcategories"),
+]
+_ROLLUP_ID_COLUMNS = ("category_id", "subcategory_id", "payer_id", "payee_id")
+_ROLLUP_ID_KEY = (
+    "date_field, month, category_id, ifnull(subcategory_id, 0), ifnull(payer_id, 0), "
+    "ifnull(payee_id, 0)"
+)
+_ID_INDEXES = [
+    ("idx_transactions_subcategory", "subcategory_id"),
+    ("idx_transactions_payer", "payer_id"),
+    ("idx_transactions_payee", "payee_id"),
+    ("idx_transactions_payment_type", "payment_type_id"),
+]
+_PARTIES_CHECK = "SELECT RAISE(ABORT, 'CHECK constraint failed: payer <> payee');"
+# Days since 1970-01-01 for both dates, stored next to them since v8. They are plain
+# columns pinned by CHECKs: SQLite never uses an index holding a generated column as a
+# covering index.
+_DATE_COLUMNS = ("date_payment", "date_application")
+
+
+def _day_sql(date_sql: str) -> str:
+    return f"CAST(julianday({date_sql}) - 2440587.5 AS INTEGER)"
+
+
+_DAY_COLUMNS_SQL = """
+          date_payment_day INTEGER NOT NULL,
+          date_application_day INTEGER NOT NULL,"""
+_DAY_CHECKS_SQL = "".join(
+    f""",
+          CHECK ({column}_day = {_day_sql(column)})"""
+    for column in _DATE_COLUMNS
+)
+
+
+def _fts_names_sql(ref: str) -> str:
+    # FTS values of a transaction_rows row, names looked up from the ids.
+    names = ", ".join(
+        f"(SELECT name FROM {table} WHERE id = {ref}.{column}_id)"
+        for column, table in DIMENSIONS
+        if column in FTS_COLUMNS.split(", ")
+    )
+    return f"{ref}.id, {names}, {ref}.notes, {ref}.tags_text"
+
+
+def _migrate_to_v7(conn: sqlite3.Connection) -> None:
+    # Recreated against transaction_rows below; the renames re-check every trigger body.
+    conn.execute("DROP TRIGGER IF EXISTS trg_tags_update_tags_text")
+    for column, table in DIMENSIONS:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+              id INTEGER PRIMARY KEY,
+              name TEXT NOT NULL UNIQUE CHECK (length(trim(name)) > 0 AND name = lower(trim(name)))
+            )
+            """
+        )
+        conn.execute(
+            f"""
+            INSERT INTO {table} (name)
+            SELECT DISTINCT {column} FROM transactions WHERE {column} IS NOT NULL ORDER BY {column}
+            """
+        )
+    _create_transaction_rows(conn, "transaction_rows")
+    id_columns = ", ".join(f"{column}_id" for column, _ in DIMENSIONS)
+    id_values = ", ".join(f"{table}.id" for _, table in DIMENSIONS)
+    name_joins = " ".join(
+        f"LEFT JOIN {table} ON {table}.name = transactions.{column}" for column, table in DIMENSIONS
+    )
+    conn.execute(
+        f"""
+        INSERT INTO transaction_rows (
+          id, date_payment, date_application, amount_cents, {id_columns}, notes, tags_text
+        )
+        SELECT
+          transactions.id, transactions.date_payment, transactions.date_application,
+          transactions.amount_cents, {id_values}, transactions.notes, transactions.tags_text
+        FROM transactions {name_joins}
+        """
+    )
+
+    _rebuild_transaction_tags(conn, "transaction_rows")
+    conn.execute("DROP TABLE transactions")
+    date_indexes = [
+        ("idx_transactions_date_payment", "date_payment"),
+        ("idx_transactions_date_application", "date_application"),
+    ]
+    for name, columns in date_indexes + _V7_COVERING_INDEXES + _ID_INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON transaction_rows({columns})")
+
+    conn.execute("DROP TABLE monthly_rollup")
+    conn.execute(
+        """
+        CREATE TABLE monthly_rollup (
+          month TEXT NOT NULL,
+          date_field TEXT NOT NULL CHECK (date_field IN ('date_payment', 'date_application')),
+          category_id INTEGER NOT NULL,
+          subcategory_id INTEGER NULL,
+          payer_id INTEGER NULL,
+          payee_id INTEGER NULL,
+          tx_count INTEGER NOT NULL,
+          amount_cents INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(f"CREATE UNIQUE INDEX idx_monthly_rollup_key ON monthly_rollup({_ROLLUP_ID_KEY})")
+    rollup_columns = ", ".join(_ROLLUP_ID_COLUMNS)
+    for date_field in ("date_payment", "date_application"):
+        conn.execute(
+            f"""
+            INSERT INTO monthly_rollup (
+              month, date_field, {rollup_columns}, tx_count, amount_cents
+            )
+            SELECT
+              substr({date_field}, 1, 7), '{date_field}', {rollup_columns},
+              COUNT(*), SUM(amount_cents)
+            FROM transaction_rows
+            GROUP BY substr({date_field}, 1, 7), {rollup_columns}
+            """
+        )
+
+    _create_transactions_view(conn)
+    _create_row_triggers(conn)
+
+
+def _create_transaction_rows(conn: sqlite3.Connection, table: str, days: bool = False) -> None:
+    conn.execute(
+        f"""
+        CREATE TABLE {table} (
+          id INTEGER PRIMARY KEY,
+          date_payment TEXT NOT NULL,
+          date_application TEXT NOT NULL,
+          amount_cents INTEGER NOT NULL CHECK (amount_cents >= 0),
+          payer_id INTEGER NULL REFERENCES payers(id),
+          payee_id INTEGER NULL REFERENCES payees(id),
+          payment_type_id INTEGER NULL REFERENCES payment_types(id),
+          category_id INTEGER NOT NULL REFERENCES categories(id),
+          subcategory_id INTEGER NULL REFERENCES subcategories(id),
+          notes TEXT NULL,
+          tags_text TEXT NULL,{_DAY_COLUMNS_SQL if days else ""}
+          CHECK (notes IS NULL OR length(trim(notes)) > 0),
+          CHECK (
+            date_payment GLOB '[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]' AND
+            date(date_payment) IS NOT NULL AND date(date_payment) = date_payment
+          ),
+          CHECK (
+            date_application GLOB '[0-9][0-9][0-9][0-9]-[0-1][0-9]-[0-3][0-9]' AND
+            date(date_application) IS NOT NULL AND date(date_application) = date_application
+          ),
+          CHECK (payer_id IS NOT NULL OR payee_id IS NOT NULL){_DAY_CHECKS_SQL if days else ""}
+        )
+        """
+    )
+
+
+def _rebuild_transaction_tags(conn: sqlite3.Connection, parent: str) -> None:
+    # transaction_tags must reference the new table before the old one is dropped
+    # (dropping it would cascade into the links otherwise).
+    conn.execute(
+        f"""
+        CREATE TABLE transaction_tags_new (
+          transaction_id INTEGER NOT NULL,
+          tag_id INTEGER NOT NULL,
+          PRIMARY KEY (transaction_id, tag_id),
+          FOREIGN KEY (transaction_id) REFERENCES {parent}(id) ON DELETE CASCADE,
+          FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO transaction_tags_new (transaction_id, tag_id) "
+        "SELECT transaction_id, tag_id FROM transaction_tags"
+    )
+    conn.execute("DROP TABLE transaction_tags")
+    conn.execute("ALTER TABLE transaction_tags_new RENAME TO transaction_tags")
+    conn.execute(
+        "CREATE INDEX idx_transaction_tags_transaction_id ON transaction_tags(transaction_id)"
+    )
+    conn.execute("CREATE INDEX idx_transaction_tags_tag_id ON transaction_tags(tag_id)")
+
+
+def _create_transactions_view(
+    conn: sqlite3.Connection, days: bool = False, ids: bool = False
+) -> None:
+    view_names = ", ".join(f"{table}.name AS {column}" for column, table in DIMENSIONS)
+    view_joins = " ".join(
+        f"LEFT JOIN {table} ON {table}.id = transaction_rows.{column}_id"
+        for column, table in DIMENSIONS
+    )
+    day_columns = [f"{column}_day" for column in _DATE_COLUMNS] if days else []
+    id_view_columns = [f"{column}_id" for column, _ in DIMENSIONS] if ids else []
+    extra = "".join(
+        f",\n          transaction_rows.{column} AS {column}"
+        for column in day_columns + id_view_columns
+    )
+    conn.execute(
+        f"""
+        CREATE VIEW transactions AS
+        SELECT
+          transaction_rows.id AS id,
+          transaction_rows.date_payment AS date_payment,
+          transaction_rows.date_application AS date_application,
+          transaction_rows.amount_cents AS amount_cents,
+          {view_names},
+          transaction_rows.notes AS notes,
+          transaction_rows.tags_text AS tags_text{extra}
+        FROM transaction_rows {view_joins}
+        """
+    )
+
+    add_values = "".join(
+        f"""
+          INSERT INTO {table} (name) SELECT NEW.{column}
+          WHERE NEW.{column} IS NOT NULL
+            AND NOT EXISTS (SELECT 1 FROM {table} WHERE name = NEW.{column});"""
+        for column, table in DIMENSIONS
+    )
+    id_columns = ", ".join(f"{column}_id" for column, _ in DIMENSIONS)
+    new_ids = ", ".join(
+        f"(SELECT id FROM {table} WHERE name = NEW.{column})" for column, table in DIMENSIONS
+    )
+    set_ids = ", ".join(
+        f"{column}_id = (SELECT id FROM {table} WHERE name = NEW.{column})"
+        for column, table in DIMENSIONS
+    )
+    new_days = "".join(f", {_day_sql(f'NEW.{column}')}" for column in _DATE_COLUMNS if days)
+    set_days = "".join(
+        f", {column}_day = {_day_sql(f'NEW.{column}')}" for column in _DATE_COLUMNS if days
+    )
+    insert_days = "".join(f", {column}" for column in day_columns)
+    for operation, statement in (
+        (
+            "insert",
+            f"""
+          INSERT INTO transaction_rows (
+            id, date_payment, date_application, amount_cents, {id_columns}, notes, tags_text
+            {insert_days}
+          )
+          VALUES (
+            NEW.id, NEW.date_payment, NEW.date_application, NEW.amount_cents, {new_ids},
+            NEW.notes, NEW.tags_text{new_days}
+          );""",
+        ),
+        (
+            "update",
+            f"""
+          UPDATE transaction_rows
+          SET date_payment = NEW.date_payment, date_application = NEW.date_application,
+            amount_cents = NEW.amount_cents, {set_ids}, notes = NEW.notes,
+            tags_text = NEW.tags_text{set_days}
+          WHERE id = OLD.id;""",
+        ),
+        ("delete", "DELETE FROM transaction_rows WHERE id = OLD.id;"),
+    ):
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_transactions_{operation}
+            INSTEAD OF {operation.upper()} ON transactions
+            BEGIN
+              {add_values if operation != "delete" else ""}
+              {statement}
+            END
+            """
+        )
+
+
+def _create_row_triggers(conn: sqlite3.Connection) -> None:
+    id_columns = ", ".join(f"{column}_id" for column, _ in DIMENSIONS)
+    same_parties = (
+        "(SELECT name FROM payers WHERE id = NEW.payer_id) "
+        "= (SELECT name FROM payees WHERE id = NEW.payee_id)"
+    )
+    for operation, event in (("insert", "INSERT"), ("update", "UPDATE OF payer_id, payee_id")):
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_transaction_rows_{operation}_parties
+            BEFORE {event} ON transaction_rows
+            WHEN {same_parties}
+            BEGIN
+              {_PARTIES_CHECK}
+            END
+            """
+        )
+    for table, column, other_table, other_column in (
+        ("payers", "payer_id", "payees", "payee_id"),
+        ("payees", "payee_id", "payers", "payer_id"),
+    ):
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_update_parties
+            BEFORE UPDATE OF name ON {table}
+            WHEN EXISTS (
+              SELECT 1
+              FROM transaction_rows
+              JOIN {other_table} ON {other_table}.id = transaction_rows.{other_column}
+              WHERE transaction_rows.{column} = NEW.id AND {other_table}.name = NEW.name
+            )
+            BEGIN
+              {_PARTIES_CHECK}
+            END
+            """
+        )
+
+    for operation, event in (("delete", "DELETE"), ("update", f"UPDATE OF {id_columns}")):
+        statements = ""
+        for column, table in DIMENSIONS:
+            changed = f" AND OLD.{column}_id IS NOT NEW.{column}_id" if operation == "update" else ""
+            statements += f"""
+          DELETE FROM {table}
+          WHERE id = OLD.{column}_id{changed}
+            AND NOT EXISTS (SELECT 1 FROM transaction_rows WHERE {column}_id = OLD.{column}_id);"""
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_transaction_rows_{operation}_prune
+            AFTER {event} ON transaction_rows
+            BEGIN
+              {statements}
+            END
+            """
+        )
+
+    for operation in ("insert", "update", "delete"):
+        _create_write_counter_trigger(conn, "transaction_rows", operation)
+        _create_write_counter_trigger(conn, "transaction_tags", operation)
+    for _, table in DIMENSIONS:
+        _create_write_counter_trigger(conn, table, "update")
+    # The transaction_tags triggers went with the old table.
+    _migrate_to_v3(conn)
+    _create_tags_text_triggers(conn, "transaction_rows")
+
+    rollup_key = ", ".join(_ROLLUP_ID_COLUMNS)
+    rollup_add = _rollup_add_sql(_ROLLUP_ID_COLUMNS, _ROLLUP_ID_KEY)
+    rollup_remove = _rollup_remove_sql(_ROLLUP_ID_COLUMNS, "0")
+    for operation, event, statements in (
+        ("insert", "INSERT", rollup_add),
+        ("delete", "DELETE", rollup_remove),
+        (
+            "update",
+            f"UPDATE OF date_payment, date_application, amount_cents, {rollup_key}",
+            rollup_remove + rollup_add,
+        ),
+    ):
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_transaction_rows_{operation}_monthly_rollup
+            AFTER {event} ON transaction_rows
+            BEGIN
+              {statements}
+            END
+            """
+        )
+
+    # Old entries go BEFORE the change, while the names they carry still exist.
+    fts_ids = "payer_id, payee_id, category_id, subcategory_id, notes, tags_text"
+    insert_new = f"""
+          INSERT INTO transactions_fts (rowid, {FTS_COLUMNS})
+          VALUES ({_fts_names_sql("NEW")});"""
+    delete_old = f"""
+          INSERT INTO transactions_fts (transactions_fts, rowid, {FTS_COLUMNS})
+          VALUES ('delete', {_fts_names_sql("OLD")});"""
+    for trigger, event, statements in (
+        ("trg_transaction_rows_insert_fts", "AFTER INSERT", insert_new),
+        ("trg_transaction_rows_delete_fts", "BEFORE DELETE", delete_old),
+        ("trg_transaction_rows_update_fts_old", f"BEFORE UPDATE OF {fts_ids}", delete_old),
+        ("trg_transaction_rows_update_fts_new", f"AFTER UPDATE OF {fts_ids}", insert_new),
+    ):
+        conn.execute(
+            f"""
+            CREATE TRIGGER {trigger}
+            {event} ON transaction_rows
+            BEGIN
+              {statements}
+            END
+            """
+        )
+    fts_columns = [column.strip() for column in FTS_COLUMNS.split(",")]
+    for column, table in DIMENSIONS:
+        if column not in fts_columns:
+            continue
+        old_values = ", ".join("OLD.name" if name == column else name for name in fts_columns)
+        rows = (
+            "FROM transactions "
+            f"WHERE id IN (SELECT id FROM transaction_rows WHERE {column}_id = NEW.id)"
+        )
+        conn.execute(
+            f"""
+            CREATE TRIGGER trg_{table}_update_fts
+            AFTER UPDATE OF name ON {table}
+            BEGIN
+              INSERT INTO transactions_fts (transactions_fts, rowid, {FTS_COLUMNS})
+              SELECT 'delete', id, {old_values} {rows};
+              INSERT INTO transactions_fts (rowid, {FTS_COLUMNS})
+              SELECT id, {FTS_COLUMNS} {rows};
+            END
+            """
+        )
+
+
+def _migrate_to_v8(conn: sqlite3.Connection) -> None:
+    # ALTER TABLE cannot add NOT NULL columns checked against the dates to a filled table,
+    # so transaction_rows is rebuilt. The view and the triggers naming the table are dropped
+    # first: the final rename re-checks them while the table is missing.
+    conn.execute("DROP VIEW transactions")
+    triggers = conn.execute(
+        """
+        SELECT name FROM sqlite_master
+        WHERE type = 'trigger' AND tbl_name <> 'transaction_rows' AND sql LIKE '%transaction_rows%'
+        """
+    ).fetchall()
+    for row in triggers:
+        conn.execute(f"DROP TRIGGER {row[0]}")
+    _create_transaction_rows(conn, "transaction_rows_v8", days=True)
+    columns = (
+        "id, date_payment, date_application, amount_cents, "
+        + ", ".join(f"{column}_id" for column, _ in DIMENSIONS)
+        + ", notes, tags_text"
+    )
+    days = ", ".join(_day_sql(column) for column in _DATE_COLUMNS)
+    conn.execute(
+        f"""
+        INSERT INTO transaction_rows_v8 ({columns}, date_payment_day, date_application_day)
+        SELECT {columns}, {days} FROM transaction_rows
+        """
+    )
+    _rebuild_transaction_tags(conn, "transaction_rows_v8")
+    conn.execute("DROP TABLE transaction_rows")
+    conn.execute("ALTER TABLE transaction_rows_v8 RENAME TO transaction_rows")
+    # The plain date indexes order rows by (day, id), as listings and keyset pages sort.
+    date_indexes = [
+        ("idx_transactions_date_payment", "date_payment_day"),
+        ("idx_transactions_date_application", "date_application_day"),
+    ]
+    for name, columns in date_indexes + COVERING_INDEXES + _ID_INDEXES:
+        conn.execute(f"CREATE INDEX {name} ON transaction_rows({columns})")
+    _create_transactions_view(conn, days=True)
+    _create_row_triggers(conn)
+
+
+def _migrate_to_v9(conn: sqlite3.Connection) -> None:
+    # AUTOINCREMENT so a log position is never handed out twice, even after the newest
+    # entries are deleted. Adding it needs a rebuild; the triggers writing the log are
+    # dropped with it and recreated.
+    for action in ("insert", "delete", "update"):
+        conn.execute(f"DROP TRIGGER trg_transaction_tags_{action}_tag_changes")
+    conn.execute(
+        """
+        CREATE TABLE tag_changes_v9 (
+          seq INTEGER PRIMARY KEY AUTOINCREMENT,
+          transaction_id INTEGER NOT NULL,
+          tag_id INTEGER NOT NULL,
+          added INTEGER NOT NULL CHECK (added IN (0, 1))
+        )
+        """
+    )
+    conn.execute("INSERT INTO tag_changes_v9 SELECT * FROM tag_changes")
+    conn.execute("DROP TABLE tag_changes")
+    conn.execute("ALTER TABLE tag_changes_v9 RENAME TO tag_changes")
+    _create_tag_change_triggers(conn)
+
+
+def _migrate_to_v10(conn: sqlite3.Connection) -> None:
+    # The view also exposes the lookup ids, so filters can match
+    # payer_id IN (SELECT id FROM payers ...) against the id indexes instead of comparing
+    # names row by row. Dropping the view drops its INSTEAD OF triggers; both are recreated.
+    conn.execute("DROP VIEW transactions")
+    _create_transactions_view(conn, days=True, ids=True)
+
+
+MIGRATIONS: List[Tuple[int, Callable[[sqlite3.Connection], None]]] = [
+    (1, _migrate_to_v1),
+    (2, _migrate_to_v2),
+    (3, _migrate_to_v3),
+    (4, _migrate_to_v4),
+    (5, _migrate_to_v5),
+    (6, _migrate_to_v6),
+    (7, _migrate_to_v7),
+    (8, _migrate_to_v8),
+    (9, _migrate_to_v9),
+    (10, _migrate_to_v10),
+]
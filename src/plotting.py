@@ -7,6 +7,12 @@ import pandas as pd
 DEFAULT_COLORS = ["#4E79A7", "#F28E2B", "#E15759", "#76B7B2", "#59A14F"]
 
 
+def _period_color_scale(period_order: List[str]) -> alt.Scale:
+    if len(period_order) <= len(DEFAULT_COLORS):
+        return alt.Scale(domain=period_order, range=DEFAULT_COLORS[: len(period_order)])
+    return alt.Scale(domain=period_order, scheme="tableau20")
+
+
 def grouped_bar_chart(
     df: pd.DataFrame,
     group_label: str,
@@ -18,7 +24,7 @@ def grouped_bar_chart(
     if subset.empty:
         return alt.Chart(pd.DataFrame({"node_label": [], value_field: []})).mark_bar()
 
-    color_scale = alt.Scale(domain=period_order, range=DEFAULT_COLORS[: len(period_order)])
+    color_scale = _period_color_scale(period_order)
     value_title = value_title or value_field
 
     chart = (
@@ -55,7 +61,7 @@ def node_bar_chart(
         return alt.Chart(pd.DataFrame({"period_label": [], value_field: []})).mark_bar()
 
     value_title = value_title or value_field
-    color_scale = alt.Scale(domain=period_order, range=DEFAULT_COLORS[: len(period_order)])
+    color_scale = _period_color_scale(period_order)
     chart = (
         alt.Chart(subset)
         .mark_bar()
@@ -76,3 +82,37 @@ def node_bar_chart(
         .properties(height=260)
     )
     return chart
+
+
+def time_series_line_chart(
+    df: pd.DataFrame,
+    group_label: str,
+    value_field: str,
+    node_order: List[str],
+    value_title: Optional[str] = None,
+) -> alt.Chart:
+    subset = df[df["group_label"] == group_label]
+    if subset.empty:
+        return alt.Chart(pd.DataFrame({"bucket_start": [], value_field: []})).mark_line()
+
+    value_title = value_title or value_field
+    chart = (
+        alt.Chart(subset)
+        .mark_line(point=True)
+        .encode(
+            x=alt.X("bucket_start:T", title=""),
+            y=alt.Y(f"{value_field}:Q", title=value_title, axis=alt.Axis(format=",.2f")),
+            color=alt.Color("node_label:N", sort=node_order, legend=alt.Legend(title="Node")),
+            strokeDash=alt.StrokeDash("period_label:N", legend=alt.Legend(title="Period")),
+            detail="period_label:N",
+            tooltip=[
+                alt.Tooltip("period_label:N"),
+                alt.Tooltip("bucket:N"),
+                alt.Tooltip("node_label:N"),
+                alt.Tooltip(f"{value_field}:Q", title=value_title, format=",.2f"),
+                alt.Tooltip("tx_count:Q"),
+            ],
+        )
+        .properties(height=320)
+    )
+    return chart
@@ -1,7 +1,9 @@
 import sqlite3
+import threading
+from dataclasses import dataclass
 from typing import Dict, Iterable, List, Optional, Tuple
 
-from src import db
+from src import date_utils, db, selections, tag_index, values
 
 ALLOWED_DISTINCT_COLUMNS = {"payer", "payee", "payment_type", "category", "subcategory"}
 DATE_FIELDS = {"date_payment", "date_application"}
@@ -10,10 +12,11 @@ DATE_FIELD_LABELS = {
     "date_payment": "Payment date",
     "date_application": "Application date",
 }
+# Dates sort on their day numbers (same order), which the covering indexes lead with.
 SORT_COLUMNS = {
     "id": "t.id",
-    "date_payment": "t.date_payment",
-    "date_application": "t.date_application",
+    "date_payment": "t.date_payment_day",
+    "date_application": "t.date_application_day",
     "amount_cents": "t.amount_cents",
     "payer": "t.payer",
     "payee": "t.payee",
@@ -21,21 +24,117 @@ SORT_COLUMNS = {
     "category": "t.category",
     "subcategory": "t.subcategory",
     "notes": "t.notes",
-    "tags": "tags",
+    "tags": "t.tags_text",
 }
+LIST_PAGE_SIZE = 200
+# The trigram index cannot answer terms shorter than one trigram; those still use LIKE.
+FTS_MIN_SEARCH_LENGTH = 3
+LIST_COLUMNS = (
+    "id",
+    "date_payment",
+    "date_application",
+    "amount_cents",
+    "payer",
+    "payee",
+    "payment_type",
+    "category",
+    "subcategory",
+    "notes",
+    "tags",
+)
+
+
+_CATALOG_LOCK = threading.Lock()
+_CATALOG_CACHE: Dict[str, Tuple[int, "DimensionCatalog"]] = {}
+
+
+@dataclass(frozen=True)
+class DimensionCatalog:
+    # Sorted option lists for the filter and editor widgets.
+    payers: List[str]
+    payees: List[str]
+    payment_types: List[str]
+    categories: List[str]
+    subcategories: List[str]
+    category_subcategory_pairs: List[Tuple[str, str]]
+    tags: List[str]
+
+
+def dimension_catalog(conn: sqlite3.Connection) -> DimensionCatalog:
+    # Cached per database file until the write counter moves; the counter lives in the
+    # file, so commits from other connections invalidate the entry as well. Inside a
+    # transaction the counter may count uncommitted writes, and a rollback hands it to the
+    # next commit, so the catalog is neither served from nor stored in the cache there.
+    key = db.database_key(conn)
+    if key is None or conn.in_transaction:
+        return build_dimension_catalog(conn)
+    counter = db.write_counter(conn)
+    with _CATALOG_LOCK:
+        cached = _CATALOG_CACHE.get(key)
+    if cached is not None and cached[0] == counter:
+        return cached[1]
+    catalog = build_dimension_catalog(conn)
+    with _CATALOG_LOCK:
+        _CATALOG_CACHE[key] = (counter, catalog)
+    return catalog
+
+
+def clear_catalog_cache() -> None:
+    with _CATALOG_LOCK:
+        _CATALOG_CACHE.clear()
+
+
+def build_dimension_catalog(conn: sqlite3.Connection) -> DimensionCatalog:
+    # One statement instead of a DISTINCT query per list: values come from the lookup
+    # tables, category/subcategory pairs from monthly_rollup (one row set per date field,
+    # emptied buckets are deleted), tag names from tags.
+    parts = [
+        f"""
+        SELECT '{column}' AS kind, name AS value, NULL AS subcategory
+        FROM {table}"""
+        for column, table in values.DIMENSION_TABLES.items()
+    ]
+    parts.append(
+        """
+        SELECT 'pair', c.name, s.name
+        FROM (
+          SELECT DISTINCT category_id, subcategory_id
+          FROM monthly_rollup
+          WHERE date_field = 'date_application' AND subcategory_id IS NOT NULL
+        ) r
+        JOIN categories c ON c.id = r.category_id
+        JOIN subcategories s ON s.id = r.subcategory_id"""
+    )
+    parts.append(
+        """
+        SELECT 'tag', name, NULL
+        FROM tags"""
+    )
+    rows = db.fetch_all(conn, "\n        UNION ALL".join(parts))
+    found: Dict[str, List[object]] = {}
+    for row in rows:
+        if row["kind"] == "pair":
+            found.setdefault("pair", []).append((row["value"], row["subcategory"]))
+        else:
+            found.setdefault(row["kind"], []).append(row["value"])
+    return DimensionCatalog(
+        payers=sorted(found.get("payer", [])),
+        payees=sorted(found.get("payee", [])),
+        payment_types=sorted(found.get("payment_type", [])),
+        categories=sorted(found.get("category", [])),
+        subcategories=sorted(found.get("subcategory", [])),
+        category_subcategory_pairs=sorted(found.get("pair", [])),
+        tags=sorted(found.get("tag", [])),
+    )
 
 
 def get_distinct_values(conn: sqlite3.Connection, column: str) -> List[str]:
     if column not in ALLOWED_DISTINCT_COLUMNS:
         raise ValueError(f"Unsupported column: {column}")
-    sql_map = {
-        "payer": "SELECT DISTINCT payer AS value FROM transactions WHERE payer IS NOT NULL ORDER BY payer",
-        "payee": "SELECT DISTINCT payee AS value FROM transactions WHERE payee IS NOT NULL ORDER BY payee",
-        "payment_type": "SELECT DISTINCT payment_type AS value FROM transactions WHERE payment_type IS NOT NULL ORDER BY payment_type",
-        "category": "SELECT DISTINCT category AS value FROM transactions WHERE category IS NOT NULL ORDER BY category",
-        "subcategory": "SELECT DISTINCT subcategory AS value FROM transactions WHERE subcategory IS NOT NULL ORDER BY subcategory",
-    }
-    rows = db.fetch_all(conn, sql_map[column])
+    # Lookup values are pruned with their last row, so the table lists exactly the values
+    # in use.
+    table = values.DIMENSION_TABLES[column]
+    rows = db.fetch_all(conn, f"SELECT name AS value FROM {table} ORDER BY name")
     return [row["value"] for row in rows]
 
 
@@ -72,76 +171,192 @@ def list_transactions(
     sort_by: Optional[str] = None,
     sort_dir: str = "desc",
     limit: Optional[int] = None,
+    columns: Optional[Iterable[str]] = None,
 ) -> List[sqlite3.Row]:
+    # `columns` limits the row to those LIST_COLUMNS (id is always included); None
+    # selects all of them.
+    select_sql = _list_select_sql(columns)
+    where_clauses, params, date_field = _build_list_filters(conn, filters)
+    where_sql = ""
+    if where_clauses:
+        where_sql = "WHERE " + " AND ".join(where_clauses)
+
+    order_sql = _build_order_by(sort_by or date_field, sort_dir, date_field)
+    limit_sql = ""
+    if isinstance(limit, int) and limit > 0:
+        limit_sql = "LIMIT ?"
+        params.append(limit)
+
+    sql = f"""
+        {select_sql}
+        {where_sql}
+        ORDER BY {order_sql}
+        {limit_sql}
+    """
+    return db.fetch_all(conn, sql, params)
+
+
+def list_transactions_page(
+    conn: sqlite3.Connection,
+    filters: Dict[str, object],
+    sort_by: Optional[str] = None,
+    sort_dir: str = "desc",
+    after: Optional[Tuple[object, int]] = None,
+    limit: int = LIST_PAGE_SIZE,
+    columns: Optional[Iterable[str]] = None,
+) -> Tuple[List[sqlite3.Row], Optional[Tuple[object, int]]]:
+    # Keyset pagination in list_transactions order: `after` is the (sort value, id) of
+    # the last row already shown. Returns the page and the cursor for the next one
+    # (None on the last page). A `columns` projection also keeps the sort column.
+    if limit < 1:
+        raise ValueError("Invalid page size")
+    where_clauses, params, date_field = _build_list_filters(conn, filters)
+    sort_key = _resolve_sort_key(sort_by or date_field, date_field)
+    select_sql = _list_select_sql(None if columns is None else list(columns) + [sort_key])
+    descending = str(sort_dir).lower() != "asc"
+    if after is not None:
+        value = after[0]
+        if sort_key in DATE_FIELDS:
+            # The cursor keeps the row's ISO date; the sort column is its day number.
+            value = date_utils.day_number(value)
+        keyset_sql, keyset_params = _keyset_clause(
+            SORT_COLUMNS[sort_key], descending, value, int(after[1])
+        )
+        where_clauses.append(keyset_sql)
+        params.extend(keyset_params)
+    where_sql = ""
+    if where_clauses:
+        where_sql = "WHERE " + " AND ".join(where_clauses)
+    order_sql = _build_order_by(sort_key, sort_dir, date_field)
+
+    sql = f"""
+        {select_sql}
+        {where_sql}
+        ORDER BY {order_sql}
+        LIMIT ?
+    """
+    # One extra row tells whether another page exists.
+    rows = db.fetch_all(conn, sql, params + [limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, (rows[-1][sort_key], int(rows[-1]["id"]))
+
+
+def summarize_transactions(
+    conn: sqlite3.Connection, filters: Dict[str, object]
+) -> Dict[str, object]:
+    # Figures for the rows list_transactions would return, from one aggregate query grouped
+    # by category. Outflow is what the selected payers paid and inflow what the selected
+    # payees received; each is None when that filter is not set.
+    where_clauses, where_params, date_field = _build_list_filters(conn, filters)
+    where_sql = ""
+    if where_clauses:
+        where_sql = "WHERE " + " AND ".join(where_clauses)
+    flow_sql: List[str] = []
+    params: List[object] = []
+    flow_keys = (("outflow_cents", "payer", "payers"), ("inflow_cents", "payee", "payees"))
+    for alias, column, key in flow_keys:
+        selected = _selected_values(filters.get(key))
+        if not selected:
+            flow_sql.append(f"0 AS {alias}")
+            continue
+        in_sql, in_params = selections.lookup_in_sql(conn, column, selected)
+        flow_sql.append(f"SUM(CASE WHEN {in_sql} THEN t.amount_cents ELSE 0 END) AS {alias}")
+        params.extend(in_params)
+    params.extend(where_params)
+    rows = db.fetch_all(
+        conn,
+        f"""
+        SELECT
+            t.category,
+            COUNT(*) AS tx_count,
+            SUM(t.amount_cents) AS amount_cents,
+            {", ".join(flow_sql)},
+            MIN(t.{date_field}) AS date_min,
+            MAX(t.{date_field}) AS date_max
+        FROM transactions t
+        {where_sql}
+        GROUP BY t.category
+        ORDER BY t.category
+        """,
+        params,
+    )
+    summary: Dict[str, object] = {
+        "tx_count": sum(int(row["tx_count"]) for row in rows),
+        "total_cents": sum(int(row["amount_cents"]) for row in rows),
+        "date_min": min((row["date_min"] for row in rows), default=None),
+        "date_max": max((row["date_max"] for row in rows), default=None),
+        "categories": [
+            {
+                "category": row["category"],
+                "tx_count": int(row["tx_count"]),
+                "amount_cents": int(row["amount_cents"]),
+            }
+            for row in rows
+        ],
+    }
+    for alias, _, key in flow_keys:
+        selected = _selected_values(filters.get(key))
+        summary[alias] = sum(int(row[alias]) for row in rows) if selected else None
+    return summary
+
+
+def _list_select_sql(columns: Optional[Iterable[str]]) -> str:
+    # Tags are read from the stored tags_text column, and SQLite drops the view's lookup
+    # joins whose names are not selected, so a narrow projection reads less per row.
+    if columns is None:
+        selected = list(LIST_COLUMNS)
+    else:
+        requested = set(_selected_values(columns)) | {"id"}
+        unknown = sorted(requested - set(LIST_COLUMNS))
+        if unknown:
+            raise ValueError(f"Unsupported columns: {', '.join(unknown)}")
+        selected = [column for column in LIST_COLUMNS if column in requested]
+    expressions = [
+        "t.tags_text AS tags" if column == "tags" else f"t.{column}" for column in selected
+    ]
+    return "SELECT " + ", ".join(expressions) + " FROM transactions t"
+
+
+def _build_list_filters(
+    conn: sqlite3.Connection, filters: Dict[str, object]
+) -> Tuple[List[str], List[object], str]:
     where_clauses: List[str] = []
     params: List[object] = []
+    selections.trim(conn)
 
     date_field = _resolve_date_field(filters.get("date_field"))
     _apply_date_filters(date_field, filters, where_clauses, params)
     _apply_optional_filter(
-        "t.payer",
+        conn,
+        "payer",
         filters.get("payers"),
         bool(filters.get("include_missing_payer")),
         where_clauses,
         params,
     )
     _apply_optional_filter(
-        "t.payee",
+        conn,
+        "payee",
         filters.get("payees"),
         bool(filters.get("include_missing_payee")),
         where_clauses,
         params,
     )
     _apply_optional_filter(
-        "t.payment_type",
+        conn,
+        "payment_type",
         filters.get("payment_types"),
         bool(filters.get("include_missing_payment_type")),
         where_clauses,
         params,
     )
-    _apply_list_filter("t.category", filters.get("categories"), where_clauses, params)
-    _apply_subcategory_filter(filters.get("subcategory_pairs"), where_clauses, params)
-    _apply_tag_filter(filters.get("tags"), where_clauses, params)
+    _apply_list_filter(conn, "category", filters.get("categories"), where_clauses, params)
+    _apply_subcategory_filter(conn, filters.get("subcategory_pairs"), where_clauses, params)
+    _apply_tag_filter(conn, filters.get("tags"), where_clauses, params)
     _apply_search_filter(filters.get("search"), where_clauses, params)
-
-    where_sql = ""
-    if where_clauses:
-        where_sql = "WHERE " + " AND ".join(where_clauses)
-
-    order_sql = _build_order_by(sort_by or date_field, sort_dir, date_field)
-    limit_sql = ""
-    if isinstance(limit, int) and limit > 0:
-        limit_sql = "LIMIT ?"
-        params.append(limit)
-
-    sql = f"""
-        SELECT
-            t.id,
-            t.date_payment,
-            t.date_application,
-            t.amount_cents,
-            t.payer,
-            t.payee,
-            t.payment_type,
-            t.category,
-            t.subcategory,
-            t.notes,
-            (
-                SELECT GROUP_CONCAT(name, ',')
-                FROM (
-                    SELECT tg.name AS name
-                    FROM tags tg
-                    JOIN transaction_tags tt ON tt.tag_id = tg.id
-                    WHERE tt.transaction_id = t.id
-                    ORDER BY tg.name
-                )
-            ) AS tags
-        FROM transactions t
-        {where_sql}
-        ORDER BY {order_sql}
-        {limit_sql}
-    """
-    return db.fetch_all(conn, sql, params)
+    return where_clauses, params, date_field
 
 
 def get_transaction(conn: sqlite3.Connection, transaction_id: int) -> Optional[sqlite3.Row]:
@@ -179,34 +394,40 @@ def update_transaction(
     subcategory: Optional[str],
     notes: Optional[str],
 ) -> None:
-    db.execute(
-        conn,
-        """
-        UPDATE transactions
-        SET date_payment = ?,
-            date_application = ?,
-            amount_cents = ?,
-            payer = ?,
-            payee = ?,
-            payment_type = ?,
-            category = ?,
-            subcategory = ?,
-            notes = ?
-        WHERE id = ?
-        """,
-        (
-            date_payment,
-            date_application,
-            amount_cents,
-            payer,
-            payee,
-            payment_type,
-            category,
-            subcategory,
-            notes,
-            transaction_id,
-        ),
-    )
+    # Ids are resolved inside the savepoint so a failed write leaves no new lookup values.
+    with db.savepoint(conn):
+        db.execute(
+            conn,
+            """
+            UPDATE transaction_rows
+            SET date_payment = ?,
+                date_application = ?,
+                date_payment_day = ?,
+                date_application_day = ?,
+                amount_cents = ?,
+                payer_id = ?,
+                payee_id = ?,
+                payment_type_id = ?,
+                category_id = ?,
+                subcategory_id = ?,
+                notes = ?
+            WHERE id = ?
+            """,
+            (
+                date_payment,
+                date_application,
+                date_utils.day_number(date_payment),
+                date_utils.day_number(date_application),
+                amount_cents,
+                values.value_id(conn, "payer", payer),
+                values.value_id(conn, "payee", payee),
+                values.value_id(conn, "payment_type", payment_type),
+                values.value_id(conn, "category", category),
+                values.value_id(conn, "subcategory", subcategory),
+                notes,
+                transaction_id,
+            ),
+        )
 
 
 def insert_transaction(
@@ -221,52 +442,63 @@ def insert_transaction(
     subcategory: Optional[str],
     notes: Optional[str],
 ) -> int:
-    cursor = db.execute(
-        conn,
-        """
-        INSERT INTO transactions (
-            date_payment,
-            date_application,
-            amount_cents,
-            payer,
-            payee,
-            payment_type,
-            category,
-            subcategory,
-            notes
+    # Written to transaction_rows directly: an insert through the view reports no rowid.
+    # Ids are resolved inside the savepoint so a failed write leaves no new lookup values.
+    with db.savepoint(conn):
+        cursor = db.execute(
+            conn,
+            """
+            INSERT INTO transaction_rows (
+                date_payment,
+                date_application,
+                date_payment_day,
+                date_application_day,
+                amount_cents,
+                payer_id,
+                payee_id,
+                payment_type_id,
+                category_id,
+                subcategory_id,
+                notes
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                date_payment,
+                date_application,
+                date_utils.day_number(date_payment),
+                date_utils.day_number(date_application),
+                amount_cents,
+                values.value_id(conn, "payer", payer),
+                values.value_id(conn, "payee", payee),
+                values.value_id(conn, "payment_type", payment_type),
+                values.value_id(conn, "category", category),
+                values.value_id(conn, "subcategory", subcategory),
+                notes,
+            ),
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            date_payment,
-            date_application,
-            amount_cents,
-            payer,
-            payee,
-            payment_type,
-            category,
-            subcategory,
-            notes,
-        ),
-    )
     if cursor.lastrowid is None:
         raise ValueError("Failed to insert transaction")
     return int(cursor.lastrowid)
 
 
 def delete_transaction(conn: sqlite3.Connection, transaction_id: int) -> None:
-    db.execute(conn, "DELETE FROM transactions WHERE id = ?", (transaction_id,))
+    db.execute(conn, "DELETE FROM transaction_rows WHERE id = ?", (transaction_id,))
 
 
 def get_date_bounds(
     conn: sqlite3.Connection, date_field: str
 ) -> Tuple[Optional[str], Optional[str]]:
     date_field = _resolve_date_field(date_field)
-    sql = f"SELECT MIN({date_field}) AS min_date, MAX({date_field}) AS max_date FROM transactions"
+    # One subquery per bound: each is a single seek on the day-leading covering index.
+    sql = (
+        f"SELECT (SELECT MIN({date_field}_day) FROM transaction_rows) AS min_day, "
+        f"(SELECT MAX({date_field}_day) FROM transaction_rows) AS max_day"
+    )
     row = db.fetch_one(conn, sql)
-    if row is None:
+    if row is None or row["min_day"] is None:
         return None, None
-    return row["min_date"], row["max_date"]
+    return date_utils.day_to_iso(row["min_day"]), date_utils.day_to_iso(row["max_day"])
 
 
 def _apply_date_filters(
@@ -275,11 +507,11 @@ def _apply_date_filters(
     start_date = filters.get("date_start")
     end_date = filters.get("date_end")
     if start_date:
-        where_clauses.append(f"t.{date_field} >= ?")
-        params.append(start_date)
+        where_clauses.append(f"t.{date_field}_day >= ?")
+        params.append(date_utils.day_number(start_date))
     if end_date:
-        where_clauses.append(f"t.{date_field} <= ?")
-        params.append(end_date)
+        where_clauses.append(f"t.{date_field}_day <= ?")
+        params.append(date_utils.day_number(end_date))
 
 
 def _resolve_date_field(value: object) -> str:
@@ -288,98 +520,76 @@ def _resolve_date_field(value: object) -> str:
     return DEFAULT_DATE_FIELD
 
 
+def _selected_values(values: object) -> List[object]:
+    if isinstance(values, str):
+        return [values]
+    if isinstance(values, Iterable):
+        return list(values)
+    return []
+
+
 def _apply_list_filter(
+    conn: sqlite3.Connection,
     column: str,
     values: object,
     where_clauses: List[str],
     params: List[object],
 ) -> None:
-    if not values:
-        return
-    if isinstance(values, str):
-        selected = [values]
-    elif isinstance(values, Iterable):
-        selected = list(values)
-    else:
-        selected = []
+    selected = _selected_values(values)
     if not selected:
         return
-    placeholders = ",".join("?" for _ in selected)
-    where_clauses.append(f"{column} IN ({placeholders})")
-    params.extend(selected)
+    in_sql, in_params = selections.lookup_in_sql(conn, column, selected)
+    where_clauses.append(in_sql)
+    params.extend(in_params)
 
 
-def _apply_tag_filter(values: object, where_clauses: List[str], params: List[object]) -> None:
+def _apply_tag_filter(
+    conn: sqlite3.Connection, values: object, where_clauses: List[str], params: List[object]
+) -> None:
     if not values:
         return
-    if isinstance(values, str):
-        selected = [values]
-    elif isinstance(values, Iterable):
-        selected = list(values)
-    else:
-        selected = []
+    selected = _selected_values(values)
     if not selected:
         return
-    placeholders = ",".join("?" for _ in selected)
-    where_clauses.append(
-        "EXISTS ("
-        "SELECT 1 "
-        "FROM transaction_tags tt "
-        "JOIN tags tg ON tg.id = tt.tag_id "
-        "WHERE tt.transaction_id = t.id "
-        "  AND tg.name IN (" + placeholders + ")"
-        ")"
-    )
-    params.extend(selected)
+    tag_sql, tag_params = tag_index.id_filter_sql(conn, "t.id", selected)
+    where_clauses.append(tag_sql)
+    params.extend(tag_params)
 
 
 def _apply_optional_filter(
+    conn: sqlite3.Connection,
     column: str,
     values: object,
     include_missing: bool,
     where_clauses: List[str],
     params: List[object],
 ) -> None:
-    if isinstance(values, str):
-        selected = [values]
-    elif isinstance(values, Iterable):
-        selected = list(values)
-    else:
-        selected = []
-    if not selected:
-        if include_missing:
-            where_clauses.append(f"{column} IS NULL")
+    selected = _selected_values(values)
+    if not selected and not include_missing:
         return
-    parts: List[str] = []
-    placeholders = ",".join("?" for _ in selected)
-    parts.append(f"{column} IN ({placeholders})")
-    params.extend(selected)
-    if include_missing:
-        parts.append(f"{column} IS NULL")
-    where_clauses.append("(" + " OR ".join(parts) + ")")
+    in_sql, in_params = selections.lookup_in_sql(conn, column, selected, include_missing)
+    where_clauses.append(in_sql)
+    params.extend(in_params)
 
 
 def _apply_subcategory_filter(
-    pairs: object, where_clauses: List[str], params: List[object]
+    conn: sqlite3.Connection, pairs: object, where_clauses: List[str], params: List[object]
 ) -> None:
     if not pairs:
         return
-    if isinstance(pairs, tuple):
-        pairs_list = [pairs]
-    elif isinstance(pairs, Iterable):
-        pairs_list = list(pairs)
-    else:
-        pairs_list = []
+    # A lone (category, subcategory) tuple is one pair, not two values.
+    pairs_list = [pairs] if isinstance(pairs, tuple) else _selected_values(pairs)
     if not pairs_list:
         return
-    parts: List[str] = []
-    for pair in pairs_list:
-        if not isinstance(pair, tuple) or len(pair) != 2:
-            continue
-        parts.append("(t.category = ? AND t.subcategory = ?)")
-        params.extend([pair[0], pair[1]])
-    if parts:
-        where_clauses.append("(" + " OR ".join(parts) + ")")
+    valid = [pair for pair in pairs_list if isinstance(pair, tuple) and len(pair) == 2]
+    if valid:
+        pairs_sql, pairs_params = selections.pairs_in_sql(conn, ("c.name", "s.name"), valid)
+        # Resolved to id pairs once, so the rows are matched on their id columns.
+        where_clauses.append(
+            "(t.category_id, t.subcategory_id) IN "
+            f"(SELECT c.id, s.id FROM categories c, subcategories s WHERE {pairs_sql})"
+        )
+        params.extend(pairs_params)
 
 
 def _apply_search_filter(search: object, where_clauses: List[str], params: List[object]) -> None:
@@ -388,6 +598,28 @@ def _apply_search_filter(search: object, where_clauses: List[str], params: List[
     cleaned = search.strip().lower()
     if not cleaned:
         return
+    if len(cleaned) >= FTS_MIN_SEARCH_LENGTH:
+        # Quoted so the term is one trigram phrase: a case-insensitive substring match
+        # within one of the text columns. Tags are matched name by name instead: in the
+        # comma-joined tags_text a term could span two adjacent tags.
+        escaped = cleaned.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where_clauses.append(
+            """
+            (
+                t.id IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH ?) OR
+                t.id IN (
+                    SELECT transaction_id
+                    FROM transaction_tags
+                    WHERE tag_id IN (SELECT id FROM tags WHERE name LIKE ? ESCAPE '\\')
+                )
+            )
+            """
+        )
+        phrase = '"' + cleaned.replace('"', '""') + '"'
+        params.extend(
+            ["{payer payee category subcategory notes} : " + phrase, f"%{escaped}%"]
+        )
+        return
     like = f"%{cleaned}%"
     where_clauses.append(
         """
@@ -411,10 +643,31 @@ def _apply_search_filter(search: object, where_clauses: List[str], params: List[
 
 
 def _build_order_by(sort_by: str, sort_dir: str, fallback_date_field: str) -> str:
-    column = SORT_COLUMNS.get(sort_by)
-    if column is None:
-        column = SORT_COLUMNS.get(fallback_date_field, "t.date_application")
+    column = SORT_COLUMNS[_resolve_sort_key(sort_by, fallback_date_field)]
     direction = "DESC" if str(sort_dir).lower() != "asc" else "ASC"
-    if column == "tags":
-        return f"{column} {direction}, t.id DESC"
     return f"{column} {direction}, t.id DESC"
+
+
+def _resolve_sort_key(sort_by: Optional[str], fallback_date_field: str) -> str:
+    if sort_by in SORT_COLUMNS:
+        return str(sort_by)
+    if fallback_date_field in SORT_COLUMNS:
+        return fallback_date_field
+    return DEFAULT_DATE_FIELD
+
+
+def _keyset_clause(
+    column: str, descending: bool, value: object, last_id: int
+) -> Tuple[str, List[object]]:
+    # Rows after (value, last_id) in "column <dir>, t.id DESC" order. SQLite sorts NULLs
+    # first ascending and last descending.
+    if value is None:
+        if descending:
+            return f"({column} IS NULL AND t.id < ?)", [last_id]
+        return f"({column} IS NOT NULL OR t.id < ?)", [last_id]
+    if descending:
+        return (
+            f"({column} < ? OR {column} IS NULL OR ({column} = ? AND t.id < ?))",
+            [value, value, last_id],
+        )
+    return f"({column} > ? OR ({column} = ? AND t.id < ?))", [value, value, last_id]
@@ -0,0 +1,129 @@
+import logging
+import re
+import sqlite3
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set
+
+LOGGER = logging.getLogger(__name__)
+WATCHED_TABLES = ("transactions", "transaction_rows", "transaction_tags")
+EXPLAINABLE_PREFIXES = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_TABLE_REF = re.compile(
+    r"\b(?:FROM|JOIN|UPDATE|INTO)\s+([A-Za-z_][A-Za-z0-9_]*)"
+    r"(?:\s+(?:AS\s+)?(?!ON\b|WHERE\b|JOIN\b|LEFT\b|INNER\b|CROSS\b|GROUP\b|ORDER\b|LIMIT\b"
+    r"|SET\b|USING\b|VALUES\b|UNION\b|HAVING\b|NATURAL\b)([A-Za-z_][A-Za-z0-9_]*))?",
+    re.IGNORECASE,
+)
+_PLAN_STEP = re.compile(r"^(SCAN|SEARCH)\s+([A-Za-z_][A-Za-z0-9_]*)(.*)$")
+_INDEX_NAME = re.compile(r"USING (?:COVERING )?INDEX ([A-Za-z_][A-Za-z0-9_]*)")
+
+
+@dataclass
+class PlanRecord:
+    sql: str
+    plan: List[str]
+    indexes: Set[str]
+    scanned_tables: Set[str]
+    executions: int = 0
+
+
+@dataclass
+class QueryPlanRecorder:
+    records: Dict[str, PlanRecord] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def inspect(self, conn: sqlite3.Connection, sql: str, params: Sequence[object] = ()) -> None:
+        key = _normalize_sql(sql)
+        if not key.upper().startswith(EXPLAINABLE_PREFIXES):
+            return
+        with self.lock:
+            record = self.records.get(key)
+            if record is not None:
+                record.executions += 1
+                return
+        record = explain(conn, sql, params)
+        if record is None:
+            return
+        record.executions = 1
+        with self.lock:
+            self.records.setdefault(key, record)
+        for table in sorted(record.scanned_tables):
+            LOGGER.warning("Full scan of %s: %s | plan: %s", table, key, "; ".join(record.plan))
+
+    def summary(self) -> List[Dict[str, object]]:
+        with self.lock:
+            records = list(self.records.values())
+        return [
+            {
+                "sql": record.sql,
+                "executions": record.executions,
+                "indexes": ", ".join(sorted(record.indexes)),
+                "full_scans": ", ".join(sorted(record.scanned_tables)),
+                "plan": "; ".join(record.plan),
+            }
+            for record in sorted(records, key=lambda item: (not item.scanned_tables, item.sql))
+        ]
+
+    def clear(self) -> None:
+        with self.lock:
+            self.records.clear()
+
+
+_ACTIVE: ContextVar[Optional[QueryPlanRecorder]] = ContextVar("query_plan_recorder", default=None)
+
+
+def activate(recorder: Optional[QueryPlanRecorder]) -> None:
+    _ACTIVE.set(recorder)
+
+
+def active_recorder() -> Optional[QueryPlanRecorder]:
+    return _ACTIVE.get()
+
+
+def record(conn: sqlite3.Connection, sql: str, params: Sequence[object] = ()) -> None:
+    recorder = _ACTIVE.get()
+    if recorder is not None:
+        recorder.inspect(conn, sql, params)
+
+
+def explain(
+    conn: sqlite3.Connection, sql: str, params: Sequence[object] = ()
+) -> Optional[PlanRecord]:
+    try:
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    except sqlite3.Error:
+        return None
+    aliases = _table_aliases(sql)
+    plan: List[str] = []
+    indexes: Set[str] = set()
+    scanned: Set[str] = set()
+    for row in rows:
+        detail = str(row[3])
+        plan.append(detail)
+        index_match = _INDEX_NAME.search(detail)
+        if index_match:
+            indexes.add(index_match.group(1))
+        elif "INTEGER PRIMARY KEY" in detail:
+            indexes.add("INTEGER PRIMARY KEY")
+        step = _PLAN_STEP.match(detail)
+        if step and step.group(1) == "SCAN":
+            table = aliases.get(step.group(2).lower(), step.group(2).lower())
+            if table in WATCHED_TABLES:
+                scanned.add(table)
+    return PlanRecord(sql=_normalize_sql(sql), plan=plan, indexes=indexes, scanned_tables=scanned)
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    aliases: Dict[str, str] = {}
+    for match in _TABLE_REF.finditer(sql):
+        table = match.group(1).lower()
+        aliases[table] = table
+        if match.group(2):
+            aliases[match.group(2).lower()] = table
+    return aliases
+
+
+def _normalize_sql(sql: str) -> str:
+    return " ".join(sql.split())
@@ -0,0 +1,143 @@
+import hashlib
+import sqlite3
+from typing import Iterable, List, Sequence, Tuple
+
+from src import db, values
+
+# Selections up to this size are inlined as placeholders. Larger ones are stored in an
+# indexed temp table and matched with a subquery, so the statement text stays the same
+# whatever the size and never nears SQLite's bound-variable limit.
+TEMP_TABLE_THRESHOLD = 64
+# Stored selections kept per connection between statements (see trim). A statement may
+# store more while it is built; none of those is evicted before the next trim.
+STORED_SELECTIONS_LIMIT = 64
+
+TEMP_SCHEMA_SQL = (
+    """
+    CREATE TEMP TABLE IF NOT EXISTS stored_selections (
+      seq INTEGER PRIMARY KEY,
+      selection TEXT NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS selected_values (
+      selection TEXT NOT NULL,
+      value NOT NULL,
+      PRIMARY KEY (selection, value)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TEMP TABLE IF NOT EXISTS selected_pairs (
+      selection TEXT NOT NULL,
+      first NOT NULL,
+      second NOT NULL,
+      PRIMARY KEY (selection, first, second)
+    ) WITHOUT ROWID
+    """,
+)
+
+_INSERT_SQL = {
+    "selected_values": "INSERT OR IGNORE INTO temp.selected_values VALUES (?, ?)",
+    "selected_pairs": "INSERT OR IGNORE INTO temp.selected_pairs VALUES (?, ?, ?)",
+}
+
+
+def trim(conn: sqlite3.Connection) -> None:
+    # Called by each statement builder before it stores anything: deletes the oldest
+    # stored selections beyond STORED_SELECTIONS_LIMIT. Eviction only happens here, so a
+    # statement keeps every selection it stores however many groups it covers.
+    # Read with plain execute: bookkeeping, not a query worth recording in plan reports.
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_temp_master WHERE name = 'stored_selections'"
+    ).fetchone()
+    if not exists:
+        return
+    row = conn.execute("SELECT MIN(seq), MAX(seq) FROM temp.stored_selections").fetchone()
+    if row[0] is None or row[0] > row[1] - STORED_SELECTIONS_LIMIT:
+        return
+    oldest = row[1] - STORED_SELECTIONS_LIMIT
+    owns_transaction = not conn.in_transaction
+    evicted = "SELECT selection FROM temp.stored_selections WHERE seq <= ?"
+    for stored in _INSERT_SQL:
+        conn.execute(f"DELETE FROM temp.{stored} WHERE selection IN ({evicted})", (oldest,))
+    conn.execute("DELETE FROM temp.stored_selections WHERE seq <= ?", (oldest,))
+    if owns_transaction:
+        conn.commit()
+
+
+def in_sql(
+    conn: sqlite3.Connection, column: str, values: Iterable[object]
+) -> Tuple[str, List[object]]:
+    selected = list(values)
+    if not selected:
+        return "0", []
+    if len(selected) <= TEMP_TABLE_THRESHOLD:
+        placeholders = ",".join("?" for _ in selected)
+        return f"{column} IN ({placeholders})", selected
+    key = _store(conn, "selected_values", selected, ((value,) for value in selected))
+    return f"{column} IN (SELECT value FROM temp.selected_values WHERE selection = ?)", [key]
+
+
+def lookup_in_sql(
+    conn: sqlite3.Connection, column: str, names: Iterable[str], include_missing: bool = False
+) -> Tuple[str, List[object]]:
+    # Rows of t whose lookup id for column belongs to one of names, matched through the
+    # id indexes; t is transaction_rows, the transactions view or monthly_rollup, which
+    # all carry the <column>_id columns.
+    id_column = f"t.{column}_id"
+    names_list = list(names)
+    if not names_list:
+        if include_missing:
+            return f"{id_column} IS NULL", []
+        return "0", []
+    table = values.DIMENSION_TABLES[column]
+    if len(names_list) == 1:
+        # An equality lets the planner also use the index order after the id column.
+        names_params: List[object] = names_list
+        ids_sql = f"{id_column} = (SELECT id FROM {table} WHERE name = ?)"
+    else:
+        names_sql, names_params = in_sql(conn, "name", names_list)
+        ids_sql = f"{id_column} IN (SELECT id FROM {table} WHERE {names_sql})"
+    if include_missing:
+        return f"({ids_sql} OR {id_column} IS NULL)", names_params
+    return ids_sql, names_params
+
+
+def pairs_in_sql(
+    conn: sqlite3.Connection, columns: Tuple[str, str], pairs: Iterable[Tuple[object, object]]
+) -> Tuple[str, List[object]]:
+    selected = [tuple(pair) for pair in pairs]
+    if not selected:
+        return "0", []
+    first, second = columns
+    if len(selected) <= TEMP_TABLE_THRESHOLD:
+        parts = [f"({first} = ? AND {second} = ?)" for _ in selected]
+        return "(" + " OR ".join(parts) + ")", [value for pair in selected for value in pair]
+    key = _store(conn, "selected_pairs", selected, selected)
+    return (
+        f"({first}, {second}) IN "
+        "(SELECT first, second FROM temp.selected_pairs WHERE selection = ?)",
+        [key],
+    )
+
+
+def _store(
+    conn: sqlite3.Connection, table: str, selected: Sequence[object], rows: Iterable[tuple]
+) -> str:
+    # Rows are keyed by a digest of the selection, so repeated queries (reruns, every cell
+    # of a comparison) reuse them. Whether a selection is stored is always read from the
+    # temp tables, never remembered here: a rollback removes the rows and the next call
+    # stores them again. A fragment built inside a transaction is only valid until it ends.
+    key = hashlib.sha1(repr(selected).encode("utf-8")).hexdigest()
+    for statement in TEMP_SCHEMA_SQL:
+        conn.execute(statement)
+    if db.fetch_one(conn, "SELECT 1 FROM temp.stored_selections WHERE selection = ?", (key,)):
+        return key
+    # Temp tables are private to the connection. Writing one still opens a transaction,
+    # which is closed again unless the caller already had one open.
+    owns_transaction = not conn.in_transaction
+    conn.execute("INSERT INTO temp.stored_selections (selection) VALUES (?)", (key,))
+    conn.executemany(_INSERT_SQL[table], ((key,) + row for row in rows))
+    if owns_transaction:
+        conn.commit()
+    return key
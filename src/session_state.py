@@ -4,7 +4,7 @@ from typing import Optional
 
 import streamlit as st
 
-from src import db, settings
+from src import db, migrations, query_plans, settings
 
 
 def ensure_db_session_state(
@@ -17,6 +17,11 @@ def ensure_db_session_state(
         close_conn = True
     app_settings = settings.get_app_settings(settings_conn)
 
+    if settings.EXPLAIN_QUERIES:
+        if "query_plan_recorder" not in st.session_state:
+            st.session_state.query_plan_recorder = query_plans.QueryPlanRecorder()
+        query_plans.activate(st.session_state.query_plan_recorder)
+
     if "db_path" not in st.session_state:
         raw_path = app_settings.get("last_used_db_path") or settings.DEFAULT_DB_PATH
         st.session_state.db_path = settings.normalize_db_path(raw_path) or raw_path
@@ -50,6 +55,7 @@ def ensure_db_session_state(
             try:
                 conn = db.connect(str(current_path))
                 if db.schema_is_valid(conn):
+                    migrations.migrate(conn)
                     st.session_state.db_ready = True
                     settings.update_app_settings(
                         settings_conn, last_used_db_path=str(current_path)
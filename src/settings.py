@@ -31,6 +31,7 @@ def _default_dir(env_name: str, subdir: str) -> str:
 DEFAULT_IMPORT_DIR = _default_dir("DOPT_CSV_IMPORT_DIR", "csv_import")
 DEFAULT_EXPORT_DIR = _default_dir("DOPT_CSV_EXPORT_DIR", "csv_export")
 DEFAULT_BACKUP_DIR = _default_dir("DOPT_DB_BACKUP_DIR", "db_backup")
+EXPLAIN_QUERIES = bool(os.environ.get("DOPT_EXPLAIN_QUERIES"))
 
 
 def normalize_db_path(path: Optional[str]) -> Optional[str]:
@@ -0,0 +1,166 @@
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+from src import db
+
+MATCH_ANY = "ANY"
+MATCH_ALL = "ALL"
+
+# Up to this many matching ids are bound as one JSON list, which lets SQLite drive the
+# query from the ids. Above it, the filter probes transaction_tags per row instead of
+# serializing (and re-parsing) a huge list on every query.
+ID_LIST_LIMIT = 5000
+
+_CACHE_LOCK = threading.Lock()
+_INDEX_CACHE: Dict[str, "TagIndex"] = {}
+
+
+@dataclass(frozen=True)
+class TagIndex:
+    # Bit N of a bitmap is set when transaction id N carries the tag.
+    bitmaps: Dict[int, int]
+    last_seq: int
+
+    def bitmap_for(self, tag_ids: Iterable[int], match: str = MATCH_ANY) -> int:
+        bitmaps = [self.bitmaps.get(tag_id, 0) for tag_id in tag_ids]
+        if not bitmaps:
+            return 0
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            if match == MATCH_ALL:
+                result &= bitmap
+            else:
+                result |= bitmap
+        return result
+
+
+def get_tag_index(conn: sqlite3.Connection) -> TagIndex:
+    key = db.database_key(conn)
+    if key is None:
+        return build_tag_index(conn)
+    with _CACHE_LOCK:
+        cached = _INDEX_CACHE.get(key)
+    index = refresh_tag_index(conn, cached) if cached is not None else build_tag_index(conn)
+    # Inside a transaction the index may include uncommitted changes whose log positions a
+    # rollback hands out again, so it is used for this call but not shared.
+    if index is not cached and not conn.in_transaction:
+        with _CACHE_LOCK:
+            _INDEX_CACHE[key] = index
+    return index
+
+
+def clear_cache() -> None:
+    with _CACHE_LOCK:
+        _INDEX_CACHE.clear()
+
+
+def build_tag_index(conn: sqlite3.Connection) -> TagIndex:
+    # Read the log position first: changes logged while the table is read are
+    # replayed on the next refresh, and replaying a change is idempotent.
+    last_seq = _last_seq(conn)
+    ids_by_tag: Dict[int, List[int]] = {}
+    for row in db.fetch_all(conn, "SELECT tag_id, transaction_id FROM transaction_tags"):
+        ids_by_tag.setdefault(int(row[0]), []).append(int(row[1]))
+    bitmaps = {tag_id: bitmap_from_ids(ids) for tag_id, ids in ids_by_tag.items()}
+    return TagIndex(bitmaps=bitmaps, last_seq=last_seq)
+
+
+def refresh_tag_index(conn: sqlite3.Connection, index: TagIndex) -> TagIndex:
+    row = db.fetch_one(conn, "SELECT MIN(seq), MAX(seq) FROM tag_changes")
+    first_seq = int(row[0]) if row and row[0] is not None else 0
+    last_seq = int(row[1]) if row and row[1] is not None else 0
+    if last_seq == index.last_seq:
+        return index
+    if last_seq < index.last_seq or first_seq > index.last_seq + 1:
+        # The log was pruned past this index (or belongs to another file).
+        return build_tag_index(conn)
+    bitmaps = dict(index.bitmaps)
+    changes = db.fetch_all(
+        conn,
+        "SELECT seq, transaction_id, tag_id, added FROM tag_changes WHERE seq > ? ORDER BY seq",
+        (index.last_seq,),
+    )
+    applied = index.last_seq
+    for seq, transaction_id, tag_id, added in changes:
+        bit = 1 << int(transaction_id)
+        current = bitmaps.get(int(tag_id), 0)
+        if added:
+            bitmaps[int(tag_id)] = current | bit
+        elif current & ~bit:
+            bitmaps[int(tag_id)] = current & ~bit
+        else:
+            bitmaps.pop(int(tag_id), None)
+        applied = int(seq)
+    return TagIndex(bitmaps=bitmaps, last_seq=applied)
+
+
+def tag_ids_for_names(conn: sqlite3.Connection, names: Iterable[str]) -> List[int]:
+    name_list = list(names)
+    if not name_list:
+        return []
+    placeholders = ",".join("?" for _ in name_list)
+    rows = db.fetch_all(
+        conn, f"SELECT id FROM tags WHERE name IN ({placeholders})", name_list
+    )
+    return [int(row[0]) for row in rows]
+
+
+def matching_bitmap(conn: sqlite3.Connection, names: List[str], match: str = MATCH_ANY) -> int:
+    return _matching(conn, names, match)[1]
+
+
+def id_filter_sql(
+    conn: sqlite3.Connection, column: str, names: List[str], match: str = MATCH_ANY
+) -> Tuple[str, List[object]]:
+    tag_ids, bitmap = _matching(conn, names, match)
+    if not bitmap:
+        return "0", []
+    if bitmap.bit_count() > ID_LIST_LIMIT:
+        exists_sql = (
+            f"EXISTS (SELECT 1 FROM transaction_tags tt WHERE tt.transaction_id = {column} "
+            "AND tt.tag_id = ?)"
+        )
+        joiner = " AND " if match == MATCH_ALL else " OR "
+        return "(" + joiner.join(exists_sql for _ in tag_ids) + ")", list(tag_ids)
+    return f"{column} IN (SELECT value FROM json_each(?))", [json.dumps(ids_from_bitmap(bitmap))]
+
+
+def bitmap_from_ids(ids: Iterable[int]) -> int:
+    id_list = list(ids)
+    if not id_list:
+        return 0
+    buffer = bytearray((max(id_list) >> 3) + 1)
+    for value in id_list:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def ids_from_bitmap(bitmap: int) -> List[int]:
+    bits = bin(bitmap)[:1:-1]
+    ids: List[int] = []
+    position = bits.find("1")
+    while position != -1:
+        ids.append(position)
+        position = bits.find("1", position + 1)
+    return ids
+
+
+def _matching(
+    conn: sqlite3.Connection, names: List[str], match: str
+) -> Tuple[List[int], int]:
+    # The resolved tag ids and the bitmap of transactions matching them.
+    if match not in {MATCH_ANY, MATCH_ALL}:
+        raise ValueError("Invalid tag match")
+    unique_names = list(dict.fromkeys(names))
+    tag_ids = tag_ids_for_names(conn, unique_names)
+    if match == MATCH_ALL and len(tag_ids) < len(unique_names):
+        return tag_ids, 0
+    return tag_ids, get_tag_index(conn).bitmap_for(tag_ids, match)
+
+
+def _last_seq(conn: sqlite3.Connection) -> int:
+    row = db.fetch_one(conn, "SELECT MAX(seq) FROM tag_changes")
+    return int(row[0]) if row and row[0] is not None else 0
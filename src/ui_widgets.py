@@ -2,6 +2,8 @@ from typing import Dict, Iterable, List, Optional, Tuple
 
 import streamlit as st
 
+from src import amounts
+
 _NO_MATCHES = "(no matches)"
 _NONE = "(none)"
 _MISSING = "Missing (NULL)"
@@ -149,6 +151,61 @@ def tags_filter(label: str, options: Iterable[str], key: str) -> List[str]:
     return multiselect_existing(label, options, key=key)
 
 
+def page_cursor(key: str, signature: object) -> Tuple[Optional[Tuple[object, int]], int]:
+    # Keyset pages are reached by a stack of cursors; new filters start over at page 1.
+    state = st.session_state.get(key)
+    if state is None or state["signature"] != signature:
+        state = {"signature": signature, "cursors": [None]}
+        st.session_state[key] = state
+    return state["cursors"][-1], len(state["cursors"])
+
+
+def page_controls(key: str, next_cursor: Optional[Tuple[object, int]]) -> None:
+    state = st.session_state[key]
+    prev_col, label_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("Previous page", key=f"{key}_prev", disabled=len(state["cursors"]) == 1):
+            state["cursors"].pop()
+            st.rerun()
+    with label_col:
+        st.caption(f"Page {len(state['cursors'])}")
+    with next_col:
+        if st.button("Next page", key=f"{key}_next", disabled=next_cursor is None):
+            state["cursors"].append(next_cursor)
+            st.rerun()
+
+
+def transaction_summary(summary: Dict[str, object]) -> None:
+    metrics = [
+        ("Transactions", f"{summary['tx_count']:,}"),
+        ("Total", amounts.format_cents(int(summary["total_cents"]))),
+    ]
+    for key, label in (
+        ("outflow_cents", "Paid by selected payers"),
+        ("inflow_cents", "Received by selected payees"),
+    ):
+        if summary[key] is not None:
+            metrics.append((label, amounts.format_cents(int(summary[key]))))
+    for column, (label, value) in zip(st.columns(len(metrics)), metrics):
+        column.metric(label, value)
+    if summary["date_min"] is None:
+        return
+    st.caption(f"Dates: {summary['date_min']} to {summary['date_max']}")
+    with st.expander("Totals by category"):
+        st.dataframe(
+            [
+                {
+                    "Category": item["category"],
+                    "Transactions": item["tx_count"],
+                    "Amount": amounts.format_cents(item["amount_cents"]),
+                }
+                for item in summary["categories"]
+            ],
+            width="stretch",
+            hide_index=True,
+        )
+
+
 def subcategory_label_map(
     pairs: Iterable[Tuple[str, str]], categories: Iterable[str]
 ) -> Tuple[List[str], Dict[str, Tuple[str, str]]]:
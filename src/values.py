@@ -1,10 +1,18 @@
 import sqlite3
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 from src import db
 
 
 DOPT_COLUMNS = {"payer", "payee", "payment_type", "category", "subcategory"}
+# Lookup table of each column; transaction_rows stores the ids as <column>_id.
+DIMENSION_TABLES = {
+    "payer": "payers",
+    "payee": "payees",
+    "payment_type": "payment_types",
+    "category": "categories",
+    "subcategory": "subcategories",
+}
 
 
 def normalize_finance_value(value: str) -> str:
@@ -14,18 +22,41 @@ def normalize_finance_value(value: str) -> str:
     return cleaned
 
 
+def value_id(
+    conn: sqlite3.Connection,
+    column: str,
+    value: Optional[str],
+    cache: Optional[Dict[Tuple[str, str], int]] = None,
+) -> Optional[int]:
+    # Id of a value in the column's lookup table, added when new; None for a missing value.
+    # Bulk writers pass one cache for the whole batch.
+    if value is None:
+        return None
+    if cache is not None and (column, value) in cache:
+        return cache[(column, value)]
+    table = DIMENSION_TABLES[column]
+    row = db.fetch_one(conn, f"SELECT id FROM {table} WHERE name = ?", (value,))
+    if row is not None:
+        found = int(row["id"])
+    else:
+        found = int(db.execute(conn, f"INSERT INTO {table} (name) VALUES (?)", (value,)).lastrowid)
+    if cache is not None:
+        cache[(column, value)] = found
+    return found
+
+
 def list_value_counts(conn: sqlite3.Connection, column: str) -> List[Tuple[str, int]]:
     if column not in DOPT_COLUMNS or column == "subcategory":
         raise ValueError(f"Unsupported column: {column}")
-    where_clause = "WHERE {col} IS NOT NULL".format(col=column) if column != "category" else ""
+    table = DIMENSION_TABLES[column]
     rows = db.fetch_all(
         conn,
         f"""
-        SELECT {column} AS value, COUNT(*) AS count
-        FROM transactions
-        {where_clause}
-        GROUP BY {column}
-        ORDER BY count DESC, {column}
+        SELECT v.name AS value, COUNT(*) AS count
+        FROM transaction_rows t
+        JOIN {table} v ON v.id = t.{column}_id
+        GROUP BY t.{column}_id
+        ORDER BY count DESC, v.name
         """,
     )
     return [(row["value"], int(row["count"])) for row in rows]
@@ -33,19 +64,20 @@ def list_value_counts(conn: sqlite3.Connection, column: str) -> List[Tuple[str,
 
 def list_subcategory_counts(conn: sqlite3.Connection, category: Optional[str] = None) -> List[Tuple[str, str, int]]:
     params: List[object] = []
-    where_parts = ["subcategory IS NOT NULL"]
+    where_sql = ""
     if category:
-        where_parts.append("category = ?")
+        where_sql = "WHERE c.name = ?"
         params.append(category)
-    where_sql = " AND ".join(where_parts)
     rows = db.fetch_all(
         conn,
         f"""
-        SELECT category, subcategory, COUNT(*) AS count
-        FROM transactions
-        WHERE {where_sql}
-        GROUP BY category, subcategory
-        ORDER BY category, subcategory
+        SELECT c.name AS category, s.name AS subcategory, COUNT(*) AS count
+        FROM transaction_rows t
+        JOIN categories c ON c.id = t.category_id
+        JOIN subcategories s ON s.id = t.subcategory_id
+        {where_sql}
+        GROUP BY t.category_id, t.subcategory_id
+        ORDER BY c.name, s.name
         """,
         params,
     )
@@ -61,21 +93,46 @@ def rename_value(
 ) -> int:
     if column not in DOPT_COLUMNS:
         raise ValueError(f"Unsupported column: {column}")
-    if column == "subcategory":
-        if not category:
-            raise ValueError("Category is required for subcategory rename")
-        cursor = db.execute(
-            conn,
-            "UPDATE transactions SET subcategory = ? WHERE category = ? AND subcategory = ?",
-            (new_value, category, old_value),
-        )
-        return cursor.rowcount
-    cursor = db.execute(
+    if column == "subcategory" and not category:
+        raise ValueError("Category is required for subcategory rename")
+    table = DIMENSION_TABLES[column]
+    old_row = db.fetch_one(conn, f"SELECT id FROM {table} WHERE name = ?", (old_value,))
+    if old_row is None:
+        return 0
+    old_id = int(old_row["id"])
+    where_sql, params = _scoped_rows_sql(column, old_id, category)
+    row = db.fetch_one(
+        conn, f"SELECT COUNT(*) AS count FROM transaction_rows WHERE {where_sql}", params
+    )
+    count = int(row["count"]) if row else 0
+    if not count:
+        return 0
+    # Subcategory names are shared across categories; a scoped rename of a shared name
+    # has to move the rows instead.
+    shared = column == "subcategory" and db.fetch_one(
         conn,
-        f"UPDATE transactions SET {column} = ? WHERE {column} = ?",
-        (new_value, old_value),
+        """
+        SELECT 1 FROM transaction_rows
+        WHERE subcategory_id = ? AND category_id <> (SELECT id FROM categories WHERE name = ?)
+        LIMIT 1
+        """,
+        (old_id, category),
     )
-    return cursor.rowcount
+    new_row = db.fetch_one(conn, f"SELECT id FROM {table} WHERE name = ?", (new_value,))
+    if new_row is None and not shared:
+        # A plain rename is one lookup row; transaction_rows and the rollup keep their ids.
+        db.execute(conn, f"UPDATE {table} SET name = ? WHERE id = ?", (new_value, old_id))
+        return count
+    # Merge into an existing value (the old one is pruned once unused). A new value for a
+    # shared subcategory is only kept if the rows move.
+    with db.savepoint(conn):
+        new_id = value_id(conn, column, new_value)
+        db.execute(
+            conn,
+            f"UPDATE transaction_rows SET {column}_id = ? WHERE {where_sql}",
+            [new_id] + params,
+        )
+    return count
 
 
 def clear_value(
@@ -88,23 +145,32 @@ def clear_value(
         raise ValueError(f"Unsupported column: {column}")
     if column == "category":
         raise ValueError("Category cannot be cleared")
-    if column == "subcategory":
-        if not category:
-            raise ValueError("Category is required for subcategory delete")
-        cursor = db.execute(
-            conn,
-            "UPDATE transactions SET subcategory = NULL WHERE category = ? AND subcategory = ?",
-            (category, value),
-        )
-        return cursor.rowcount
+    if column == "subcategory" and not category:
+        raise ValueError("Category is required for subcategory delete")
+    row = db.fetch_one(
+        conn, f"SELECT id FROM {DIMENSION_TABLES[column]} WHERE name = ?", (value,)
+    )
+    if row is None:
+        return 0
+    where_sql, params = _scoped_rows_sql(column, int(row["id"]), category)
     cursor = db.execute(
-        conn,
-        f"UPDATE transactions SET {column} = NULL WHERE {column} = ?",
-        (value,),
+        conn, f"UPDATE transaction_rows SET {column}_id = NULL WHERE {where_sql}", params
     )
     return cursor.rowcount
 
 
+def _scoped_rows_sql(
+    column: str, row_id: int, category: Optional[str]
+) -> Tuple[str, List[object]]:
+    # Rows holding one lookup id; subcategories are scoped to their category.
+    if column == "subcategory":
+        return (
+            "subcategory_id = ? AND category_id = (SELECT id FROM categories WHERE name = ?)",
+            [row_id, category],
+        )
+    return f"{column}_id = ?", [row_id]
+
+
 def count_payer_rename_conflicts(conn: sqlite3.Connection, old_value: str, new_value: str) -> int:
     row = db.fetch_one(
         conn,
@@ -1,7 +1,7 @@
 from pathlib import Path
 import uuid
 
-from src import db
+from src import db, queries
 
 REPO_ROOT = Path(__file__).resolve().parents[1]
 SCHEMA_PATH = REPO_ROOT / "schema.sql"
@@ -35,3 +35,21 @@ def init_memory_db():
     conn = db.connect(":memory:")
     db.init_db(conn, str(SCHEMA_PATH))
     return conn
+
+
+def add_transaction(conn, **fields) -> int:
+    # queries.insert_transaction with defaults for the fields a test does not care about;
+    # returns the new id.
+    row = {
+        "date_payment": "2024-01-01",
+        "date_application": "2024-01-01",
+        "amount_cents": 1000,
+        "payer": "alice",
+        "payee": "bob",
+        "payment_type": "card",
+        "category": "food",
+        "subcategory": None,
+        "notes": None,
+    }
+    row.update(fields)
+    return queries.insert_transaction(conn, **row)
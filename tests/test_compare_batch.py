@@ -0,0 +1,126 @@
+import json
+import unittest
+import uuid
+
+try:
+    import pandas as pd
+except ModuleNotFoundError as exc:  # pragma: no cover - dependency gate
+    raise unittest.SkipTest("pandas is required for batch comparison tests") from exc
+
+from src import compare_batch, comparison_engine
+from src.types import Group, Node, Period
+from tests.helpers import TMP_ROOT, add_transaction, init_db_at, temp_db_path
+
+CONFIG = {
+    "mode": "role",
+    "node_mode": "or",
+    "periods": [
+        {"label": "Jan", "start_date": "2024-01-01", "end_date": "2024-01-31"},
+        {"label": "Feb", "start_date": "2024-02-01", "end_date": "2024-02-29"},
+    ],
+    "groups": [{"label": "alice", "payers": ["alice"], "payees": ["alice"]}],
+    "or_nodes": [
+        {"label": "food", "kind": "category", "category": "food"},
+        {"label": "All", "kind": "all"},
+    ],
+}
+
+
+def _add_tx(conn, date: str, amount: int, payer: str, payee: str, category: str) -> None:
+    add_transaction(
+        conn,
+        date_payment=date,
+        date_application=date,
+        amount_cents=amount,
+        payer=payer,
+        payee=payee,
+        category=category,
+    )
+
+
+class TestCompareBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        self.root = TMP_ROOT / f"batch_{uuid.uuid4().hex}"
+        self.config_dir = self.root / "configs"
+        self.config_dir.mkdir(parents=True)
+        self.db_path = temp_db_path("batch")
+        self.conn = init_db_at(self.db_path)
+        _add_tx(self.conn, "2024-01-05", 1000, "alice", "bob", "food")
+        _add_tx(self.conn, "2024-01-20", 250, "bob", "alice", "travel")
+        _add_tx(self.conn, "2024-02-03", 400, "alice", "bob", "food")
+        self.conn.commit()
+
+    def tearDown(self) -> None:
+        self.conn.close()
+
+    def test_run_directory_writes_one_csv_per_config(self) -> None:
+        (self.config_dir / "monthly.json").write_text(json.dumps(CONFIG), encoding="utf-8")
+        matched = dict(CONFIG, mode="matched_only", node_mode="and", or_nodes=[])
+        matched["and_entries"] = [{"label": "All", "kind": "all_categories"}]
+        (self.config_dir / "matched.json").write_text(json.dumps(matched), encoding="utf-8")
+
+        written = compare_batch.run_directory(self.conn, self.config_dir, self.root / "out")
+        self.assertEqual([path.name for path in written], ["matched.csv", "monthly.csv"])
+
+        actual = pd.read_csv(self.root / "out" / "monthly.csv", sep=";")
+        expected = comparison_engine.compute_comparison(
+            self.conn,
+            [Period(**item) for item in CONFIG["periods"]],
+            [Group(**item) for item in CONFIG["groups"]],
+            "role",
+            "or",
+            or_nodes=[Node(**item) for item in CONFIG["or_nodes"]],
+            use_cache=False,
+        )
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+        self.assertEqual(list(actual["outflow_cents"]), [1000, 1000, 400, 400])
+
+    def test_invalid_config_is_reported_before_running(self) -> None:
+        (self.config_dir / "a.json").write_text(json.dumps(CONFIG), encoding="utf-8")
+        (self.config_dir / "b.json").write_text(
+            json.dumps(dict(CONFIG, node="food")), encoding="utf-8"
+        )
+        with self.assertRaisesRegex(ValueError, "b.json: unknown keys node"):
+            compare_batch.run_directory(self.conn, self.config_dir, self.root / "out")
+        self.assertFalse((self.root / "out").exists())
+
+        invalid = [
+            (dict(CONFIG, groups=[]), "At least one group"),
+            (dict(CONFIG, periods=[]), "At least one period"),
+            (dict(CONFIG, mode="roles"), "Invalid mode"),
+            (dict(CONFIG, node_mode="xor"), "Invalid node mode"),
+            (dict(CONFIG, date_field="date_booked"), "Invalid date field"),
+            (
+                dict(CONFIG, node_mode="and", and_entries=CONFIG["or_nodes"],
+                     and_tags=["trip"], tag_match="SOME"),
+                "Invalid tag match",
+            ),
+            (dict(CONFIG, or_nodes=[{"label": "x", "kind": "payer"}]), "Unsupported node kind"),
+            (
+                dict(CONFIG, periods=[{"label": "Jan", "start_date": "2024-01-01",
+                                       "end_date": "2024-02-30"}]),
+                "Invalid date: 2024-02-30",
+            ),
+        ]
+        for config, message in invalid:
+            with self.subTest(message=message):
+                (self.config_dir / "b.json").write_text(json.dumps(config), encoding="utf-8")
+                with self.assertRaisesRegex(ValueError, f"b.json: {message}"):
+                    compare_batch.run_directory(self.conn, self.config_dir, self.root / "out")
+                # a.json sorts first and is valid, but nothing runs while b.json is bad.
+                self.assertFalse((self.root / "out").exists())
+
+    def test_main_reports_missing_database(self) -> None:
+        (self.config_dir / "a.json").write_text(json.dumps(CONFIG), encoding="utf-8")
+        missing = str(self.root / "missing.db")
+        code = compare_batch.main([str(self.config_dir), str(self.root / "out"), "--db", missing])
+        self.assertEqual(code, 1)
+        code = compare_batch.main(
+            [str(self.config_dir), str(self.root / "out"), "--db", str(self.db_path)]
+        )
+        self.assertEqual(code, 0)
+        self.assertTrue((self.root / "out" / "a.csv").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
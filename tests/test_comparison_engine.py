@@ -1,3 +1,5 @@
+import datetime as dt
+import random
 from typing import List
 import unittest
 
@@ -6,39 +8,21 @@ try:
 except ModuleNotFoundError as exc:  # pragma: no cover - dependency gate
     raise unittest.SkipTest("pandas is required for comparison engine tests") from exc
 
-from src import comparison_engine, tags
+from src import comparison_arrays, comparison_engine, selections, tags
 from src.types import Group, Node, Period
-from tests.helpers import init_memory_db
+from tests.helpers import add_transaction, init_db_at, init_memory_db, temp_db_path
 
 
 def _add_tx(conn, date: str, amount: int, payer: str, payee: str, category: str, tag_list: List[str]):
-    cursor = conn.execute(
-        """
-        INSERT INTO transactions (
-            date_payment,
-            date_application,
-            amount_cents,
-            payer,
-            payee,
-            payment_type,
-            category,
-            subcategory,
-            notes
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            date,
-            date,
-            amount,
-            payer,
-            payee,
-            "card",
-            category,
-            None,
-            None,
-        ),
+    tx_id = add_transaction(
+        conn,
+        date_payment=date,
+        date_application=date,
+        amount_cents=amount,
+        payer=payer,
+        payee=payee,
+        category=category,
     )
-    tx_id = int(cursor.lastrowid)
     if tag_list:
         tags.set_transaction_tags(conn, tx_id, tag_list)
 
@@ -168,3 +152,600 @@ class TestComparisonEngine(unittest.TestCase):
             self.assertEqual(int(all_row["outflow_cents"]), 900)
         finally:
             conn.close()
+
+    def test_engines_match_per_cell(self) -> None:
+        conn = init_memory_db()
+        try:
+            _build_fixture(conn)
+            _add_tx(conn, "2024-02-03", 400, None, "bob", "food", [])
+            periods = [
+                Period(label="P1", start_date="2024-01-01", end_date="2024-01-31"),
+                Period(label="P2", start_date="2024-01-08", end_date="2024-02-29"),
+                Period(label="P3", start_date="2025-01-01", end_date="2025-12-31"),
+            ]
+            groups = [
+                Group(label="G1", payers=["alice"], payees=["bob"]),
+                Group(label="G2", payers=[], payees=["bob", "gina"], include_missing_payer=True),
+            ]
+            or_nodes = [
+                Node(label="All categories", kind="all_categories"),
+                Node(label="food", kind="category", category="food"),
+                Node(label="home", kind="tag", tag="home"),
+                Node(label="missing", kind="category", category="missing"),
+            ]
+            configs = [
+                {"mode": "role", "node_mode": "or", "or_nodes": or_nodes},
+                {"mode": "matched_only", "node_mode": "or", "or_nodes": or_nodes},
+                {
+                    "mode": "role",
+                    "node_mode": "and",
+                    "and_entries": [Node(label="food", kind="category", category="food")],
+                    "and_tags": ["home", "work"],
+                    "tag_match": comparison_engine.TAG_MATCH_ALL,
+                },
+                {
+                    "mode": "matched_only",
+                    "node_mode": "and",
+                    "and_entries": [Node(label="All", kind="all_categories")],
+                    "and_tags": ["home", "work"],
+                    "tag_match": comparison_engine.TAG_MATCH_ANY,
+                },
+            ]
+            for config in configs:
+                expected = comparison_engine.compute_comparison(
+                    conn,
+                    periods=periods,
+                    groups=groups,
+                    engine=comparison_engine.ENGINE_PER_CELL,
+                    **config,
+                )
+                for engine in (
+                    comparison_engine.ENGINE_SINGLE_PASS,
+                    comparison_engine.ENGINE_VECTORIZED,
+                    comparison_engine.ENGINE_PARALLEL,
+                ):
+                    with self.subTest(engine=engine, config=config):
+                        actual = comparison_engine.compute_comparison(
+                            conn, periods=periods, groups=groups, engine=engine, **config
+                        )
+                        _pandas.testing.assert_frame_equal(actual, expected)
+        finally:
+            conn.close()
+
+    def test_vectorized_arrays_reused_until_write(self) -> None:
+        conn = init_db_at(temp_db_path("arrays"))
+        try:
+            _build_fixture(conn)
+            conn.commit()
+            first = comparison_arrays.get_transaction_arrays(conn)
+            self.assertIs(comparison_arrays.get_transaction_arrays(conn), first)
+
+            _add_tx(conn, "2024-01-20", 300, "alice", "bob", "food", [])
+            conn.commit()
+            second = comparison_arrays.get_transaction_arrays(conn)
+            self.assertIsNot(second, first)
+            self.assertEqual(second.size, first.size + 1)
+
+            # Arrays read over an uncommitted write are not shared: after the rollback the
+            # next commit reaches the same write counter with different rows.
+            periods = [Period(label="P1", start_date="2024-01-01", end_date="2024-01-31")]
+            groups = [Group(label="G1", payers=["alice"], payees=["bob"])]
+            or_nodes = [Node(label="food", kind="category", category="food")]
+            _add_tx(conn, "2024-01-21", 5000, "alice", "bob", "food", [])
+            comparison_engine.compute_comparison(
+                conn, periods, groups, "role", "or", or_nodes=or_nodes,
+                engine=comparison_engine.ENGINE_VECTORIZED, use_cache=False,
+            )
+            conn.rollback()
+            _add_tx(conn, "2024-01-21", 7, "alice", "bob", "food", [])
+            conn.commit()
+            engines = (comparison_engine.ENGINE_VECTORIZED, comparison_engine.ENGINE_SINGLE_PASS)
+            frames = [
+                comparison_engine.compute_comparison(
+                    conn, periods, groups, "role", "or", or_nodes=or_nodes,
+                    engine=engine, use_cache=False,
+                )
+                for engine in engines
+            ]
+            _pandas.testing.assert_frame_equal(frames[0], frames[1])
+        finally:
+            comparison_arrays.clear_cache()
+            conn.close()
+
+    def test_monthly_rollup_tracks_edits(self) -> None:
+        conn = init_memory_db()
+        try:
+            _build_fixture(conn)
+            _add_tx(conn, "2024-02-10", 650, "alice", "bob", "food", [])
+            _add_tx(conn, "2024-03-02", 250, None, "bob", "travel", [])
+            conn.execute(
+                "UPDATE transactions SET date_application = '2024-02-14', amount_cents = 1700 "
+                "WHERE date_payment = '2024-01-07'"
+            )
+            conn.execute("UPDATE transactions SET payer = NULL WHERE date_payment = '2024-01-06'")
+            conn.execute("DELETE FROM transactions WHERE date_payment = '2024-01-09'")
+
+            rollup = conn.execute(
+                """
+                SELECT r.date_field, r.month, c.name, s.name, p.name, q.name, r.tx_count, r.amount_cents
+                FROM monthly_rollup r
+                JOIN categories c ON c.id = r.category_id
+                LEFT JOIN subcategories s ON s.id = r.subcategory_id
+                LEFT JOIN payers p ON p.id = r.payer_id
+                LEFT JOIN payees q ON q.id = r.payee_id
+                ORDER BY 1, 2, 3, 4, 5, 6
+                """
+            ).fetchall()
+            expected_rollup = conn.execute(
+                """
+                SELECT field, month, category, subcategory, payer, payee, COUNT(*), SUM(amount_cents)
+                FROM (
+                    SELECT 'date_application' AS field, substr(date_application, 1, 7) AS month,
+                           category, subcategory, payer, payee, amount_cents
+                    FROM transactions
+                    UNION ALL
+                    SELECT 'date_payment', substr(date_payment, 1, 7),
+                           category, subcategory, payer, payee, amount_cents
+                    FROM transactions
+                )
+                GROUP BY 1, 2, 3, 4, 5, 6
+                ORDER BY 1, 2, 3, 4, 5, 6
+                """
+            ).fetchall()
+            self.assertEqual([tuple(row) for row in rollup], [tuple(row) for row in expected_rollup])
+
+            periods = [
+                Period(label="P1", start_date="2024-01-01", end_date="2024-03-31"),
+                Period(label="P2", start_date="2024-01-10", end_date="2024-03-01"),
+            ]
+            groups = [Group(label="G1", payers=["alice"], payees=["bob"], include_missing_payer=True)]
+            or_nodes = [
+                Node(label="All", kind="all"),
+                Node(label="food", kind="category", category="food"),
+            ]
+            mixed_nodes = or_nodes + [Node(label="home", kind="tag", tag="home")]
+            cases = [(periods, or_nodes), (periods, mixed_nodes), (periods[:1], mixed_nodes)]
+            for mode in ("role", "matched_only"):
+                for case_periods, case_nodes in cases:
+                    expected = comparison_engine.compute_comparison(
+                        conn, case_periods, groups, mode, "or", or_nodes=case_nodes,
+                        engine=comparison_engine.ENGINE_PER_CELL,
+                    )
+                    actual = comparison_engine.compute_comparison(
+                        conn, case_periods, groups, mode, "or", or_nodes=case_nodes,
+                        engine=comparison_engine.ENGINE_SINGLE_PASS,
+                    )
+                    with self.subTest(mode=mode, periods=len(case_periods), nodes=len(case_nodes)):
+                        _pandas.testing.assert_frame_equal(actual, expected)
+        finally:
+            conn.close()
+
+    def test_result_cache_hits_until_write(self) -> None:
+        conn = init_db_at(temp_db_path("result_cache"))
+        try:
+            _build_fixture(conn)
+            conn.commit()
+            periods = [Period(label="P1", start_date="2024-01-01", end_date="2024-01-31")]
+            groups = [Group(label="G1", payers=["alice"], payees=["bob", "gina"])]
+            or_nodes = [Node(label="food", kind="category", category="food")]
+            self.assertIsNone(
+                comparison_engine.cached_comparison(conn, periods, groups, "role", "or", or_nodes=or_nodes)
+            )
+            first = comparison_engine.compute_comparison(
+                conn, periods, groups, "role", "or", or_nodes=or_nodes
+            )
+
+            statements: List[str] = []
+            conn.set_trace_callback(statements.append)
+            reordered = [Group(label="G1", payers=["alice"], payees=["gina", "bob"])]
+            second = comparison_engine.compute_comparison(
+                conn, periods, reordered, "role", "or", or_nodes=or_nodes,
+                engine=comparison_engine.ENGINE_PER_CELL,
+            )
+            conn.set_trace_callback(None)
+            _pandas.testing.assert_frame_equal(second, first)
+            self.assertFalse([sql for sql in statements if "transactions t" in sql])
+
+            _add_tx(conn, "2024-01-20", 300, "alice", "bob", "food", [])
+            conn.commit()
+            self.assertIsNone(
+                comparison_engine.cached_comparison(conn, periods, groups, "role", "or", or_nodes=or_nodes)
+            )
+            third = comparison_engine.compute_comparison(
+                conn, periods, groups, "role", "or", or_nodes=or_nodes
+            )
+            self.assertEqual(int(third.iloc[0]["tx_count"]), int(first.iloc[0]["tx_count"]) + 1)
+
+            # A result read over an uncommitted write is not cached: after the rollback the
+            # next commit reaches the same write counter with different data.
+            _add_tx(conn, "2024-01-21", 5000, "alice", "bob", "food", [])
+            uncommitted = comparison_engine.compute_comparison(
+                conn, periods, groups, "role", "or", or_nodes=or_nodes
+            )
+            config = comparison_engine.comparison_config(
+                conn, periods, groups, "role", "or", or_nodes=or_nodes
+            )
+            self.assertIsNone(config["write_counter"])
+            conn.rollback()
+            _add_tx(conn, "2024-01-21", 7, "alice", "bob", "food", [])
+            conn.commit()
+            fourth = comparison_engine.compute_comparison(
+                conn, periods, groups, "role", "or", or_nodes=or_nodes, previous=uncommitted,
+                previous_config=config,
+            )
+            self.assertEqual(
+                int(fourth.iloc[0]["outflow_cents"]), int(third.iloc[0]["outflow_cents"]) + 7
+            )
+        finally:
+            comparison_engine.clear_result_cache()
+            conn.close()
+
+    def test_parallel_engine_matches_per_cell(self) -> None:
+        conn = init_db_at(temp_db_path("parallel"))
+        try:
+            _build_fixture(conn)
+            conn.commit()
+            periods = [
+                Period(label="P1", start_date="2024-01-01", end_date="2024-01-08"),
+                Period(label="P2", start_date="2024-01-05", end_date="2024-01-31"),
+            ]
+            groups = [
+                Group(label="G1", payers=["alice"], payees=["bob"]),
+                Group(label="G2", payers=["dana", "eve"], payees=["charlie", "frank"]),
+            ]
+            or_nodes = [
+                Node(label="food", kind="category", category="food"),
+                Node(label="home", kind="tag", tag="home"),
+                Node(label="All", kind="all"),
+            ]
+            expected = comparison_engine.compute_comparison(
+                conn, periods, groups, "role", "or", or_nodes=or_nodes,
+                engine=comparison_engine.ENGINE_PER_CELL, use_cache=False,
+            )
+            for workers in (1, 3, 32):
+                with self.subTest(workers=workers):
+                    actual = comparison_engine.compute_comparison(
+                        conn, periods, groups, "role", "or", or_nodes=or_nodes,
+                        engine=comparison_engine.ENGINE_PARALLEL, use_cache=False,
+                        workers=workers,
+                    )
+                    _pandas.testing.assert_frame_equal(actual, expected)
+            with self.assertRaises(ValueError):
+                comparison_engine.compute_comparison(
+                    conn, periods, groups, "role", "or", or_nodes=or_nodes,
+                    engine=comparison_engine.ENGINE_PARALLEL, workers=0,
+                )
+        finally:
+            conn.close()
+
+    def test_large_groups_match_small_groups(self) -> None:
+        conn = init_db_at(temp_db_path("large_groups"))
+        try:
+            _build_fixture(conn)
+            conn.commit()
+            padding = [f"nobody{index}" for index in range(selections.TEMP_TABLE_THRESHOLD)]
+            periods = [Period(label="P1", start_date="2024-01-01", end_date="2024-01-31")]
+            or_nodes = [
+                Node(label="food", kind="category", category="food"),
+                Node(label="home", kind="tag", tag="home"),
+            ]
+            small = [Group(label="G1", payers=["alice", "dana"], payees=["bob"])]
+            large = [Group(label="G1", payers=padding + ["alice", "dana"], payees=padding + ["bob"])]
+            expected = comparison_engine.compute_comparison(
+                conn, periods, small, "role", "or", or_nodes=or_nodes,
+                engine=comparison_engine.ENGINE_PER_CELL, use_cache=False,
+            )
+            for engine in sorted(comparison_engine.ENGINES):
+                with self.subTest(engine=engine):
+                    actual = comparison_engine.compute_comparison(
+                        conn, periods, large, "role", "or", or_nodes=or_nodes,
+                        engine=engine, use_cache=False,
+                    )
+                    _pandas.testing.assert_frame_equal(actual, expected)
+            rows, _ = comparison_engine.cell_transactions(
+                conn, periods[0], large[0], or_nodes[0], "matched_only"
+            )
+            self.assertEqual([row["id"] for row in rows], [2, 3, 8])
+            self.assertFalse(conn.in_transaction)
+        finally:
+            conn.close()
+
+    def test_many_large_groups_keep_their_stored_selections(self) -> None:
+        conn = init_db_at(temp_db_path("many_groups"))
+        try:
+            _build_fixture(conn)
+            conn.commit()
+            # Two stored selections per group, more than the stored-selection limit in all.
+            count = selections.STORED_SELECTIONS_LIMIT // 2 + 8
+            groups = [
+                Group(
+                    label=f"G{index}",
+                    payers=[f"payer{index}_{n}" for n in range(70)] + ["alice"],
+                    payees=[f"payee{index}_{n}" for n in range(70)] + ["bob"],
+                )
+                for index in range(count)
+            ]
+            periods = [Period(label="P1", start_date="2024-01-01", end_date="2024-12-31")]
+            or_nodes = [Node(label="All", kind="all")]
+            expected = comparison_engine.compute_comparison(
+                conn, periods, groups, "matched_only", "or", or_nodes=or_nodes,
+                engine=comparison_engine.ENGINE_PER_CELL, use_cache=False,
+            )
+            self.assertTrue((expected["tx_count"] > 0).all())
+            actual = comparison_engine.compute_comparison(
+                conn, periods, groups, "matched_only", "or", or_nodes=or_nodes,
+                engine=comparison_engine.ENGINE_SINGLE_PASS, use_cache=False,
+            )
+            _pandas.testing.assert_frame_equal(actual, expected)
+        finally:
+            conn.close()
+
+    def test_incremental_recomputes_only_changed_cells(self) -> None:
+        conn = init_memory_db()
+        try:
+            _build_fixture(conn)
+            # Frames computed over uncommitted writes are never reused.
+            conn.commit()
+            p1 = Period(label="P1", start_date="2024-01-01", end_date="2024-01-08")
+            p2 = Period(label="P2", start_date="2024-01-05", end_date="2024-01-31")
+            g1 = Group(label="G1", payers=["alice"], payees=["bob"])
+            g2 = Group(label="G2", payers=["dana"], payees=["charlie"])
+            food = Node(label="food", kind="category", category="food")
+            travel = Node(label="travel", kind="category", category="travel")
+            home = Node(label="home", kind="tag", tag="home")
+            engine = comparison_engine.ENGINE_PER_CELL
+
+            before = dict(periods=[p1], groups=[g1, g2], mode="role", node_mode="or", or_nodes=[food, travel])
+            previous = comparison_engine.compute_comparison(conn, engine=engine, **before)
+            previous_config = comparison_engine.comparison_config(conn, **before)
+
+            # Add a period and a node, redefine G2 under the same label, drop travel.
+            g2_changed = Group(label="G2", payers=["dana", "eve"], payees=["charlie"])
+            after = dict(periods=[p1, p2], groups=[g1, g2_changed], mode="role", node_mode="or", or_nodes=[home, food])
+            statements: List[str] = []
+            conn.set_trace_callback(statements.append)
+            actual = comparison_engine.compute_comparison(
+                conn, engine=engine, previous=previous, previous_config=previous_config, **after
+            )
+            conn.set_trace_callback(None)
+            expected = comparison_engine.compute_comparison(conn, engine=engine, **after)
+            _pandas.testing.assert_frame_equal(actual, expected)
+            # Only (P1, G1, food) is reused out of 2 x 2 x 2 cells.
+            self.assertEqual(len([sql for sql in statements if "FROM transaction_rows t" in sql]), 7)
+
+            # Any write makes the previous frame unusable.
+            _add_tx(conn, "2024-01-02", 100, "alice", "bob", "food", [])
+            conn.commit()
+            refreshed = comparison_engine.compute_comparison(
+                conn, engine=engine, previous=previous, previous_config=previous_config, **before
+            )
+            self.assertEqual(int(_row(refreshed, "food")["tx_count"]), int(_row(previous, "food")["tx_count"]) + 1)
+        finally:
+            conn.close()
+
+    def test_time_series_buckets_match_cell_totals(self) -> None:
+        conn = init_memory_db()
+        try:
+            _build_fixture(conn)
+            _add_tx(conn, "2021-01-03", 400, "alice", "bob", "food", ["home"])
+            _add_tx(conn, "2023-12-31", 250, "alice", "bob", "travel", [])
+            _add_tx(conn, "2024-03-15", 600, "dana", "bob", "food", [])
+            periods = [
+                Period(label="P1", start_date="2020-12-30", end_date="2021-01-05"),
+                Period(label="P2", start_date="2023-12-20", end_date="2024-03-20"),
+            ]
+            groups = [Group(label="G1", payers=["alice"], payees=["bob"])]
+            or_nodes = [
+                Node(label="food", kind="category", category="food"),
+                Node(label="home", kind="tag", tag="home"),
+            ]
+            for bucket in comparison_engine.BUCKETS:
+                series = comparison_engine.compute_time_series(
+                    conn, periods, groups, "role", "or", bucket, or_nodes=or_nodes
+                )
+                for period in periods:
+                    subset = series[series["period_label"] == period.label]
+                    for bucket_start in sorted(set(subset["bucket_start"])):
+                        bucket_rows = subset[subset["bucket_start"] == bucket_start]
+                        next_start = comparison_engine._bucket_next(
+                            bucket, comparison_engine._bucket_floor(bucket, dt.date.fromisoformat(bucket_start))
+                        )
+                        clipped = Period(
+                            label=period.label,
+                            start_date=max(bucket_start, period.start_date),
+                            end_date=min((next_start - dt.timedelta(days=1)).isoformat(), period.end_date),
+                        )
+                        expected = comparison_engine.compute_comparison(
+                            conn, [clipped], groups, "role", "or", or_nodes=or_nodes,
+                            engine=comparison_engine.ENGINE_PER_CELL,
+                        )
+                        with self.subTest(bucket=bucket, period=period.label, start=bucket_start):
+                            for column in ("tx_count", "inflow_cents", "outflow_cents", "net_cents"):
+                                self.assertEqual(
+                                    list(bucket_rows[column]), list(expected[column])
+                                )
+
+            weekly = comparison_engine.compute_time_series(
+                conn, periods[:1], groups, "role", "or", comparison_engine.BUCKET_WEEK,
+                or_nodes=or_nodes[:1],
+            )
+            self.assertEqual(list(weekly["bucket"]), ["2020-W53", "2021-W01"])
+            self.assertEqual(list(weekly["bucket_start"]), ["2020-12-28", "2021-01-04"])
+            self.assertEqual(list(weekly["tx_count"]), [1, 0])
+            with self.assertRaises(ValueError):
+                comparison_engine.compute_time_series(
+                    conn, periods, groups, "role", "or", "year", or_nodes=or_nodes
+                )
+        finally:
+            conn.close()
+
+    def test_large_grid_engines_agree(self) -> None:
+        conn = init_memory_db()
+        try:
+            rng = random.Random(7)
+            people = ["alice", "bob", "charlie", "dana", "eve"]
+            categories = [f"cat{index}" for index in range(12)]
+            for _ in range(600):
+                day = dt.date(2022, 1, 1) + dt.timedelta(days=rng.randrange(730))
+                payer, payee = rng.sample(people, 2)
+                _add_tx(
+                    conn, day.isoformat(), rng.randrange(1, 5000), payer, payee,
+                    rng.choice(categories), rng.sample(["home", "work", "trip"], rng.randrange(3)),
+                )
+            periods = []
+            for index in range(24):
+                start = dt.date(2022 + index // 12, index % 12 + 1, 1)
+                end = dt.date(2022 + (index + 1) // 12, (index + 1) % 12 + 1, 1) - dt.timedelta(days=1)
+                periods.append(Period(label=start.isoformat()[:7], start_date=start.isoformat(), end_date=end.isoformat()))
+            periods.append(Period(label="mid", start_date="2022-03-10", end_date="2023-08-20"))
+            groups = [
+                Group(label=f"G{index}", payers=people[index:index + 2], payees=people[index + 1:index + 3])
+                for index in range(3)
+            ]
+            or_nodes = [Node(label=name, kind="category", category=name) for name in categories]
+            or_nodes += [Node(label=f"tag:{tag}", kind="tag", tag=tag) for tag in ("home", "work", "trip")]
+            or_nodes += [Node(label="All", kind="all")]
+            expected = comparison_engine.compute_comparison(
+                conn, periods, groups, "role", "or", or_nodes=or_nodes,
+                engine=comparison_engine.ENGINE_PER_CELL,
+            )
+            self.assertEqual(len(expected), 25 * 3 * 16)
+            for engine in (comparison_engine.ENGINE_SINGLE_PASS, comparison_engine.ENGINE_VECTORIZED):
+                with self.subTest(engine=engine):
+                    actual = comparison_engine.compute_comparison(
+                        conn, periods, groups, "role", "or", or_nodes=or_nodes, engine=engine
+                    )
+                    _pandas.testing.assert_frame_equal(actual, expected)
+        finally:
+            conn.close()
+
+    def test_category_family_rolls_up_subcategories(self) -> None:
+        conn = init_memory_db()
+        try:
+            _build_fixture(conn)
+            conn.execute("UPDATE transactions SET subcategory = 'groceries' WHERE id IN (1, 2, 8)")
+            conn.execute("UPDATE transactions SET subcategory = 'snacks' WHERE id = 3")
+            periods = [
+                Period(label="P1", start_date="2024-01-01", end_date="2024-01-08"),
+                Period(label="P2", start_date="2024-01-05", end_date="2024-01-31"),
+            ]
+            groups = [Group(label="G1", payers=["alice"], payees=["bob"])]
+            entries = [
+                Node(label="food", kind="category", category="food"),
+                Node(label="groceries", kind="subcategory", category="food", subcategory="groceries"),
+                Node(label="snacks", kind="subcategory", category="food", subcategory="snacks"),
+                Node(label="bakery", kind="subcategory", category="food", subcategory="bakery"),
+                Node(label="travel", kind="category", category="travel"),
+            ]
+            configs = [
+                {"mode": "role", "node_mode": "or", "or_nodes": entries + [Node(label="home", kind="tag", tag="home")]},
+                {"mode": "matched_only", "node_mode": "or", "or_nodes": entries},
+                {"mode": "role", "node_mode": "and", "and_entries": entries, "and_tags": ["home"]},
+            ]
+            for config in configs:
+                statements: List[str] = []
+                conn.set_trace_callback(statements.append)
+                actual = comparison_engine.compute_comparison(
+                    conn, periods, groups, engine=comparison_engine.ENGINE_PER_CELL,
+                    use_cache=False, **config
+                )
+                conn.set_trace_callback(None)
+                expected = comparison_engine.compute_comparison(
+                    conn, periods, groups, engine=comparison_engine.ENGINE_VECTORIZED,
+                    use_cache=False, **config
+                )
+                with self.subTest(config=config):
+                    _pandas.testing.assert_frame_equal(actual, expected)
+                    # The four food nodes share one grouped query per period.
+                    queries = [sql for sql in statements if "FROM transaction_rows t" in sql]
+                    node_count = len(config.get("or_nodes") or config.get("and_entries"))
+                    self.assertEqual(len(queries), len(periods) * (node_count - 3))
+        finally:
+            conn.close()
+
+    def test_cell_transactions_pages_through_cell_rows(self) -> None:
+        conn = init_memory_db()
+        try:
+            _build_fixture(conn)
+            _add_tx(conn, "2024-01-05", 300, "alice", "bob", "food", ["home"])
+            period = Period(label="P1", start_date="2024-01-01", end_date="2024-01-31")
+            group = Group(label="G1", payers=["alice"], payees=["bob"])
+            food = Node(label="food", kind="category", category="food")
+            cases = [
+                ("role", [], [1, 9, 2, 3, 6, 7, 8]),
+                ("matched_only", [], [9, 3, 8]),
+                ("role", ["home"], [1, 9, 2, 8]),
+            ]
+            for mode, tag_list, expected_ids in cases:
+                with self.subTest(mode=mode, tags=tag_list):
+                    ids: List[int] = []
+                    cursor = None
+                    pages = 0
+                    while True:
+                        rows, cursor = comparison_engine.cell_transactions(
+                            conn, period, group, food, mode, tags=tag_list, after=cursor, limit=2
+                        )
+                        ids.extend(int(row["id"]) for row in rows)
+                        pages += 1
+                        if cursor is None:
+                            break
+                    self.assertEqual(ids, expected_ids)
+                    self.assertEqual(pages, (len(expected_ids) + 1) // 2)
+                    df = comparison_engine.compute_comparison(
+                        conn, [period], [group], mode, "and", and_entries=[food], and_tags=tag_list
+                    )
+                    self.assertEqual(int(df.iloc[0]["tx_count"]), len(expected_ids))
+            rows, _ = comparison_engine.cell_transactions(conn, period, group, food, "role")
+            self.assertEqual(rows[0]["tags"], "home")
+            with self.assertRaises(ValueError):
+                comparison_engine.cell_transactions(conn, period, group, food, "role", limit=0)
+        finally:
+            conn.close()
+
+    def test_iter_comparison_streams_period_batches(self) -> None:
+        conn = init_db_at(temp_db_path("stream"))
+        try:
+            _build_fixture(conn)
+            conn.commit()
+            comparison_engine.clear_result_cache()
+            periods = [
+                Period(label="P1", start_date="2024-01-01", end_date="2024-01-06"),
+                Period(label="P2", start_date="2024-01-05", end_date="2024-01-31"),
+                Period(label="P3", start_date="2023-01-01", end_date="2023-12-31"),
+            ]
+            config = dict(
+                periods=periods,
+                groups=[Group(label="G1", payers=["alice"], payees=["bob"])],
+                mode="role",
+                node_mode="or",
+                or_nodes=[
+                    Node(label="food", kind="category", category="food"),
+                    Node(label="home", kind="tag", tag="home"),
+                ],
+            )
+            for engine in sorted(comparison_engine.ENGINES):
+                with self.subTest(engine=engine):
+                    expected = comparison_engine.compute_comparison(
+                        conn, engine=engine, use_cache=False, **config
+                    )
+                    batches = list(
+                        comparison_engine.iter_comparison(conn, engine=engine, use_cache=False, **config)
+                    )
+                    self.assertEqual(
+                        [list(batch["period_label"].unique()) for batch in batches],
+                        [["P1"], ["P2"], ["P3"]],
+                    )
+                    _pandas.testing.assert_frame_equal(
+                        _pandas.concat(batches, ignore_index=True), expected
+                    )
+
+            streamed = list(comparison_engine.iter_comparison(conn, **config))
+            self.assertEqual(len(streamed), 3)
+            # The full result is cached once the stream is exhausted.
+            cached = list(comparison_engine.iter_comparison(conn, **config))
+            self.assertEqual(len(cached), 1)
+            _pandas.testing.assert_frame_equal(
+                cached[0], _pandas.concat(streamed, ignore_index=True)
+            )
+        finally:
+            conn.close()
@@ -45,3 +45,15 @@ def test_coerce_date_errors() -> None:
     assert date_utils.coerce_date(None, "Date")[1] == "Date is required"
     assert date_utils.coerce_date("", "Date")[1] == "Date is required"
     assert date_utils.coerce_date("2024/01/02", "Date")[1] == "Date must be YYYY-MM-DD"
+
+
+def test_day_number_round_trip() -> None:
+    assert date_utils.day_number("1970-01-01") == 0
+    assert date_utils.day_number("1969-12-31") == -1
+    assert date_utils.day_number("2024-01-01") == 19723
+    assert date_utils.day_to_iso(19723) == "2024-01-01"
+    try:
+        date_utils.day_number("2024-02-30")
+        assert False, "Expected ValueError"
+    except ValueError as exc:
+        assert "Invalid date" in str(exc)
@@ -75,6 +75,23 @@ class TestDbConstraints(unittest.TestCase):
                 _insert_transaction(conn, payer=None, payee=None)
             with self.assertRaises(sqlite3.IntegrityError):
                 _insert_transaction(conn, payer="alice", payee="alice")
+            _insert_transaction(conn)
+            with self.assertRaises(sqlite3.IntegrityError):
+                conn.execute("UPDATE payees SET name = 'alice' WHERE name = 'bob'")
+        finally:
+            conn.close()
+
+    def test_unused_lookup_values_are_pruned(self) -> None:
+        conn = init_memory_db()
+        try:
+            _insert_transaction(conn)
+            _insert_transaction(conn, payee="carol", subcategory=None)
+            conn.execute("UPDATE transactions SET payee = 'dave' WHERE payee = 'carol'")
+            names = [row[0] for row in conn.execute("SELECT name FROM payees ORDER BY name")]
+            self.assertEqual(names, ["bob", "dave"])
+            conn.execute("DELETE FROM transactions WHERE subcategory IS NOT NULL")
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM subcategories").fetchone()[0], 0)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM payment_types").fetchone()[0], 1)
         finally:
             conn.close()
 
@@ -88,6 +105,22 @@ class TestDbConstraints(unittest.TestCase):
         finally:
             conn.close()
 
+    def test_day_numbers_follow_dates(self) -> None:
+        conn = init_memory_db()
+        try:
+            _insert_transaction(conn, date_payment="2024-01-02")
+            conn.execute("UPDATE transactions SET date_application = '2024-03-01'")
+            row = conn.execute(
+                "SELECT date_payment_day, date_application_day FROM transaction_rows"
+            ).fetchone()
+            self.assertEqual(tuple(row), (19724, 19783))
+            with self.assertRaises(sqlite3.IntegrityError):
+                conn.execute("UPDATE transaction_rows SET date_payment_day = 0")
+            with self.assertRaises(sqlite3.IntegrityError):
+                conn.execute("UPDATE transaction_rows SET date_payment = '2024-01-03'")
+        finally:
+            conn.close()
+
     def test_tag_constraints(self) -> None:
         conn = init_memory_db()
         try:
@@ -0,0 +1,129 @@
+import re
+import sqlite3
+import unittest
+
+from src import db, migrations, queries, values
+from tests.helpers import REPO_ROOT, init_memory_db
+
+SCHEMA_V0_PATH = REPO_ROOT / "tests" / "fixtures" / "schema_v0.sql"
+
+
+def _schema_objects(conn: sqlite3.Connection):
+    rows = conn.execute(
+        "SELECT type, name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY type, name"
+    ).fetchall()
+    return [(row[0], row[1]) for row in rows]
+
+
+def _schema_sql(conn: sqlite3.Connection):
+    # Whitespace and quoting differ between schema.sql and the migration steps.
+    rows = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type IN ('index', 'trigger', 'view') "
+        "AND sql IS NOT NULL ORDER BY name"
+    ).fetchall()
+    normalized = []
+    for name, sql in rows:
+        sql = re.sub(r"\s+", " ", sql.replace('"', ""))
+        normalized.append((name, re.sub(r" ?([(),;]) ?", r"\1", sql).strip()))
+    return normalized
+
+
+def _init_v0_db() -> sqlite3.Connection:
+    conn = db.connect(":memory:")
+    db.init_db(conn, str(SCHEMA_V0_PATH))
+    conn.execute(
+        """
+        INSERT INTO transactions (
+            date_payment, date_application, amount_cents, payer, payee, category
+        ) VALUES ('2024-01-01', '2024-01-01', 1000, 'alice', 'bob', 'food')
+        """
+    )
+    conn.execute("INSERT INTO tags (name) VALUES ('work'), ('home')")
+    conn.execute("INSERT INTO transaction_tags (transaction_id, tag_id) SELECT 1, id FROM tags")
+    conn.commit()
+    return conn
+
+
+class TestMigrations(unittest.TestCase):
+    def test_fresh_schema_is_current(self) -> None:
+        conn = init_memory_db()
+        try:
+            self.assertEqual(migrations.get_schema_version(conn), migrations.SCHEMA_VERSION)
+            self.assertEqual(migrations.migrate(conn), migrations.SCHEMA_VERSION)
+        finally:
+            conn.close()
+
+    def test_migrate_v0_matches_fresh_schema(self) -> None:
+        fresh = init_memory_db()
+        legacy = _init_v0_db()
+        try:
+            self.assertEqual(migrations.get_schema_version(legacy), 0)
+            self.assertEqual(migrations.migrate(legacy), migrations.SCHEMA_VERSION)
+            self.assertEqual(_schema_objects(legacy), _schema_objects(fresh))
+            log_sql = legacy.execute(
+                "SELECT sql FROM sqlite_master WHERE name = 'tag_changes'"
+            ).fetchone()[0]
+            self.assertIn("AUTOINCREMENT", log_sql)
+            row = legacy.execute("SELECT COUNT(*) FROM transactions").fetchone()
+            self.assertEqual(row[0], 1)
+            rollup = legacy.execute(
+                "SELECT date_field, month, tx_count, amount_cents FROM monthly_rollup ORDER BY 1"
+            ).fetchall()
+            self.assertEqual(
+                [tuple(row) for row in rollup],
+                [("date_application", "2024-01", 1, 1000), ("date_payment", "2024-01", 1, 1000)],
+            )
+            legacy_tags = legacy.execute("SELECT tags_text FROM transactions").fetchone()
+            self.assertEqual(legacy_tags[0], "home,work")
+            legacy.execute("UPDATE transactions SET amount_cents = 400")
+            row = legacy.execute("SELECT SUM(amount_cents) FROM monthly_rollup").fetchone()
+            self.assertEqual(row[0], 800)
+        finally:
+            fresh.close()
+            legacy.close()
+
+    def test_migrate_v0_moves_values_to_lookup_tables(self) -> None:
+        fresh = init_memory_db()
+        legacy = _init_v0_db()
+        try:
+            migrations.migrate(legacy)
+            self.assertEqual(_schema_sql(legacy), _schema_sql(fresh))
+            for column, table in migrations.DIMENSIONS:
+                self.assertEqual(
+                    [tuple(row) for row in legacy.execute(f"PRAGMA table_info({table})")],
+                    [tuple(row) for row in fresh.execute(f"PRAGMA table_info({table})")],
+                )
+            self.assertEqual(
+                [tuple(row) for row in legacy.execute("PRAGMA foreign_key_list(transaction_tags)")],
+                [tuple(row) for row in fresh.execute("PRAGMA foreign_key_list(transaction_tags)")],
+            )
+            row = legacy.execute("SELECT payer_id, payee_id, category_id FROM transaction_rows").fetchone()
+            self.assertNotIn(None, tuple(row))
+
+            # A rename is one lookup row; the search index follows it.
+            self.assertEqual(values.rename_value(legacy, "payer", "alice", "alicia"), 1)
+            row = legacy.execute("SELECT payer FROM transactions").fetchone()
+            self.assertEqual(row[0], "alicia")
+            found = queries.list_transactions(legacy, {"search": "alicia"})
+            self.assertEqual(len(found), 1)
+            self.assertEqual(queries.list_transactions(legacy, {"search": "alice"}), [])
+        finally:
+            fresh.close()
+            legacy.close()
+
+    def test_write_counter_tracks_changes(self) -> None:
+        conn = init_memory_db()
+        try:
+            start = db.write_counter(conn)
+            conn.execute(
+                """
+                INSERT INTO transactions (
+                    date_payment, date_application, amount_cents, payer, payee, category
+                ) VALUES ('2024-01-01', '2024-01-01', 1000, 'alice', 'bob', 'food')
+                """
+            )
+            conn.execute("UPDATE transactions SET amount_cents = 5")
+            conn.execute("INSERT INTO tags(name) VALUES ('home')")
+            self.assertEqual(db.write_counter(conn), start + 3)
+        finally:
+            conn.close()
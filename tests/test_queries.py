@@ -1,37 +1,20 @@
+import sqlite3
 import unittest
 
-from src import queries, tags
-from tests.helpers import init_memory_db
+from src import queries, selections, tags
+from tests.helpers import add_transaction, init_db_at, init_memory_db, temp_db_path
 
 
 def _insert_tx(conn, date: str, amount: int, payer: str, payee: str, category: str):
-    cursor = conn.execute(
-        """
-        INSERT INTO transactions (
-            date_payment,
-            date_application,
-            amount_cents,
-            payer,
-            payee,
-            payment_type,
-            category,
-            subcategory,
-            notes
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            date,
-            date,
-            amount,
-            payer,
-            payee,
-            "card",
-            category,
-            None,
-            None,
-        ),
+    return add_transaction(
+        conn,
+        date_payment=date,
+        date_application=date,
+        amount_cents=amount,
+        payer=payer,
+        payee=payee,
+        category=category,
     )
-    return int(cursor.lastrowid)
 
 
 class TestQueries(unittest.TestCase):
@@ -52,3 +35,328 @@ class TestQueries(unittest.TestCase):
             self.assertEqual(tx1_row["tags"], "alpha,zeta")
         finally:
             conn.close()
+
+    def test_search_uses_full_text_index(self) -> None:
+        conn = init_memory_db()
+        try:
+            tx1 = _insert_tx(conn, "2024-01-01", 1000, "alice", "bob", "food")
+            tx2 = _insert_tx(conn, "2024-01-02", 2000, "carol", "dave", "groceries")
+            tx3 = _insert_tx(conn, "2024-01-03", 3000, "erin", "frank", "travel")
+            conn.execute("UPDATE transactions SET notes = 'Weekly Market' WHERE id = ?", (tx3,))
+            tags.set_transaction_tags(conn, tx2, ["holiday"])
+
+            def search(term: str):
+                return sorted(row["id"] for row in queries.list_transactions(conn, {"search": term}))
+
+            self.assertEqual(search("lic"), [tx1])
+            self.assertEqual(search("ROCER"), [tx2])
+            self.assertEqual(search("market"), [tx3])
+            self.assertEqual(search("olid"), [tx2])
+            self.assertEqual(search("a"), [tx1, tx2, tx3])
+            self.assertEqual(search('"x'), [])
+            # Tags are matched one name at a time, never across the join in tags_text.
+            tags.set_transaction_tags(conn, tx1, ["trip1", "trip2"])
+            self.assertEqual(search("rip2"), [tx1])
+            self.assertEqual(search("ip1,tr"), [])
+            self.assertEqual(search("1,t"), [])
+            self.assertEqual(search("ip_"), [])
+            tags.set_transaction_tags(conn, tx1, [])
+
+            tags.rename_tag(conn, "holiday", "vacation")
+            conn.execute("UPDATE transactions SET payer = 'alicia' WHERE id = ?", (tx2,))
+            conn.execute("DELETE FROM transactions WHERE id = ?", (tx1,))
+            self.assertEqual(search("olid"), [])
+            self.assertEqual(search("vacat"), [tx2])
+            self.assertEqual(search("lic"), [tx2])
+        finally:
+            conn.close()
+
+    def test_summary_matches_listed_rows(self) -> None:
+        conn = init_memory_db()
+        try:
+            _insert_tx(conn, "2024-01-05", 1000, "alice", "bob", "food")
+            _insert_tx(conn, "2024-02-01", 250, "bob", "alice", "food")
+            _insert_tx(conn, "2024-03-10", 400, "alice", "carol", "travel")
+            _insert_tx(conn, "2024-04-01", 900, "carol", "bob", "travel")
+
+            summary = queries.summarize_transactions(conn, {"date_end": "2024-03-31"})
+            self.assertEqual(summary["tx_count"], 3)
+            self.assertEqual(summary["total_cents"], 1650)
+            self.assertEqual(
+                (summary["date_min"], summary["date_max"]), ("2024-01-05", "2024-03-10")
+            )
+            self.assertIsNone(summary["outflow_cents"])
+            self.assertEqual(
+                summary["categories"],
+                [
+                    {"category": "food", "tx_count": 2, "amount_cents": 1250},
+                    {"category": "travel", "tx_count": 1, "amount_cents": 400},
+                ],
+            )
+
+            filters = {"payers": ["alice", "carol"], "payees": ["bob"]}
+            summary = queries.summarize_transactions(conn, filters)
+            rows = queries.list_transactions(conn, filters)
+            self.assertEqual(summary["tx_count"], len(rows))
+            self.assertEqual(summary["total_cents"], sum(row["amount_cents"] for row in rows))
+            self.assertEqual((summary["outflow_cents"], summary["inflow_cents"]), (1900, 1900))
+
+            empty = queries.summarize_transactions(conn, {"categories": ["none"]})
+            self.assertEqual((empty["tx_count"], empty["total_cents"]), (0, 0))
+            self.assertIsNone(empty["date_min"])
+        finally:
+            conn.close()
+
+    def test_dimension_catalog_matches_distinct_queries_and_caches(self) -> None:
+        conn = init_db_at(temp_db_path("catalog"))
+        try:
+            tx1 = _insert_tx(conn, "2024-01-01", 1000, "alice", "bob", "food")
+            _insert_tx(conn, "2024-01-02", 2000, "carol", None, "travel")
+            conn.execute(
+                "UPDATE transactions SET subcategory = 'snacks', payment_type = NULL WHERE id = ?",
+                (tx1,),
+            )
+            tags.set_transaction_tags(conn, tx1, ["work", "home"])
+            conn.commit()
+
+            queries.clear_catalog_cache()
+            catalog = queries.dimension_catalog(conn)
+            self.assertEqual(catalog.payers, queries.get_distinct_values(conn, "payer"))
+            self.assertEqual(catalog.payees, queries.get_distinct_values(conn, "payee"))
+            self.assertEqual(
+                catalog.payment_types, queries.get_distinct_values(conn, "payment_type")
+            )
+            self.assertEqual(catalog.categories, queries.get_distinct_values(conn, "category"))
+            self.assertEqual(
+                catalog.subcategories, queries.get_distinct_values(conn, "subcategory")
+            )
+            self.assertEqual(
+                catalog.category_subcategory_pairs, queries.get_category_subcategory_pairs(conn)
+            )
+            self.assertEqual(catalog.tags, tags.list_tags(conn))
+            self.assertIs(queries.dimension_catalog(conn), catalog)
+
+            _insert_tx(conn, "2024-01-03", 300, "dave", "alice", "food")
+            conn.commit()
+            refreshed = queries.dimension_catalog(conn)
+            self.assertIsNot(refreshed, catalog)
+            self.assertEqual(refreshed.payers, ["alice", "carol", "dave"])
+
+            # A catalog read over an uncommitted write is not cached: after the rollback the
+            # next commit reaches the same write counter with different values.
+            _insert_tx(conn, "2024-01-04", 100, "ghost", "alice", "food")
+            self.assertIn("ghost", queries.dimension_catalog(conn).payers)
+            conn.rollback()
+            _insert_tx(conn, "2024-01-04", 100, "erin", "alice", "food")
+            conn.commit()
+            self.assertEqual(
+                queries.dimension_catalog(conn).payers, ["alice", "carol", "dave", "erin"]
+            )
+        finally:
+            conn.close()
+
+    def test_date_filters_and_bounds_use_day_numbers(self) -> None:
+        conn = init_memory_db()
+        try:
+            self.assertEqual(queries.get_date_bounds(conn, "date_payment"), (None, None))
+            dates = ["1969-12-31", "2023-12-31", "2024-01-01", "2024-02-29", "2024-03-01"]
+            ids = [_insert_tx(conn, date, 100, "alice", "bob", "food") for date in dates]
+            rows = conn.execute(
+                "SELECT date_payment_day, date_application_day FROM transactions ORDER BY id"
+            ).fetchall()
+            self.assertEqual(
+                [tuple(row) for row in rows],
+                [(-1, -1), (19722, 19722), (19723, 19723), (19782, 19782), (19783, 19783)],
+            )
+            self.assertEqual(
+                queries.get_date_bounds(conn, "date_application"), ("1969-12-31", "2024-03-01")
+            )
+            filters = {"date_start": "2024-01-01", "date_end": "2024-02-29"}
+            listed = [row["id"] for row in queries.list_transactions(conn, filters, "id", "asc")]
+            self.assertEqual(listed, ids[2:4])
+
+            queries.update_transaction(
+                conn, ids[0], "2024-02-01", "2024-02-02", 100, "alice", "bob", None, "food",
+                None, None,
+            )
+            listed = [row["id"] for row in queries.list_transactions(conn, filters, "id", "asc")]
+            self.assertEqual(listed, [ids[0]] + ids[2:4])
+            with self.assertRaises(ValueError):
+                queries.list_transactions(conn, {"date_start": "2024-02-30"})
+        finally:
+            conn.close()
+
+    def test_keyset_pages_match_full_listing(self) -> None:
+        conn = init_memory_db()
+        try:
+            people = ["alice", "bob", None]
+            for index in range(14):
+                payer = people[index % 3]
+                payee = "zoe" if payer is None else people[(index + 1) % 2]
+                if payee == payer:
+                    payee = "zoe"
+                tx_id = _insert_tx(
+                    conn, f"2024-01-{1 + index % 4:02d}", 100 * (index % 5), payer, payee, "food"
+                )
+                conn.execute(
+                    "UPDATE transactions SET payment_type = ?, subcategory = ?, notes = ? WHERE id = ?",
+                    (
+                        None if index % 4 == 0 else "card",
+                        None if index % 3 == 0 else "snacks",
+                        None if index % 2 == 0 else f"note {index % 3}",
+                        tx_id,
+                    ),
+                )
+                if index % 3 == 1:
+                    tags.set_transaction_tags(conn, tx_id, ["home"] if index % 2 else ["away"])
+
+            filters = {"categories": ["food"]}
+            for sort_by in queries.SORT_COLUMNS:
+                for sort_dir in ("asc", "desc"):
+                    with self.subTest(sort_by=sort_by, sort_dir=sort_dir):
+                        expected = [
+                            row["id"]
+                            for row in queries.list_transactions(conn, filters, sort_by, sort_dir)
+                        ]
+                        ids = []
+                        cursor = None
+                        while True:
+                            rows, cursor = queries.list_transactions_page(
+                                conn, filters, sort_by, sort_dir, after=cursor, limit=3
+                            )
+                            self.assertLessEqual(len(rows), 3)
+                            ids.extend(row["id"] for row in rows)
+                            if cursor is None:
+                                break
+                        self.assertEqual(ids, expected)
+            with self.assertRaises(ValueError):
+                queries.list_transactions_page(conn, filters, limit=0)
+        finally:
+            conn.close()
+
+    def test_large_selections_match_through_temp_table(self) -> None:
+        conn = init_memory_db()
+        try:
+            tx1 = _insert_tx(conn, "2024-01-01", 1000, "alice", "bob", "food")
+            tx2 = _insert_tx(conn, "2024-01-02", 2000, "carol", "dave", "food")
+            tx3 = _insert_tx(conn, "2024-01-03", 3000, "erin", "frank", "travel")
+            conn.execute("UPDATE transactions SET subcategory = 'train' WHERE id = ?", (tx3,))
+            conn.commit()
+            padding = [f"nobody{index}" for index in range(selections.TEMP_TABLE_THRESHOLD)]
+
+            def listed(filters):
+                return [row["id"] for row in queries.list_transactions(conn, filters, "id", "asc")]
+
+            large = {
+                "payers": padding + ["carol", "erin"],
+                "subcategory_pairs": [("x", name) for name in padding] + [("travel", "train")],
+            }
+            self.assertEqual(listed(large), [tx3])
+            small = {"payers": ["carol", "erin"], "subcategory_pairs": [("travel", "train")]}
+            self.assertEqual(listed(small), [tx3])
+            self.assertEqual(listed({"categories": padding + ["food"]}), [tx1, tx2])
+            self.assertEqual(listed({"payees": padding, "include_missing_payee": True}), [])
+            summary = queries.summarize_transactions(conn, {"payers": padding + ["carol"]})
+            self.assertEqual((summary["tx_count"], summary["outflow_cents"]), (1, 2000))
+            # A selection at the threshold stays inline; larger ones are stored once each
+            # and the temp writes leave no transaction open.
+            self.assertFalse(conn.in_transaction)
+            listed(large)
+            counts = conn.execute(
+                """
+                SELECT
+                    (SELECT COUNT(DISTINCT selection) FROM temp.selected_values),
+                    (SELECT COUNT(DISTINCT selection) FROM temp.selected_pairs)
+                """
+            ).fetchone()
+            self.assertEqual(tuple(counts), (3, 1))
+        finally:
+            conn.close()
+
+    def test_stored_selections_are_bounded_and_survive_rollback(self) -> None:
+        conn = init_memory_db()
+        try:
+            tx_id = _insert_tx(conn, "2024-01-01", 1000, "alice", "bob", "food")
+            conn.commit()
+            padding = [f"nobody{index}" for index in range(selections.TEMP_TABLE_THRESHOLD)]
+            filters = {"payers": padding + ["alice"]}
+
+            # Stored inside the caller's transaction, then rolled back with it.
+            conn.execute("UPDATE transactions SET amount_cents = 5 WHERE id = ?", (tx_id,))
+            self.assertEqual(len(queries.list_transactions(conn, filters)), 1)
+            conn.rollback()
+            # The rollback took the stored rows along; the next query stores them again.
+            self.assertEqual(len(queries.list_transactions(conn, filters)), 1)
+
+            for index in range(selections.STORED_SELECTIONS_LIMIT + 5):
+                queries.list_transactions(conn, {"payers": padding + [f"extra{index}"]})
+            counts = conn.execute(
+                """
+                SELECT
+                    (SELECT COUNT(*) FROM temp.stored_selections),
+                    (SELECT COUNT(DISTINCT selection) FROM temp.selected_values)
+                """
+            ).fetchone()
+            # The oldest are trimmed before each statement; the last one stored its own.
+            self.assertEqual(tuple(counts), (selections.STORED_SELECTIONS_LIMIT + 1,) * 2)
+            self.assertEqual(len(queries.list_transactions(conn, filters)), 1)
+        finally:
+            conn.close()
+
+    def test_failed_write_leaves_no_lookup_values(self) -> None:
+        conn = init_memory_db()
+        try:
+            tx_id = _insert_tx(conn, "2024-01-01", 1000, "alice", "bob", "food")
+            with self.assertRaises(sqlite3.IntegrityError):
+                queries.insert_transaction(
+                    conn, "2024-01-02", "2024-01-02", -5, "zed", "bob", "wire", "toys", None, None
+                )
+            with self.assertRaises(sqlite3.IntegrityError):
+                queries.update_transaction(
+                    conn, tx_id, "2024-01-01", "2024-01-01", 1000, "yan", "yan", None, "food",
+                    None, None,
+                )
+            # The earlier write is still pending in the caller's transaction.
+            self.assertTrue(conn.in_transaction)
+            self.assertEqual(queries.get_distinct_values(conn, "payer"), ["alice"])
+            self.assertEqual(queries.get_distinct_values(conn, "payment_type"), ["card"])
+            self.assertEqual(queries.get_distinct_values(conn, "category"), ["food"])
+            conn.commit()
+            self.assertEqual(queries.get_transaction(conn, tx_id)["payer"], "alice")
+        finally:
+            conn.close()
+
+    def test_column_projection(self) -> None:
+        conn = init_memory_db()
+        try:
+            for index, payer in enumerate(["carol", "alice", "bob", "alice"]):
+                tx_id = _insert_tx(conn, f"2024-01-0{index + 1}", 100 * index, payer, "zoe", "food")
+                tags.set_transaction_tags(conn, tx_id, ["home"])
+
+            full = queries.list_transactions(conn, {})
+            self.assertEqual(full[0].keys(), list(queries.LIST_COLUMNS))
+            rows = queries.list_transactions(conn, {}, columns=["amount_cents", "tags"])
+            self.assertEqual(rows[0].keys(), ["id", "amount_cents", "tags"])
+            self.assertEqual(
+                [tuple(row) for row in rows],
+                [(row["id"], row["amount_cents"], row["tags"]) for row in full],
+            )
+            self.assertEqual(queries.list_transactions(conn, {}, columns="id")[0].keys(), ["id"])
+            with self.assertRaisesRegex(ValueError, "Unsupported columns: amount"):
+                queries.list_transactions(conn, {}, columns=["amount"])
+
+            # Pages keep the sort column so the cursor can be built from the last row.
+            ids = []
+            cursor = None
+            while True:
+                page, cursor = queries.list_transactions_page(
+                    conn, {}, "payer", "asc", after=cursor, limit=3, columns=["amount_cents"]
+                )
+                self.assertEqual(page[0].keys(), ["id", "amount_cents", "payer"])
+                ids.extend(row["id"] for row in page)
+                if cursor is None:
+                    break
+            expected = queries.list_transactions(conn, {}, "payer", "asc", columns=[])
+            self.assertEqual(ids, [row["id"] for row in expected])
+        finally:
+            conn.close()
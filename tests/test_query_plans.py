@@ -0,0 +1,68 @@
+import unittest
+
+from src import comparison_engine, queries, query_plans
+from src.types import Group, Node, Period
+from tests.helpers import init_memory_db
+
+
+class TestQueryPlans(unittest.TestCase):
+    def setUp(self) -> None:
+        self.conn = init_memory_db()
+        self.recorder = query_plans.QueryPlanRecorder()
+        query_plans.activate(self.recorder)
+
+    def tearDown(self) -> None:
+        query_plans.activate(None)
+        self.conn.close()
+
+    def test_category_filter_uses_index(self) -> None:
+        queries.list_transactions(self.conn, {"categories": ["food"]})
+        queries.list_transactions(self.conn, {"categories": ["home"]})
+        rows = self.recorder.summary()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["executions"], 2)
+        self.assertIn("idx_transactions_category_application_cover", rows[0]["indexes"])
+        self.assertEqual(rows[0]["full_scans"], "")
+
+    def test_name_filters_match_on_lookup_ids(self) -> None:
+        filters = {"payers": ["alice", "bob"], "include_missing_payer": True}
+        queries.list_transactions(self.conn, filters)
+        queries.summarize_transactions(self.conn, {"payees": ["bob"]})
+        rows = self.recorder.summary()
+        self.assertEqual(len(rows), 2)
+        indexes = " ".join(row["indexes"] for row in rows)
+        self.assertIn("idx_transactions_payer", indexes)
+        self.assertIn("idx_transactions_payee", indexes)
+        self.assertEqual([row["full_scans"] for row in rows], ["", ""])
+
+    def test_full_scan_logs_warning(self) -> None:
+        with self.assertLogs("src.query_plans", level="WARNING") as logs:
+            queries.list_transactions(self.conn, {})
+        self.assertIn("Full scan of transaction_rows", logs.output[0])
+        self.assertEqual(self.recorder.summary()[0]["full_scans"], "transaction_rows")
+
+    def test_aggregate_cell_is_recorded(self) -> None:
+        comparison_engine.compute_comparison(
+            self.conn,
+            [Period(label="2024", start_date="2024-01-01", end_date="2024-12-31")],
+            [Group(label="a", payers=["alice"], payees=["bob"])],
+            "role",
+            "or",
+            or_nodes=[Node(label="food", kind="category", category="food")],
+            engine=comparison_engine.ENGINE_PER_CELL,
+            use_cache=False,
+        )
+        rows = self.recorder.summary()
+        self.assertEqual(len(rows), 1)
+        self.assertIn(
+            "COVERING INDEX idx_transactions_category_application_cover", rows[0]["plan"]
+        )
+
+    def test_inactive_recorder_records_nothing(self) -> None:
+        query_plans.activate(None)
+        queries.list_transactions(self.conn, {})
+        self.assertEqual(self.recorder.summary(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
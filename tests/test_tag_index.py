@@ -0,0 +1,117 @@
+import unittest
+
+from src import db, tag_index, tags
+from tests.helpers import add_transaction, init_db_at, init_memory_db, temp_db_path
+
+
+def _add_tx(conn, tag_list) -> int:
+    tx_id = add_transaction(conn, amount_cents=100, payment_type=None)
+    if tag_list:
+        tags.set_transaction_tags(conn, tx_id, tag_list)
+    return tx_id
+
+
+def _ids(conn, names, match):
+    return tag_index.ids_from_bitmap(tag_index.matching_bitmap(conn, names, match))
+
+
+class TestTagIndex(unittest.TestCase):
+    def test_bitmap_round_trip(self) -> None:
+        ids = [1, 2, 9, 64, 1000]
+        self.assertEqual(tag_index.ids_from_bitmap(tag_index.bitmap_from_ids(ids)), ids)
+        self.assertEqual(tag_index.ids_from_bitmap(0), [])
+
+    def test_any_is_union_and_all_is_intersection(self) -> None:
+        conn = init_memory_db()
+        try:
+            tx1 = _add_tx(conn, ["home", "work"])
+            tx2 = _add_tx(conn, ["home"])
+            tx3 = _add_tx(conn, ["work"])
+            _add_tx(conn, [])
+            self.assertEqual(_ids(conn, ["home", "work"], tag_index.MATCH_ANY), [tx1, tx2, tx3])
+            self.assertEqual(_ids(conn, ["home", "work"], tag_index.MATCH_ALL), [tx1])
+            self.assertEqual(_ids(conn, ["home", "missing"], tag_index.MATCH_ALL), [])
+            self.assertEqual(_ids(conn, ["home", "missing"], tag_index.MATCH_ANY), [tx1, tx2])
+            with self.assertRaises(ValueError):
+                tag_index.matching_bitmap(conn, ["home"], "SOME")
+        finally:
+            conn.close()
+
+    def test_cached_index_replays_tag_changes(self) -> None:
+        conn = init_db_at(temp_db_path("tag_index"))
+        try:
+            tx1 = _add_tx(conn, ["home"])
+            tx2 = _add_tx(conn, ["home", "work"])
+            conn.commit()
+            first = tag_index.get_tag_index(conn)
+            self.assertIs(tag_index.get_tag_index(conn), first)
+
+            tags.set_transaction_tags(conn, tx1, ["work"])
+            conn.execute("DELETE FROM transactions WHERE id = ?", (tx2,))
+            conn.commit()
+            refreshed = tag_index.get_tag_index(conn)
+            self.assertGreater(refreshed.last_seq, first.last_seq)
+            self.assertEqual(_ids(conn, ["home"], tag_index.MATCH_ANY), [])
+            self.assertEqual(_ids(conn, ["work"], tag_index.MATCH_ANY), [tx1])
+            self.assertEqual(refreshed.bitmaps, tag_index.build_tag_index(conn).bitmaps)
+
+            # A log pruned past the cached position forces a full rebuild.
+            tags.set_transaction_tags(conn, tx1, ["home"])
+            conn.execute("DELETE FROM tag_changes WHERE seq < (SELECT MAX(seq) FROM tag_changes)")
+            conn.commit()
+            self.assertEqual(_ids(conn, ["home"], tag_index.MATCH_ANY), [tx1])
+            self.assertEqual(_ids(conn, ["work"], tag_index.MATCH_ANY), [])
+        finally:
+            tag_index.clear_cache()
+            conn.close()
+
+    def test_large_matches_probe_transaction_tags(self) -> None:
+        conn = init_memory_db()
+        limit = tag_index.ID_LIST_LIMIT
+        try:
+            tx1 = _add_tx(conn, ["home", "work"])
+            tx2 = _add_tx(conn, ["home"])
+            tx3 = _add_tx(conn, ["work"])
+
+            def matching(names, match):
+                sql, params = tag_index.id_filter_sql(conn, "t.id", names, match)
+                rows = conn.execute(
+                    f"SELECT t.id FROM transactions t WHERE {sql} ORDER BY t.id", params
+                )
+                return sql, [row[0] for row in rows]
+
+            cases = ((tag_index.MATCH_ANY, [tx1, tx2, tx3]), (tag_index.MATCH_ALL, [tx1]))
+            for match, expected in cases:
+                with self.subTest(match=match):
+                    tag_index.ID_LIST_LIMIT = limit
+                    sql, ids = matching(["home", "work"], match)
+                    self.assertIn("json_each", sql)
+                    self.assertEqual(ids, expected)
+                    tag_index.ID_LIST_LIMIT = 0
+                    sql, ids = matching(["home", "work"], match)
+                    self.assertIn("EXISTS", sql)
+                    self.assertEqual(ids, expected)
+        finally:
+            tag_index.ID_LIST_LIMIT = limit
+            conn.close()
+
+    def test_index_is_not_shared_from_inside_a_transaction(self) -> None:
+        conn = init_db_at(temp_db_path("tag_index_tx"))
+        try:
+            tx1 = _add_tx(conn, ["home"])
+            conn.commit()
+            committed = tag_index.get_tag_index(conn)
+
+            # The uncommitted tag is visible to this connection but must not be cached: after
+            # the rollback its log position is reused by a different change.
+            tags.set_transaction_tags(conn, tx1, ["work"])
+            self.assertEqual(_ids(conn, ["work"], tag_index.MATCH_ANY), [tx1])
+            self.assertIs(tag_index._INDEX_CACHE[db.database_key(conn)], committed)
+            conn.rollback()
+            tags.set_transaction_tags(conn, tx1, ["home", "gift"])
+            conn.commit()
+            self.assertEqual(_ids(conn, ["work"], tag_index.MATCH_ANY), [])
+            self.assertEqual(_ids(conn, ["gift"], tag_index.MATCH_ANY), [tx1])
+        finally:
+            tag_index.clear_cache()
+            conn.close()
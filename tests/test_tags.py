@@ -1,7 +1,7 @@
 import unittest
 
 from src import tags
-from tests.helpers import init_memory_db
+from tests.helpers import add_transaction, init_memory_db
 
 
 class TestTags(unittest.TestCase):
@@ -19,38 +19,35 @@ class TestTags(unittest.TestCase):
     def test_rename_tag_merges(self) -> None:
         conn = init_memory_db()
         try:
-            tx_id = conn.execute(
-                """
-                INSERT INTO transactions (
-                    date_payment,
-                    date_application,
-                    amount_cents,
-                    payer,
-                    payee,
-                    payment_type,
-                    category,
-                    subcategory,
-                    notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    "2024-01-01",
-                    "2024-01-01",
-                    1000,
-                    "alice",
-                    "bob",
-                    "card",
-                    "food",
-                    None,
-                    None,
-                ),
-            ).lastrowid
-            tags.set_transaction_tags(conn, int(tx_id), ["home"])
+            tx_id = add_transaction(conn)
+            tags.set_transaction_tags(conn, tx_id, ["home"])
             tags.upsert_tag(conn, "work")
             tags.rename_tag(conn, "home", "work")
-            current = tags.get_tags_for_transaction(conn, int(tx_id))
+            current = tags.get_tags_for_transaction(conn, tx_id)
             self.assertEqual(current, ["work"])
             rows = conn.execute("SELECT name FROM tags ORDER BY name").fetchall()
             self.assertEqual([row[0] for row in rows], ["work"])
         finally:
             conn.close()
+
+    def test_tags_text_follows_tag_changes(self) -> None:
+        conn = init_memory_db()
+        try:
+            tx_id = add_transaction(conn, payment_type=None)
+
+            def tags_text():
+                row = conn.execute("SELECT tags_text FROM transactions WHERE id = ?", (tx_id,))
+                return row.fetchone()[0]
+
+            tags.set_transaction_tags(conn, tx_id, ["work", "home", "gift"])
+            self.assertEqual(tags_text(), "gift,home,work")
+            tags.rename_tag(conn, "home", "zoo")
+            self.assertEqual(tags_text(), "gift,work,zoo")
+            tags.rename_tag(conn, "zoo", "gift")
+            self.assertEqual(tags_text(), "gift,work")
+            tags.delete_tag(conn, "gift")
+            self.assertEqual(tags_text(), "work")
+            tags.set_transaction_tags(conn, tx_id, [])
+            self.assertIsNone(tags_text())
+        finally:
+            conn.close()